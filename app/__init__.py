@@ -1,7 +1,6 @@
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from config import config
 import logging
 
@@ -11,7 +10,8 @@ login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Por favor, faça login para acessar esta página.'
 
-def create_app(config_name='production'): 
+def _configurar_app(config_name):
+    """Cria a aplicação com as configurações do ambiente e a camada de banco de dados."""
     app = Flask(__name__)
 
     # Carrega as configurações do ambiente
@@ -32,6 +32,12 @@ def create_app(config_name='production'):
                 app.logger.error(f"Erro ao ajustar a URI do PostgreSQL: {e}")
                 raise
 
+    # Bancos servidor usam um pool com métricas de espera e ocupação (ver config.opcoes_do_engine)
+    opcoes_do_engine = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    if 'pool_size' in opcoes_do_engine and 'poolclass' not in opcoes_do_engine:
+        from .pool import QueuePoolMonitorado
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(opcoes_do_engine, poolclass=QueuePoolMonitorado)
+
     # Inicializa o banco de dados com tratamento de erros
     try:
         db.init_app(app)
@@ -40,6 +46,20 @@ def create_app(config_name='production'):
         app.logger.error(f"Erro ao inicializar o banco de dados: {e}")
         raise
 
+    return app
+
+def create_worker_app(config_name='production'):
+    """
+    Aplicação mínima para o worker do bot (worker.py): apenas configurações e banco de dados,
+    sem blueprints, login, formulários, Flask-Migrate ou páginas de erro.
+    """
+    app = _configurar_app(config_name)
+    from . import models  # Registra os modelos no metadata
+    return app
+
+def create_app(config_name='production'): 
+    app = _configurar_app(config_name)
+
     # Inicializa o login manager
     try:
         login_manager.init_app(app)
@@ -48,17 +68,27 @@ def create_app(config_name='production'):
         app.logger.error(f"Erro ao inicializar o login manager: {e}")
         raise
 
-    # Inicializa o Flask-Migrate
+    # Inicializa o Flask-Migrate (importado aqui para não carregar o Alembic no worker do bot)
+    from flask_migrate import Migrate
     migrate = Migrate(app, db)
 
-    # Importação de models
-    from .models import User
+    # Atrás do roteador do Heroku, request.remote_addr passa a ser o IP do cliente (usado no limite de login)
+    if app.config.get('PROXIES_CONFIAVEIS'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIAVEIS'])
+    elif not app.debug and not app.testing:
+        app.logger.warning("PROXIES_CONFIAVEIS=0: atrás de um proxy, todos os clientes terão o IP do proxy "
+                           "e dividirão o mesmo limite de tentativas de login.")
+
+    # Cache dos usuários carregados a cada requisição autenticada
+    from .cache_usuarios import obter_cache_de_usuarios
+    cache_de_usuarios = obter_cache_de_usuarios(app)
 
     # Função para carregar o usuário pela ID
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            return User.query.get(int(user_id))
+            return cache_de_usuarios.obter(int(user_id))
         except Exception as e:
             app.logger.error(f"Erro ao carregar o usuário com ID {user_id}: {e}")
             return None
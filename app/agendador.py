@@ -0,0 +1,448 @@
+import os
+import atexit
+import random
+import asyncio
+import logging
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from . import db
+from .models import User, Keyword, TarefaAgendada, UserMatch, EstadoDoBot
+from .tarefas import IDENTIDADE
+from .indice import IndicePalavrasChave
+from .jobs import RegistroDeJobs
+from .eventos import CanalDeEventos
+from .metricas import MAX_LOGS_DO_BOT
+
+logger = logging.getLogger(__name__)
+
+TOTAL_PAGINAS = int(os.getenv('TOTAL_PAGINAS', 5))  # Páginas da listagem verificadas por ciclo
+INTERVALO_MIN = 2 * 60  # 2 minutos
+INTERVALO_MAX = 5 * 60  # 5 minutos
+INTERVALO_ENVIO = float(os.getenv('INTERVALO_ENVIO', 10))  # Segundos entre as varreduras da caixa de saída
+# Só um processo do deploy executa o bot: o que detém este lease em tarefas_agendadas,
+# renovado a cada terço da validade. Os demais assumem quando ele vence.
+LIDERANCA_BOT = 'bot_runtime'
+LIDERANCA_BOT_S = float(os.getenv('LIDERANCA_BOT_S', 60))
+ENCERRAMENTO_S = float(os.getenv('ENCERRAMENTO_BOT_S', 5))  # Espera pelo runtime em thread ao sair do processo
+# Fotografia vazia, usada enquanto nenhum líder gravou métricas e logs em estado_do_bot
+ESTADO_VAZIO = {
+    'prometheus': '', 'metricas': {}, 'logs': [], 'crawler': {}, 'notificador': None,
+    'atualizado_em': None, 'processo': None,
+}
+
+
+class AgendadorDoBot:
+    """
+    Runtime do bot: um único event loop por processo que executa o ciclo de cada fonte
+    como uma tarefa, com intervalos aleatórios entre INTERVALO_MIN e INTERVALO_MAX.
+    Os usuários com `bot_ativo` são lidos do banco a cada ciclo, então o mesmo runtime
+    funciona dentro do processo web ou como worker separado (worker.py). Com vários
+    workers do gunicorn (ou web e worker ao mesmo tempo), só o líder do lease
+    LIDERANCA_BOT baixa páginas e envia mensagens.
+    """
+
+    def __init__(self, app, verificador=None, bot_token=None, total_pages=TOTAL_PAGINAS,
+                 intervalo_min=INTERVALO_MIN, intervalo_max=INTERVALO_MAX, lideranca_s=LIDERANCA_BOT_S):
+        self.app = app
+        self._verificador = verificador
+        self.bot_token = bot_token or os.getenv('TELEGRAM_TOKEN')
+        self.total_pages = total_pages
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.lideranca_s = lideranca_s
+        self.lider = False
+        self.tarefas = {}  # nome da fonte -> asyncio.Task
+        self.eventos = CanalDeEventos()
+        self.jobs = RegistroDeJobs(canal=self.eventos)
+        self.assinantes_do_ciclo = {}  # Assinantes do ciclo em andamento
+        self.indice = IndicePalavrasChave()  # Mantido entre ciclos e atualizado por diferença
+        self.keywords_carregadas = {}  # user_id -> (keywords_versao, palavras-chave no índice)
+        self.keyword_ids = {}  # user_id -> {palavra-chave normalizada: Keyword.id}
+        self.ciclo_em_andamento = False
+        self.loop = None
+        self.thread = None
+        self._encerramento_registrado = False
+        self._acordar = None
+        self._acordar_envio = None
+        self._parar = None
+        self._lock = threading.Lock()
+
+    @property
+    def verificador(self):
+        """
+        Verificador do bot, criado no primeiro uso. Assim o processo web com o bot em um
+        worker separado não importa a pilha de scraping (aiohttp, lxml).
+        """
+        if self._verificador is None:
+            from .bot import VerificadorDeProjetos
+            self._verificador = VerificadorDeProjetos()
+        return self._verificador
+
+    def carregar_assinantes(self):
+        """
+        Carrega os usuários com o bot ligado e atualiza o índice de palavras-chave.
+        As palavras-chave só são relidas para usuários cuja `keywords_versao` mudou
+        desde o último ciclo; os demais reaproveitam o que já está no índice.
+        """
+        with self.app.app_context():
+            usuarios = (
+                db.session.query(User.id, User.chat_id, User.modo_notificacao, User.keywords_versao)
+                .filter(User.bot_ativo.is_(True), User.chat_id.isnot(None))
+                .all()
+            )
+            alterados = {
+                usuario.id: usuario.keywords_versao
+                for usuario in usuarios
+                if self.keywords_carregadas.get(usuario.id, (None,))[0] != usuario.keywords_versao
+            }
+            keywords = {user_id: [] for user_id in alterados}
+            ids = {user_id: {} for user_id in alterados}
+            if alterados:
+                consulta = (
+                    db.session.query(Keyword.user_id, Keyword.id, Keyword.keyword)
+                    .filter(Keyword.user_id.in_(alterados))
+                    .order_by(Keyword.id)
+                )
+                for user_id, keyword_id, keyword in consulta:
+                    keywords[user_id].append(keyword)
+                    ids[user_id].setdefault(IndicePalavrasChave.normalizar(keyword), keyword_id)
+
+        ativos = {usuario.id for usuario in usuarios}
+        for user_id in [user_id for user_id in self.keywords_carregadas if user_id not in ativos]:
+            self._atualizar_indice(user_id, [])
+            del self.keywords_carregadas[user_id]
+            del self.keyword_ids[user_id]
+        for user_id, versao in alterados.items():
+            self._atualizar_indice(user_id, keywords[user_id])
+            self.keywords_carregadas[user_id] = (versao, keywords[user_id])
+            self.keyword_ids[user_id] = ids[user_id]
+
+        return {
+            usuario.id: {
+                'keywords': self.keywords_carregadas[usuario.id][1],
+                'keyword_ids': self.keyword_ids[usuario.id],
+                'chat_id': usuario.chat_id,
+                'modo_notificacao': usuario.modo_notificacao,
+            }
+            for usuario in usuarios
+        }
+
+    def _atualizar_indice(self, user_id, keywords):
+        """
+        Aplica ao índice apenas a diferença entre as palavras-chave carregadas e as novas.
+        O autômato só é recompilado se algum termo passar a existir ou deixar de existir.
+        """
+        normalizar = IndicePalavrasChave.normalizar
+        anteriores = {normalizar(keyword) for keyword in self.keywords_carregadas.get(user_id, (None, []))[1]}
+        novas = {normalizar(keyword) for keyword in keywords}
+        for keyword in anteriores - novas:
+            self.indice.remover(user_id, keyword)
+        for keyword in novas - anteriores:
+            self.indice.adicionar(user_id, keyword)
+
+    async def executar_ciclo(self):
+        """
+        Executa um ciclo da fonte 99Freelas para todos os assinantes ativos.
+        Retorna False quando não havia ninguém para verificar.
+        """
+        assinantes = self.carregar_assinantes()
+        if not assinantes:
+            return False
+        self.assinantes_do_ciclo = assinantes
+        self.ciclo_em_andamento = True
+        inicio, cronometro, erro = datetime.now(timezone.utc), time.perf_counter(), None
+        try:
+            notificados = await self.verificador.executar_verificacao_compartilhada(
+                self.total_pages, assinantes, self.bot_token, self.app, indice=self.indice)
+        except Exception as e:
+            erro = str(e)
+            raise
+        finally:
+            self.assinantes_do_ciclo = {}
+            self.ciclo_em_andamento = False
+            self._registrar_ciclo_no_banco(inicio, time.perf_counter() - cronometro, erro)
+            self.publicar_estado()
+        notificados = notificados or {}
+        for user_id, projetos in notificados.items():
+            for projeto in projetos:
+                self.eventos.publicar(user_id, 'projeto', {
+                    'titulo': projeto['titulo'],
+                    'link': f"https://www.99freelas.com.br{projeto['link']}",
+                })
+        self.jobs.registrar_ciclo(assinantes.keys(), {user_id: len(projetos) for user_id, projetos in notificados.items()})
+        return True
+
+    def _registrar_ciclo_no_banco(self, inicio, duracao, erro):
+        """Grava o ciclo na linha do lease, lida pelos processos que não executam o bot."""
+        with self.app.app_context():
+            try:
+                TarefaAgendada.registrar_execucao(LIDERANCA_BOT, inicio, duracao, erro)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao registrar o ciclo do bot: {e}")
+
+    def _fotografar(self):
+        """Métricas, logs e estatísticas do verificador deste processo, serializáveis em JSON."""
+        verificador = self._verificador
+        notificador = verificador.notificador
+        return {
+            'prometheus': verificador.metricas.exportar(),
+            'metricas': verificador.metricas.como_dict(),
+            'logs': verificador.logs.recentes(limite=MAX_LOGS_DO_BOT),
+            'crawler': {**verificador.estatisticas_crawler(), 'links_vistos': verificador.vistos.estatisticas()},
+            'notificador': notificador.estatisticas() if notificador is not None else None,
+        }
+
+    def publicar_estado(self):
+        """
+        Grava a fotografia do runtime em estado_do_bot para os processos que não executam
+        o bot. Só o líder com um verificador já criado grava.
+        """
+        if not self.lider or self._verificador is None:
+            return
+        with self.app.app_context():
+            try:
+                EstadoDoBot.gravar(LIDERANCA_BOT, IDENTIDADE, self._fotografar())
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao gravar o estado do bot: {e}")
+
+    def estado_do_bot(self):
+        """
+        Métricas, logs e estatísticas do runtime para as rotas de monitoramento, sem criar
+        o verificador. No líder vêm da memória; nos demais processos, da última fotografia
+        gravada pelo líder (no máximo LIDERANCA_BOT_S / 3 segundos atrás). Deve ser chamado
+        em um app context.
+        """
+        if self.lider and self._verificador is not None:
+            return dict(self._fotografar(), atualizado_em=datetime.now(timezone.utc), processo=IDENTIDADE)
+        return EstadoDoBot.ler(LIDERANCA_BOT) or dict(ESTADO_VAZIO)
+
+    def status_do_usuario(self, user_id):
+        """
+        Estado do job do usuário para as rotas, conciliado com `User.bot_ativo`. Fora do
+        processo líder (outro worker do gunicorn ou o web com o bot no worker), o último
+        ciclo e os projetos notificados vêm do banco: da linha do lease LIDERANCA_BOT e das
+        correspondências gravadas desde o início do job. Deve ser chamado em um app context.
+        """
+        ativo = db.session.query(User.bot_ativo).filter(User.id == user_id).scalar()
+        job = self.jobs.status(user_id, bool(ativo))
+        if job['ativo'] and not self.lider:
+            ultimo_ciclo = db.session.query(TarefaAgendada.ultima_execucao).filter(
+                TarefaAgendada.nome == LIDERANCA_BOT).scalar()
+            if ultimo_ciclo is not None and ultimo_ciclo.tzinfo is None:
+                ultimo_ciclo = ultimo_ciclo.replace(tzinfo=timezone.utc)
+            job['ultimo_ciclo'] = ultimo_ciclo if ultimo_ciclo and ultimo_ciclo >= job['desde'] else None
+            job['projetos_notificados'] = UserMatch.query.filter(
+                UserMatch.user_id == user_id, UserMatch.matched_at >= job['desde']).count()
+        return job
+
+    def _remover_do_ciclo(self, user_id):
+        self.assinantes_do_ciclo.pop(user_id, None)
+
+    def iniciar_usuario(self, user_id):
+        """
+        Ativa o job do usuário sem bloquear: atualiza o cache e, no modo embutido,
+        garante o runtime e antecipa o próximo ciclo. `User.bot_ativo` deve ser gravado por quem chama.
+        """
+        self.jobs.marcar_ativo(user_id)
+        if self.app.config.get('BOT_EMBUTIDO'):
+            self.iniciar_em_thread()
+
+    def parar_usuario(self, user_id):
+        """
+        Para o job do usuário sem bloquear: o ciclo em andamento deixa de notificá-lo
+        imediatamente e os próximos ciclos já não o carregam do banco.
+        """
+        self.jobs.marcar_parado(user_id)
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._remover_do_ciclo, user_id)
+
+    async def _dormir(self, segundos):
+        """
+        Espera o intervalo ou até ser acordado (novo usuário, parada do runtime).
+        """
+        try:
+            await asyncio.wait_for(self._acordar.wait(), timeout=segundos)
+        except asyncio.TimeoutError:
+            pass
+        self._acordar.clear()
+
+    def renovar_lideranca(self):
+        """
+        Assume ou renova o lease LIDERANCA_BOT. Retorna se este processo é o líder; se o
+        banco falhar, deixa de liderar até a próxima renovação.
+        """
+        with self.app.app_context():
+            try:
+                lider = TarefaAgendada.assumir_lideranca(LIDERANCA_BOT, timedelta(seconds=self.lideranca_s), IDENTIDADE)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao renovar a liderança do bot: {e}")
+                lider = False
+        if lider != self.lider:
+            logger.info(f"{IDENTIDADE} {'assumiu' if lider else 'deixou'} a execução do bot.")
+        self.lider = lider
+        return lider
+
+    def liberar_lideranca(self):
+        """Devolve o lease ao encerrar, para outro processo assumir sem esperar o vencimento."""
+        if not self.lider:
+            return
+        self.lider = False
+        with self.app.app_context():
+            try:
+                TarefaAgendada.liberar(LIDERANCA_BOT, IDENTIDADE)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Erro ao liberar a liderança do bot: {e}")
+
+    async def _laco_de_lideranca(self):
+        while not self._parar.is_set():
+            try:
+                await asyncio.wait_for(self._parar.wait(), timeout=self.lideranca_s / 3)
+            except asyncio.TimeoutError:
+                pass
+            if self._parar.is_set():
+                return
+            era_lider = self.lider
+            if self.renovar_lideranca() and not era_lider:
+                self._acordar.set()
+                self._acordar_envio.set()
+            self.publicar_estado()
+
+    async def _laco_da_fonte(self):
+        while not self._parar.is_set():
+            if not self.lider:
+                await self._dormir(self.lideranca_s / 3)  # Acordado ao assumir a liderança
+                continue
+            try:
+                await self.executar_ciclo()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no ciclo de verificação: {e}", exc_info=True)
+            await self._dormir(random.uniform(self.intervalo_min, self.intervalo_max))
+
+    async def _laco_de_envio(self):
+        """
+        Esvazia a caixa de saída a cada INTERVALO_ENVIO segundos ou quando acordado: envia
+        o que sobrou de um processo reiniciado, as novas tentativas e as mensagens do webhook.
+        Os itens de resumo esperam o ciclo em andamento terminar. Só o líder envia.
+        """
+        while not self._parar.is_set():
+            try:
+                if self.lider:
+                    await self.verificador.despachar_notificacoes(
+                        self.bot_token, self.app, incluir_resumos=not self.ciclo_em_andamento)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao enviar as notificações pendentes: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._acordar_envio.wait(), timeout=INTERVALO_ENVIO)
+            except asyncio.TimeoutError:
+                pass
+            self._acordar_envio.clear()
+
+    async def executar(self):
+        """
+        Executa o runtime até `parar` ser chamado.
+        """
+        self.loop = asyncio.get_running_loop()
+        self._acordar = asyncio.Event()
+        self._acordar_envio = asyncio.Event()
+        self._parar = asyncio.Event()
+        self.renovar_lideranca()
+        self.tarefas['lideranca'] = asyncio.create_task(self._laco_de_lideranca(), name='lideranca')
+        self.tarefas['99freelas'] = asyncio.create_task(self._laco_da_fonte(), name='fonte-99freelas')
+        self.tarefas['envio'] = asyncio.create_task(self._laco_de_envio(), name='caixa-de-saida')
+        try:
+            await self._parar.wait()
+        finally:
+            for tarefa in self.tarefas.values():
+                tarefa.cancel()
+            await asyncio.gather(*self.tarefas.values(), return_exceptions=True)
+            self.tarefas.clear()
+            self.publicar_estado()
+            self.liberar_lideranca()
+            await self.verificador.fechar()
+
+    def acordar(self):
+        """
+        Antecipa o próximo ciclo. Pode ser chamado de outra thread.
+        """
+        if self.loop is not None and self._acordar is not None:
+            self.loop.call_soon_threadsafe(self._acordar.set)
+
+    def acordar_envio(self):
+        """
+        Envia a caixa de saída sem esperar INTERVALO_ENVIO. Pode ser chamado de outra thread.
+        """
+        if self.loop is not None and self._acordar_envio is not None:
+            self.loop.call_soon_threadsafe(self._acordar_envio.set)
+
+    def desbloquear_chat(self, chat_id):
+        """
+        Volta a enviar para um chat que falou com o bot (por exemplo, um novo /start). Só
+        afeta o notificador deste processo, sem criar o verificador; no worker separado o
+        bloqueio expira em BLOQUEIO_CHAT_S. Pode ser chamado de outra thread.
+        """
+        notificador = getattr(self._verificador, 'notificador', None)
+        if notificador is None:
+            return
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(notificador.desbloquear, chat_id)
+        else:
+            notificador.desbloquear(chat_id)
+
+    def parar(self):
+        """
+        Encerra o runtime. Pode ser chamado de outra thread ou de um signal handler.
+        """
+        if self.loop is not None and self._parar is not None:
+            self.loop.call_soon_threadsafe(self._parar.set)
+
+    def iniciar_em_thread(self):
+        """
+        Inicia o runtime em uma thread daemon do processo atual (modo embutido no web).
+        Chamadas repetidas apenas acordam o runtime já em execução.
+        """
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                self.acordar()
+                return
+            self.thread = threading.Thread(target=lambda: asyncio.run(self.executar()), name='bot-runtime', daemon=True)
+            self.thread.start()
+            if not self._encerramento_registrado:
+                atexit.register(self.encerrar_thread)
+                self._encerramento_registrado = True
+
+    def encerrar_thread(self, timeout=ENCERRAMENTO_S):
+        """
+        Para o runtime iniciado por `iniciar_em_thread` e espera ele devolver o lease
+        LIDERANCA_BOT, para que outro processo assuma sem esperar o vencimento. Registrado
+        no atexit: a thread é daemon e, sem isso, morreria com o lease ainda reservado.
+        """
+        thread = self.thread
+        if thread is None or not thread.is_alive():
+            return
+        self.parar()
+        thread.join(timeout)
+        if thread.is_alive():
+            self.liberar_lideranca()
+
+
+_agendador_lock = threading.Lock()
+
+
+def obter_agendador(app):
+    """
+    Retorna o runtime do bot da aplicação, criando-o na primeira chamada.
+    """
+    with _agendador_lock:
+        agendador = app.extensions.get('agendador_bot')
+        if agendador is None:
+            agendador = app.extensions['agendador_bot'] = AgendadorDoBot(app)
+        return agendador
@@ -1,8 +1,10 @@
+import math
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app  # Adiciona current_app
 from flask_login import login_user, logout_user, login_required, current_user  # Adiciona current_user
 from .models import User
 from . import db
 from .forms import LoginForm, RegistrationForm
+from .limite_login import obter_limitador_de_login
 import logging
 
 auth = Blueprint('auth', __name__)
@@ -14,6 +16,14 @@ def login():
         username = form.username.data
         password = form.password.data
 
+        # Recusa antes de consultar o usuário e calcular o hash da senha
+        espera = obter_limitador_de_login(current_app._get_current_object()).verificar(request.remote_addr, username)
+        if espera:
+            segundos = math.ceil(espera)
+            flash(f'Muitas tentativas de login. Tente novamente em {segundos} segundos.', 'danger')
+            current_app.logger.warning(f"Login de {username} recusado pelo limite de tentativas ({request.remote_addr}).")
+            return render_template('login.html', form=form), 429, {'Retry-After': str(segundos)}
+
         user = User.query.filter_by(username=username).first()
 
         if user and user.check_password(password):
@@ -1,142 +1,396 @@
-import threading
-import random
-from lxml import html
+import os
+import re
+import hashlib
+import html as html_lib
+import time
+import uuid
+import logging
+from datetime import timedelta
 import asyncio
 import aiohttp
-from .models import User, Project
+from .models import User, Project, UserMatch, LinkVisto, NotificacaoPendente
+from .indice import IndicePalavrasChave
+from .listagem import extrair_projetos, filtrar_projetos
+from .notificador import NotificadorTelegram
+from .metricas import Metricas, LogCircular, BUCKETS_CONTAGEM
+from .vistos import RegistroDeLinksVistos, TTL_LINKS_VISTOS_HORAS
+from .tarefas import IDENTIDADE
 from . import db
-from app import create_app
 
 # Constantes e Configurações
 URL_BASE = "https://www.99freelas.com.br/projects?page="
 MENSAGEM_BASE = "Os seguintes projetos foram encontrados:\n\n"
-INTERVALO_MIN = 2 * 60  # 2 minutos
-INTERVALO_MAX = 5 * 60  # 5 minutos
+LIMITE_MENSAGEM_TELEGRAM = 4096  # Tamanho máximo de uma mensagem do Telegram
+RE_FRAGMENTO_LISTAGEM = re.compile(r'<h1 class="title">.*?</h1>', re.S)  # Trecho relevante da listagem
+MAX_IDADE_PROJETO_HORAS = os.getenv('MAX_IDADE_PROJETO_HORAS')  # Ignora projetos mais antigos (opcional)
+MAX_PROPOSTAS = os.getenv('MAX_PROPOSTAS')  # Ignora projetos com mais propostas (opcional)
+MAX_PAGINAS_SIMULTANEAS = int(os.getenv('MAX_PAGINAS_SIMULTANEAS', 3))  # Downloads simultâneos por ciclo
+LIMITE_CONEXOES_POR_HOST = int(os.getenv('LIMITE_CONEXOES_POR_HOST', 3))  # Conexões abertas por host
+LOTE_ENVIO = int(os.getenv('LOTE_ENVIO', 100))  # Mensagens da caixa de saída reservadas por vez
+MAX_TENTATIVAS_ENVIO = int(os.getenv('MAX_TENTATIVAS_ENVIO', 8))  # Depois disso a mensagem é descartada
+RESERVA_ENVIO = timedelta(minutes=5)  # Após esse prazo, mensagens de um lote interrompido voltam à fila
+ESPERA_REENVIO = timedelta(seconds=30)  # Primeira espera após uma falha; dobra a cada tentativa
 
 class VerificadorDeProjetos:
-    def __init__(self):
-        self.deve_continuar = False
-        self.logs = []  # Armazena logs
-        self.thread = None
-        self.bot_ativo = False  # Estado do bot
+    def __init__(self, max_paginas_simultaneas=MAX_PAGINAS_SIMULTANEAS, url_base=URL_BASE):
+        self.max_paginas_simultaneas = max_paginas_simultaneas
+        self.url_base = url_base
+        self.max_idade = timedelta(hours=float(MAX_IDADE_PROJETO_HORAS)) if MAX_IDADE_PROJETO_HORAS else None
+        self.max_propostas = int(MAX_PROPOSTAS) if MAX_PROPOSTAS else None
+        self.logs = LogCircular()  # Últimos eventos do bot, exibidos no painel do admin
+        self.metricas = Metricas()
+        self.metricas.declarar_contador('bot_paginas_total', 'Páginas da listagem por resultado do download.')
+        self.metricas.declarar_histograma('bot_pagina_latencia_segundos', 'Tempo de download de uma página da listagem.')
+        self.metricas.declarar_histograma('bot_parse_segundos', 'Tempo de parse de uma página da listagem.')
+        self.metricas.declarar_histograma('bot_ciclo_segundos', 'Duração de um ciclo completo do bot.')
+        self.metricas.declarar_histograma('bot_ciclo_db_segundos', 'Tempo gasto no banco de dados por ciclo.')
+        self.metricas.declarar_contador('bot_correspondencias_total', 'Projetos novos correspondidos a algum usuário.')
+        self.metricas.declarar_histograma('bot_correspondencias_por_usuario', 'Projetos novos por usuário em cada ciclo.',
+                                          BUCKETS_CONTAGEM)
+        self.metricas.declarar_contador('bot_erros_total', 'Erros do bot por etapa.')
+        self.notificador = None
+        self._sessao_site = None
+        self._loop_da_sessao = None
+        self.validadores = {}  # page -> {'etag', 'last_modified', 'hash'} da última versão processada
+        self.vistos = RegistroDeLinksVistos()  # Deduplicação independente da limpeza de `projects`
+        self.assinatura_assinantes = None  # Palavras-chave usadas quando os validadores foram gravados
+        self.estatisticas_paginas = {'baixadas': 0, 'nao_modificadas': 0, 'conteudo_igual': 0, 'processadas': 0, 'tempo_parse_s': 0.0}
+
+    @staticmethod
+    def resumo_listagem(conteudo):
+        """
+        Calcula um hash apenas do trecho da página com a listagem de projetos, ignorando
+        partes que mudam a cada requisição (tokens, anúncios, horários).
+        """
+        fragmento = ''.join(RE_FRAGMENTO_LISTAGEM.findall(conteudo))
+        return hashlib.blake2b(fragmento.encode('utf-8'), digest_size=16).hexdigest()
 
     async def obter_titulos_links_projetos(self, page, session):
         """
         Busca os títulos, links, data de publicação e número de propostas dos projetos na página específica.
+        Retorna None quando a página não mudou desde o último processamento (HTTP 304 ou mesmo conteúdo),
+        evitando o parse, a correspondência e o acesso ao banco.
         """
         try:
-            async with session.get(f"{URL_BASE}{page}") as response:
-                tree = html.fromstring(await response.text())
-                titulos = tree.xpath('//h1[@class="title"]/a/text()')
-                links = tree.xpath('//h1[@class="title"]/a/@href')
-
-                # Retorna uma lista de dicionários com as informações do projeto
-                projetos = []
-                for i in range(len(titulos)):
-                    projetos.append({
-                        "titulo": titulos[i],
-                        "link": links[i]
-                    })
-
-                return projetos
+            validador = self.validadores.get(page, {})
+            headers = {}
+            if validador.get('etag'):
+                headers['If-None-Match'] = validador['etag']
+            if validador.get('last_modified'):
+                headers['If-Modified-Since'] = validador['last_modified']
+
+            inicio = time.perf_counter()
+            async with session.get(f"{self.url_base}{page}", headers=headers) as response:
+                self.estatisticas_paginas['baixadas'] += 1
+                if response.status == 304:
+                    self.estatisticas_paginas['nao_modificadas'] += 1
+                    self.metricas.observar('bot_pagina_latencia_segundos', time.perf_counter() - inicio)
+                    self.metricas.incrementar('bot_paginas_total', resultado='nao_modificada')
+                    return None
+                response.raise_for_status()  # Página de erro não deve virar validador nem listagem vazia
+                conteudo = await response.text()
+                novo_validador = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'hash': self.resumo_listagem(conteudo),
+                }
+            self.metricas.observar('bot_pagina_latencia_segundos', time.perf_counter() - inicio)
+
+            self.validadores[page] = novo_validador
+            if novo_validador['hash'] == validador.get('hash'):
+                self.estatisticas_paginas['conteudo_igual'] += 1
+                self.metricas.incrementar('bot_paginas_total', resultado='conteudo_igual')
+                return None
+
+            self.estatisticas_paginas['processadas'] += 1
+            self.metricas.incrementar('bot_paginas_total', resultado='processada')
+            inicio = time.perf_counter()
+            projetos = extrair_projetos(conteudo)
+            duracao = time.perf_counter() - inicio
+            self.estatisticas_paginas['tempo_parse_s'] += duracao
+            self.metricas.observar('bot_parse_segundos', duracao)
+            return filtrar_projetos(projetos, max_idade=self.max_idade, max_propostas=self.max_propostas)
         except Exception as e:
+            self.validadores.pop(page, None)
+            self.metricas.incrementar('bot_paginas_total', resultado='erro')
+            self.logs.registrar(logging.WARNING, 'pagina_com_erro', pagina=page, erro=f'{type(e).__name__}: {e}')
             return []
 
+    def estatisticas_crawler(self):
+        """
+        Resumo de quantas páginas deixaram de ser processadas por não terem mudado.
+        """
+        estatisticas = dict(self.estatisticas_paginas)
+        baixadas = estatisticas['baixadas']
+        puladas = estatisticas['nao_modificadas'] + estatisticas['conteudo_igual']
+        estatisticas['taxa_de_paginas_puladas'] = round(puladas / baixadas, 3) if baixadas else None
+        estatisticas['tempo_parse_s'] = round(estatisticas['tempo_parse_s'], 4)
+        return estatisticas
 
-    def projeto_corresponde(self, titulo_projeto, keywords):
+    def obter_notificador(self, bot_token):
         """
-        Verifica se o título do projeto contém alguma das palavras-chave do usuário.
+        Retorna o notificador do Telegram, criado uma única vez e mantido entre os ciclos.
         """
-        return any(keyword.lower() in titulo_projeto.lower() for keyword in keywords)
+        if self.notificador is None:
+            self.notificador = NotificadorTelegram(bot_token, metricas=self.metricas)
+        return self.notificador
 
     async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
         """
-        Envia uma mensagem para o Telegram usando aiohttp.
-        """
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-                "chat_id": chat_id,
-                "text": texto,
-                "parse_mode": "HTML"
-        }
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, data=payload) as response:
-                    response_data = await response.json()
-                    return response_data
-            except aiohttp.ClientError as e:
-                return None
+        Envia uma mensagem para o Telegram pelo notificador compartilhado.
+        """
+        return await self.obter_notificador(bot_token).enviar(chat_id, texto)
 
-    async def executar_verificacao(self, total_pages, keywords, bot_token, chat_id, user_id, app):
+    def obter_sessao_site(self):
         """
-        Executa a verificação dos projetos em várias páginas e envia notificações.
+        Retorna a sessão HTTP usada para baixar a listagem, mantida enquanto o loop existir.
         """
-        async with aiohttp.ClientSession() as session:
-            for current_page in range(1, total_pages + 1):
-                projetos = await self.obter_titulos_links_projetos(current_page, session)
-                for projeto in projetos:
-                    # Usa o contexto da aplicação Flask para garantir que as consultas ao banco funcionem
-                    with app.app_context():
-                        projeto_existente = Project.query.filter_by(link=projeto['link'], user_id=user_id).first()
+        loop = asyncio.get_running_loop()
+        if self._sessao_site is None or self._sessao_site.closed or self._loop_da_sessao is not loop:
+            connector = aiohttp.TCPConnector(limit_per_host=LIMITE_CONEXOES_POR_HOST)
+            self._sessao_site = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+            self._loop_da_sessao = loop
+        return self._sessao_site
+
+    async def obter_paginas(self, total_pages, session):
+        """
+        Dispara o download das páginas em paralelo, limitado por um semáforo, e devolve
+        as tarefas na ordem das páginas para que o processamento mantenha essa ordem.
+        """
+        semaforo = asyncio.Semaphore(self.max_paginas_simultaneas)
+
+        async def baixar(page):
+            async with semaforo:
+                return await self.obter_titulos_links_projetos(page, session)
 
-                        if projeto_existente:
-                            pass  # Projeto já existe, não fazer nada
-                        elif self.projeto_corresponde(projeto['titulo'], keywords):
-                            # Salvar no banco de dados
-                            novo_projeto = Project(title=projeto['titulo'], link=projeto['link'], user_id=user_id)
-                            db.session.add(novo_projeto)
-                            db.session.commit()
+        return [asyncio.create_task(baixar(page)) for page in range(1, total_pages + 1)]
 
-                            # Formatar a mensagem do projeto
-                            mensagem_final = (
-                                f"📋 <b>Novo Projeto Encontrado:</b>\n\n"
-                                f"🔖 <b>{projeto['titulo']}</b>\n\n"
-                                f"🌐 <a href='https://www.99freelas.com.br{projeto['link']}'>Acessar Projeto</a>\n\n"
-                                "\n--------------------------------------------------------"
-                            )
+    def formatar_mensagem_projeto(self, projeto):
+        """
+        Formata a mensagem de notificação de um projeto.
+        """
+        return (
+            f"📋 <b>Novo Projeto Encontrado:</b>\n\n"
+            f"🔖 <b>{html_lib.escape(projeto['titulo'])}</b>\n\n"
+            f"🌐 <a href='https://www.99freelas.com.br{html_lib.escape(projeto['link'])}'>Acessar Projeto</a>\n\n"
+            "\n--------------------------------------------------------"
+        )
 
-                            # Enviar mensagem formatada via Telegram
-                            await self.enviar_mensagem_telegram(mensagem_final, bot_token, chat_id)
+    def formatar_item_resumo(self, projeto):
+        """
+        Formata a linha de um projeto no resumo do ciclo.
+        """
+        return (
+            f"🔖 <b>{html_lib.escape(projeto['titulo'])}</b>\n"
+            f"🌐 <a href='https://www.99freelas.com.br{html_lib.escape(projeto['link'])}'>Acessar Projeto</a>\n\n"
+        )
 
+    def agrupar_resumo(self, itens, limite=LIMITE_MENSAGEM_TELEGRAM):
+        """
+        Agrupa os itens (texto, id) de um resumo no menor número de mensagens possível,
+        quebrando entre itens para respeitar o limite de tamanho do Telegram.
+        Retorna pares (mensagem, ids dos itens da mensagem).
+        """
+        mensagens = []
+        atual, ids = MENSAGEM_BASE, []
+        for item, item_id in itens:
+            if len(atual) + len(item) > limite and atual not in ('', MENSAGEM_BASE):
+                mensagens.append((atual.rstrip(), ids))
+                atual, ids = '', []
+            atual += item
+            ids.append(item_id)
+        if atual and atual != MENSAGEM_BASE:
+            mensagens.append((atual.rstrip(), ids))
+        return mensagens
 
-    def run_schedule(self, total_pages, keywords, bot_token, chat_id, user_id):
+    async def despachar_notificacoes(self, bot_token, app, incluir_resumos=True):
         """
-        Executa a verificação em intervalos aleatórios.
+        Envia as mensagens vencidas da caixa de saída (NotificacaoPendente) em lotes de
+        LOTE_ENVIO: os chats são atendidos em paralelo, e as mensagens de cada chat, em ordem.
+        Entregues são excluídas; as que falharam voltam à fila com backoff. Com
+        `incluir_resumos=False`, os itens de resumo esperam o fim do ciclo.
+        Retorna quantas mensagens foram enviadas.
         """
-        app = create_app()
-        while self.deve_continuar:
-            intervalo_aleatorio = random.randint(INTERVALO_MIN, INTERVALO_MAX)
-            asyncio.run(self.executar_verificacao(total_pages, keywords, bot_token, chat_id, user_id, app))
-            threading.Event().wait(intervalo_aleatorio)
+        enviadas = 0
+        while True:
+            lote = f'{IDENTIDADE}:{uuid.uuid4().hex[:12]}'
+            with app.app_context():
+                try:
+                    pendentes = NotificacaoPendente.reservar(lote, LOTE_ENVIO, RESERVA_ENVIO, incluir_resumos)
+                except Exception as e:
+                    db.session.rollback()
+                    self.metricas.incrementar('bot_erros_total', etapa='caixa_de_saida')
+                    self.logs.registrar(logging.ERROR, 'erro_ao_reservar_notificacoes', erro=str(e))
+                    return enviadas
+                por_chat = {}  # chat_id -> [(texto, ids)]
+                resumos = {}  # chat_id -> [(item, id)]
+                for pendente in pendentes:
+                    if pendente.resumo:
+                        resumos.setdefault(pendente.chat_id, []).append((pendente.texto, pendente.id))
+                    else:
+                        por_chat.setdefault(pendente.chat_id, []).append((pendente.texto, [pendente.id]))
+                for chat_id, itens in resumos.items():
+                    por_chat.setdefault(chat_id, []).extend(self.agrupar_resumo(itens))
+            if not pendentes:
+                return enviadas
+
+            entregues, falhas = [], []
+
+            async def enviar_para_chat(chat_id, mensagens):
+                for posicao, (texto, ids) in enumerate(mensagens):
+                    if await self.enviar_mensagem_telegram(texto, bot_token, chat_id):
+                        entregues.extend(ids)
+                        continue
+                    # Mantém a ordem do chat para a próxima tentativa. Chats bloqueados (403) também
+                    # voltam à fila: o bloqueio é só do processo e expira, e o backoff limita as tentativas.
+                    falhas.extend(item_id for _, ids_restantes in mensagens[posicao:] for item_id in ids_restantes)
+                    return
+
+            await asyncio.gather(*(enviar_para_chat(chat_id, mensagens) for chat_id, mensagens in por_chat.items()))
+            with app.app_context():
+                try:
+                    NotificacaoPendente.concluir(entregues)
+                    descartadas = NotificacaoPendente.adiar(falhas, MAX_TENTATIVAS_ENVIO, ESPERA_REENVIO)
+                except Exception as e:
+                    db.session.rollback()
+                    self.metricas.incrementar('bot_erros_total', etapa='caixa_de_saida')
+                    # A reserva expira e o lote é reenviado
+                    self.logs.registrar(logging.ERROR, 'erro_ao_atualizar_caixa_de_saida', erro=str(e))
+                    return enviadas
+            if falhas:
+                self.logs.registrar(logging.WARNING, 'envio_adiado', mensagens=len(falhas), descartadas=descartadas)
+            enviadas += len(pendentes) - len(falhas)
+            if len(pendentes) < LOTE_ENVIO or falhas:
+                return enviadas
 
-    def iniciar_verificacao(self, total_pages, keywords, bot_token, chat_id, user_id):
+    def mensagem_pendente(self, projeto, assinante):
         """
-        Inicia a verificação em uma thread separada.
+        Mensagem da caixa de saída que avisa `assinante` sobre `projeto`: a notificação
+        completa no modo instantâneo ou um item do resumo do ciclo.
         """
-        self.deve_continuar = True
-        self.bot_ativo = True  # Define o bot como ativo
-        if self.thread is None or not self.thread.is_alive():
-            self.thread = threading.Thread(target=self.run_schedule, args=(total_pages, keywords, bot_token, chat_id, user_id))
-            self.thread.start()
+        if assinante.get('modo_notificacao') == User.MODO_RESUMO:
+            return {'chat_id': assinante['chat_id'], 'texto': self.formatar_item_resumo(projeto), 'resumo': True}
+        return {'chat_id': assinante['chat_id'], 'texto': self.formatar_mensagem_projeto(projeto)}
 
-    def parar_verificacao(self):
+    async def executar_verificacao_compartilhada(self, total_pages, assinantes, bot_token, app, indice=None):
         """
-        Para a verificação.
+        Executa um ciclo compartilhado: cada página é baixada e interpretada uma única vez
+        e os projetos encontrados são distribuídos para as palavras-chave de todos os assinantes.
+        Usuários removidos de `assinantes` durante o ciclo deixam de ser notificados.
+        `indice` é um IndicePalavrasChave já atualizado para os assinantes; sem ele, um novo é compilado.
+        Retorna os projetos notificados por usuário.
         """
-        self.deve_continuar = False
-        self.bot_ativo = False  # Define o bot como inativo
-        if self.thread:
-            self.thread.join()
+        # Se os assinantes ou suas palavras-chave mudaram, páginas "iguais" ainda precisam ser processadas
+        assinatura = hash(frozenset(
+            (user_id, keyword) for user_id, assinante in assinantes.items() for keyword in assinante['keywords']
+        ))
+        if assinatura != self.assinatura_assinantes:
+            self.validadores.clear()
+            self.assinatura_assinantes = assinatura
+
+        # Compila as palavras-chave de todos os assinantes em um único índice por ciclo
+        if indice is None:
+            indice = IndicePalavrasChave.a_partir_de_assinantes(assinantes)
+        notificados = {}  # user_id -> projetos notificados no ciclo
+        inicio_ciclo = time.perf_counter()
+        tempo_db = 0.0
+        session = self.obter_sessao_site()
+        tarefas = await self.obter_paginas(total_pages, session)
+        try:
+            for current_page, tarefa in enumerate(tarefas, start=1):
+                projetos = await tarefa
+                if not projetos:
+                    continue  # Página vazia, com erro ou sem alterações desde o último ciclo
+                correspondencias = []
+                palavras = {}  # (user_id, link) -> palavra-chave que correspondeu
+                for projeto in projetos:
+                    for user_id, keyword in sorted(indice.corresponder(projeto['titulo'])):
+                        chave = (user_id, projeto['link'])
+                        if user_id in assinantes and chave not in palavras:
+                            palavras[chave] = keyword
+                            correspondencias.append((user_id, projeto))
+                if not correspondencias:
+                    continue
+
+                # Links já vistos são descartados em memória; o restante custa no máximo
+                # uma consulta, três INSERTs e um commit por página. O catálogo recebe cada
+                # projeto novo uma única vez, e cada usuário só uma linha estreita em user_matches.
+                inicio_db = time.perf_counter()
+                with app.app_context():
+                    try:
+                        candidatos = self.vistos.filtrar_novos(correspondencias)
+                        inseridos = LinkVisto.inserir_em_lote([h for _, _, h in candidatos])
+                        novos = [(user_id, projeto) for user_id, projeto, h in candidatos if h in inseridos]
+                        if novos:
+                            ids = Project.registrar_em_lote(projeto for _, projeto in novos)
+                            UserMatch.inserir_em_lote([
+                                {
+                                    'user_id': user_id,
+                                    'project_id': ids[projeto['link']],
+                                    'keyword_id': assinantes[user_id].get('keyword_ids', {}).get(
+                                        palavras[(user_id, projeto['link'])]),
+                                }
+                                for user_id, projeto in novos
+                            ])
+                            # As notificações entram na caixa de saída na mesma transação
+                            # das correspondências: um projeto salvo nunca fica sem aviso
+                            NotificacaoPendente.enfileirar_em_lote([
+                                self.mensagem_pendente(projeto, assinantes[user_id])
+                                for user_id, projeto in novos
+                                if user_id in assinantes  # O usuário pode ter parado o bot durante o ciclo
+                            ])
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        tempo_db += time.perf_counter() - inicio_db
+                        self.metricas.incrementar('bot_erros_total', etapa='salvar_pagina')
+                        self.logs.registrar(logging.ERROR, 'erro_ao_salvar_pagina', pagina=current_page, erro=str(e))
+                        self.validadores.pop(current_page, None)  # Reprocessa a página no próximo ciclo
+                        continue
+                tempo_db += time.perf_counter() - inicio_db
+                self.vistos.lembrar(inseridos)
+
+                for user_id, projeto in novos:
+                    if user_id in assinantes:
+                        notificados.setdefault(user_id, []).append(projeto)
+                # Envia as notificações instantâneas na ordem da página
+                if novos:
+                    await self.despachar_notificacoes(bot_token, app, incluir_resumos=False)
+        finally:
+            # Se o ciclo for cancelado, não deixa downloads pendentes
+            for tarefa in tarefas:
+                tarefa.cancel()
+
+        # Envia os resumos do ciclo
+        await self.despachar_notificacoes(bot_token, app)
+
+        duracao = time.perf_counter() - inicio_ciclo
+        total = sum(len(projetos) for projetos in notificados.values())
+        self.metricas.observar('bot_ciclo_segundos', duracao)
+        self.metricas.observar('bot_ciclo_db_segundos', tempo_db)
+        self.metricas.incrementar('bot_correspondencias_total', total)
+        for user_id in assinantes:
+            self.metricas.observar('bot_correspondencias_por_usuario', len(notificados.get(user_id, ())))
+        self.logs.registrar(logging.INFO, 'ciclo_concluido', duracao_s=round(duracao, 3), db_s=round(tempo_db, 3),
+                            assinantes=len(assinantes), projetos_novos=total, paginas=self.estatisticas_crawler())
+
+        return notificados
 
-    def status_bot(self):
+    async def fechar(self):
         """
-        Retorna o status do bot (ativo ou inativo).
+        Fecha as sessões HTTP mantidas entre os ciclos (site e Telegram).
         """
-        return 'Ativo' if self.bot_ativo else 'Verificação não iniciada'
+        if self._sessao_site is not None and not self._sessao_site.closed:
+            await self._sessao_site.close()
+        self._sessao_site = None
+        if self.notificador is not None:
+            await self.notificador.fechar()
 
     @staticmethod
     def limpar_projetos_antigos():
         """
-        Chama o método estático para excluir projetos mais antigos que 12 horas.
+        Chama o método estático para excluir projetos mais antigos que 12 horas
+        e os links vistos além de TTL_LINKS_VISTOS_HORAS.
         """
         Project.delete_old_projects()
+        LinkVisto.delete_expired(TTL_LINKS_VISTOS_HORAS)
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context, abort
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from . import db
+from .models import User
+
+CACHE_USUARIOS_TTL = float(os.getenv('CACHE_USUARIOS_TTL', 60))  # Segundos até reler o usuário do banco
+CACHE_USUARIOS_MAX = int(os.getenv('CACHE_USUARIOS_MAX', 1000))  # Usuários mantidos por processo
+
+
+class CacheDeUsuarios:
+    """
+    Cache LRU com TTL, por processo, dos usuários carregados pelo Flask-Login.
+
+    Guarda apenas os valores das colunas; a cada requisição o usuário é reconstruído e
+    anexado à sessão com `merge(load=False)`, sem consulta ao banco, e continua podendo
+    ser alterado e salvo normalmente. Qualquer UPDATE ou DELETE do usuário pelo ORM
+    invalida a entrada quando a transação é confirmada (ver `_invalidar_usuarios_alterados`);
+    o TTL limita o tempo em que alterações feitas por outros processos ficam invisíveis.
+    Decisões que não toleram esse atraso (permissão de admin, estado do bot, chat
+    vinculado) releem as colunas com `recarregar`.
+    """
+
+    def __init__(self, ttl=CACHE_USUARIOS_TTL, max_itens=CACHE_USUARIOS_MAX):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # user_id -> (expira_em, valores das colunas)
+        self._lock = threading.Lock()
+        self._invalidacoes = 0  # Incrementado a cada invalidação; evita guardar uma leitura anterior a ela
+        self.acertos = 0
+        self.faltas = 0
+
+    def _do_cache(self, user_id):
+        with self._lock:
+            item = self._itens.get(user_id)
+            if item is not None and item[0] > time.monotonic():
+                self._itens.move_to_end(user_id)
+                self.acertos += 1
+                return item[1]
+            self._itens.pop(user_id, None)
+            self.faltas += 1
+            return None
+
+    def guardar(self, user, invalidacoes=None):
+        """Guarda os valores de `user`, a menos que houve invalidação desde `invalidacoes`."""
+        valores = {atributo.key: getattr(user, atributo.key) for atributo in db.inspect(User).column_attrs}
+        with self._lock:
+            if invalidacoes is not None and invalidacoes != self._invalidacoes:
+                return  # A linha lida pode ser anterior a uma alteração confirmada por outra thread
+            self._itens[user.id] = (time.monotonic() + self.ttl, valores)
+            self._itens.move_to_end(user.id)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def obter(self, user_id):
+        """Retorna o usuário anexado à sessão atual, consultando o banco só em caso de falta."""
+        valores = self._do_cache(user_id)
+        if valores is None:
+            invalidacoes = self._invalidacoes
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self.guardar(user, invalidacoes)
+            return user
+        user = User(**valores)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def invalidar(self, user_id):
+        with self._lock:
+            self._itens.pop(user_id, None)
+            self._invalidacoes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                'itens': len(self._itens),
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+            }
+
+
+def obter_cache_de_usuarios(app):
+    """Cache de usuários da aplicação, criado na primeira chamada."""
+    cache = app.extensions.get('cache_usuarios')
+    if cache is None:
+        cache = app.extensions['cache_usuarios'] = CacheDeUsuarios()
+    return cache
+
+
+def recarregar(user, *atributos):
+    """
+    Relê do banco as colunas `atributos` de `user` (em geral o current_user, que pode vir
+    do cache com até CACHE_USUARIOS_TTL segundos de atraso em relação a outros processos),
+    com uma consulta pela chave primária. Responde 401 se o usuário não existe mais.
+    """
+    try:
+        db.session.refresh(user, list(atributos))
+    except InvalidRequestError:
+        abort(401)
+    return user
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _marcar_usuario_alterado(mapper, connection, user):
+    # toggle_admin, grant_access, edit_email, reset_password, o webhook do Telegram e as rotas
+    # que alteram o próprio usuário passam todas por aqui ao gravar a alteração. O flush
+    # ainda pode ser desfeito: a entrada só é invalidada no commit.
+    sessao = object_session(user)
+    if sessao is not None:
+        sessao.info.setdefault('usuarios_alterados', set()).add(user.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_usuarios_alterados(sessao):
+    alterados = sessao.info.pop('usuarios_alterados', ())
+    if alterados and has_app_context():
+        cache = current_app.extensions.get('cache_usuarios')
+        if cache is not None:
+            for user_id in alterados:
+                cache.invalidar(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_usuarios_alterados(sessao):
+    sessao.info.pop('usuarios_alterados', None)
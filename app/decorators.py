@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import abort, redirect, url_for, flash
 from flask_login import current_user
+from .cache_usuarios import recarregar
 import logging
 
 def admin_required(f):
@@ -20,8 +21,9 @@ def admin_required(f):
             flash('Você precisa estar logado para acessar esta página.', 'warning')
             return redirect(url_for('auth.login'))
 
-        # Verifica se o usuário é administrador
-        if not current_user.is_admin:
+        # Verifica se o usuário é administrador, relendo a permissão do banco: o usuário
+        # pode vir do cache de outro processo com um is_admin já revogado
+        if not recarregar(current_user._get_current_object(), 'is_admin').is_admin:
             flash('Você não tem permissão para acessar esta página.', 'danger')
             logging.warning(f"Tentativa de acesso não autorizado pelo usuário {current_user.username}.")
             abort(403)  # Proíbe o acesso se o usuário não for administrador
@@ -0,0 +1,45 @@
+import threading
+import itertools
+from collections import deque
+
+MAX_EVENTOS_POR_USUARIO = 50  # Eventos mantidos para quem reconecta com Last-Event-ID
+
+
+class CanalDeEventos:
+    """
+    Canal publish/subscribe em memória, por usuário, usado pelo stream SSE do dashboard.
+
+    Cada evento recebe um id crescente; quem assina informa o último id recebido e é
+    acordado assim que houver algo mais novo, sem consultar o banco.
+    """
+
+    def __init__(self, max_eventos=MAX_EVENTOS_POR_USUARIO):
+        self.max_eventos = max_eventos
+        self._eventos = {}  # user_id -> deque[(id, tipo, dados)]
+        self._sequencia = itertools.count(1)
+        self._condicao = threading.Condition()
+
+    def publicar(self, user_id, tipo, dados):
+        with self._condicao:
+            fila = self._eventos.get(user_id)
+            if fila is None:
+                fila = self._eventos[user_id] = deque(maxlen=self.max_eventos)
+            fila.append((next(self._sequencia), tipo, dados))
+            self._condicao.notify_all()
+
+    def _pendentes(self, user_id, ultimo_id):
+        return [evento for evento in self._eventos.get(user_id, ()) if evento[0] > ultimo_id]
+
+    def aguardar(self, user_id, ultimo_id=0, timeout=15):
+        """
+        Retorna os eventos do usuário com id maior que `ultimo_id`, esperando até `timeout`
+        segundos caso ainda não exista nenhum. Retorna lista vazia no timeout.
+        """
+        with self._condicao:
+            self._condicao.wait_for(lambda: self._pendentes(user_id, ultimo_id), timeout=timeout)
+            return self._pendentes(user_id, ultimo_id)
+
+    def ultimo_id(self):
+        """Id do evento mais recente publicado (0 se nenhum)."""
+        with self._condicao:
+            return max((fila[-1][0] for fila in self._eventos.values() if fila), default=0)
@@ -0,0 +1,133 @@
+from collections import deque
+
+
+class IndicePalavrasChave:
+    """
+    Índice compilado (autômato Aho-Corasick) com as palavras-chave de vários usuários.
+
+    Uma única passada sobre o título devolve todos os pares (user_id, palavra-chave)
+    cuja palavra-chave aparece no título, com a mesma semântica de substring
+    (sem diferenciar maiúsculas de minúsculas) do antigo `projeto_corresponde`.
+    """
+
+    def __init__(self):
+        self._donos = {}  # palavra-chave -> conjunto de user_ids
+        self._transicoes = [{}]
+        self._falhas = [0]
+        self._saidas = [()]
+        self._compilado = True
+
+    @classmethod
+    def construir(cls, pares):
+        """Cria o índice a partir de um iterável de pares (user_id, palavra-chave)."""
+        indice = cls()
+        for user_id, keyword in pares:
+            indice.adicionar(user_id, keyword)
+        indice.compilar()
+        return indice
+
+    @classmethod
+    def a_partir_de_assinantes(cls, assinantes):
+        """Cria o índice a partir do dicionário user_id -> {'keywords': [...]} do verificador."""
+        return cls.construir(
+            (user_id, keyword)
+            for user_id, assinante in assinantes.items()
+            for keyword in assinante['keywords']
+        )
+
+    @staticmethod
+    def normalizar(keyword):
+        """Normaliza a palavra-chave para a comparação."""
+        return keyword.lower()
+
+    def adicionar(self, user_id, keyword):
+        """Associa a palavra-chave ao usuário. Recompila o autômato apenas se o termo for novo."""
+        keyword = self.normalizar(keyword)
+        if not keyword:
+            return
+        donos = self._donos.get(keyword)
+        if donos is None:
+            self._donos[keyword] = {user_id}
+            self._compilado = False
+        else:
+            donos.add(user_id)
+
+    def remover(self, user_id, keyword):
+        """Remove a associação entre o usuário e a palavra-chave."""
+        keyword = self.normalizar(keyword)
+        donos = self._donos.get(keyword)
+        if not donos:
+            return
+        donos.discard(user_id)
+        if not donos:
+            del self._donos[keyword]
+            self._compilado = False
+
+    def compilar(self):
+        """Monta a trie e os links de falha do autômato."""
+        transicoes = [{}]
+        saidas = [[]]
+        for keyword in self._donos:
+            no = 0
+            for caractere in keyword:
+                proximo = transicoes[no].get(caractere)
+                if proximo is None:
+                    proximo = len(transicoes)
+                    transicoes[no][caractere] = proximo
+                    transicoes.append({})
+                    saidas.append([])
+                no = proximo
+            saidas[no].append(keyword)
+
+        # Busca em largura para calcular os links de falha
+        falhas = [0] * len(transicoes)
+        fila = deque(transicoes[0].values())
+        while fila:
+            no = fila.popleft()
+            for caractere, filho in transicoes[no].items():
+                fila.append(filho)
+                falha = falhas[no]
+                while falha and caractere not in transicoes[falha]:
+                    falha = falhas[falha]
+                falhas[filho] = transicoes[falha].get(caractere, 0)
+                if falhas[filho] == filho:
+                    falhas[filho] = 0
+                saidas[filho].extend(saidas[falhas[filho]])
+
+        self._transicoes = transicoes
+        self._falhas = falhas
+        self._saidas = [tuple(saida) for saida in saidas]
+        self._compilado = True
+
+    def palavras_encontradas(self, titulo):
+        """Retorna o conjunto de palavras-chave (normalizadas) presentes no título."""
+        if not self._compilado:
+            self.compilar()
+        transicoes, falhas, saidas = self._transicoes, self._falhas, self._saidas
+        encontradas = set()
+        no = 0
+        for caractere in titulo.lower():
+            while no and caractere not in transicoes[no]:
+                no = falhas[no]
+            no = transicoes[no].get(caractere, 0)
+            if saidas[no]:
+                encontradas.update(saidas[no])
+        return encontradas
+
+    def corresponder(self, titulo):
+        """Retorna o conjunto de pares (user_id, palavra-chave) que correspondem ao título."""
+        return {
+            (user_id, keyword)
+            for keyword in self.palavras_encontradas(titulo)
+            for user_id in self._donos[keyword]
+        }
+
+    def usuarios_correspondentes(self, titulo):
+        """Retorna o conjunto de user_ids com ao menos uma palavra-chave presente no título."""
+        usuarios = set()
+        for keyword in self.palavras_encontradas(titulo):
+            usuarios.update(self._donos[keyword])
+        return usuarios
+
+    def __len__(self):
+        return len(self._donos)
@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime, timezone
+
+
+class RegistroDeJobs:
+    """
+    Estado em cache dos jobs do bot, indexado pelo id do usuário.
+
+    Início, parada e consulta de status apenas atualizam ou leem este dicionário,
+    sem esperar o runtime nem consultar o banco.
+    """
+
+    STATUS_ATIVO = 'Ativo'
+    STATUS_PARADO = 'Verificação não iniciada'
+
+    def __init__(self, canal=None):
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.canal = canal  # CanalDeEventos opcional, avisado a cada mudança de estado
+
+    @classmethod
+    def serializar(cls, job):
+        """Representação JSON do estado de um job."""
+        return {
+            'status': cls.STATUS_ATIVO if job['ativo'] else cls.STATUS_PARADO,
+            'desde': job['desde'].isoformat(),
+            'ultimo_ciclo': job['ultimo_ciclo'].isoformat() if job['ultimo_ciclo'] else None,
+            'projetos_notificados': job['projetos_notificados'],
+        }
+
+    def _publicar(self, user_id, job):
+        if self.canal is not None:
+            self.canal.publicar(user_id, 'status', self.serializar(job))
+
+    def _novo_job(self, ativo):
+        return {
+            'ativo': ativo,
+            'desde': datetime.now(timezone.utc),
+            'ultimo_ciclo': None,
+            'projetos_notificados': 0,
+        }
+
+    def marcar_ativo(self, user_id):
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if job is None or not job['ativo']:
+                job = self._jobs[user_id] = self._novo_job(True)
+            job = dict(job)
+        self._publicar(user_id, job)
+
+    def marcar_parado(self, user_id):
+        with self._lock:
+            job = self._jobs[user_id] = self._novo_job(False)
+            job = dict(job)
+        self._publicar(user_id, job)
+
+    def registrar_ciclo(self, user_ids, notificados):
+        """
+        Atualiza os jobs que participaram de um ciclo. `notificados` mapeia user_id -> projetos enviados.
+        """
+        agora = datetime.now(timezone.utc)
+        atualizados = []
+        with self._lock:
+            for user_id in user_ids:
+                job = self._jobs.get(user_id)
+                if job is None:
+                    job = self._jobs[user_id] = self._novo_job(True)
+                if not job['ativo']:
+                    continue  # Parado durante o ciclo
+                job['ultimo_ciclo'] = agora
+                job['projetos_notificados'] += notificados.get(user_id, 0)
+                atualizados.append((user_id, dict(job)))
+        for user_id, job in atualizados:
+            self._publicar(user_id, job)
+
+    def status(self, user_id, ativo_no_banco=None):
+        """
+        Retorna uma cópia do estado do job. Com `ativo_no_banco` (o `User.bot_ativo` já
+        carregado), a entrada é criada ou recriada sempre que divergir do banco: outro
+        worker do gunicorn pode ter iniciado ou parado o bot do usuário.
+        """
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if job is None or (ativo_no_banco is not None and job['ativo'] != bool(ativo_no_banco)):
+                job = self._jobs[user_id] = self._novo_job(bool(ativo_no_banco))
+            job = dict(job)
+        job['status'] = self.STATUS_ATIVO if job['ativo'] else self.STATUS_PARADO
+        return job
+
+    def ativos(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['ativo'])
@@ -0,0 +1,105 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from . import db
+from .models import BaldeDeLogin
+
+logger = logging.getLogger(__name__)
+
+# Cada tentativa de login consome um token do IP e um do nome de usuário; os baldes se
+# recarregam por completo em LOGIN_JANELA_S segundos.
+LOGIN_TENTATIVAS_POR_IP = int(os.getenv('LOGIN_TENTATIVAS_POR_IP', 20))
+LOGIN_TENTATIVAS_POR_USUARIO = int(os.getenv('LOGIN_TENTATIVAS_POR_USUARIO', 5))
+LOGIN_JANELA_S = float(os.getenv('LOGIN_JANELA_S', 300))
+LOGIN_MAX_BALDES = int(os.getenv('LOGIN_MAX_BALDES', 10000))  # Baldes mantidos em memória por processo
+
+
+class BaldesEmMemoria:
+    """
+    Token buckets das tentativas de login no próprio processo. Com vários workers do
+    gunicorn cada um tem seus baldes; use BaldesNoBanco para um limite do deploy inteiro.
+    """
+
+    def __init__(self, max_baldes=LOGIN_MAX_BALDES):
+        self.max_baldes = max_baldes
+        self._baldes = OrderedDict()  # chave -> (tokens, time.monotonic() da última tentativa)
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, capacidade, taxa, agora=None):
+        """Retira um token do balde `chave`. Retorna 0 se havia token ou os segundos até o próximo."""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            tokens, atualizado_em = self._baldes.pop(chave, (capacidade, agora))
+            tokens = min(capacidade, tokens + (agora - atualizado_em) * taxa)
+            espera = 0 if tokens >= 1 else (1 - tokens) / taxa
+            if not espera:
+                tokens -= 1
+            self._baldes[chave] = (tokens, agora)
+            while len(self._baldes) > self.max_baldes:
+                self._baldes.popitem(last=False)  # O balde parado há mais tempo
+            return espera
+
+
+class BaldesNoBanco:
+    """
+    Token buckets das tentativas de login na tabela `baldes_login`, compartilhados por
+    todos os processos. Se o banco falhar, a tentativa é liberada.
+    """
+
+    def consumir(self, chave, capacidade, taxa):
+        try:
+            return BaldeDeLogin.consumir(chave, capacidade, taxa)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao consultar o limite de login de {chave}: {e}")
+            return 0
+
+
+class LimitadorDeLogin:
+    """
+    Limite de tentativas de login por IP e por nome de usuário, verificado antes da
+    consulta do usuário e do hash da senha: quem passou do limite recebe a resposta
+    sem custo de CPU para o worker.
+    """
+
+    def __init__(self, baldes, por_ip=LOGIN_TENTATIVAS_POR_IP, por_usuario=LOGIN_TENTATIVAS_POR_USUARIO,
+                 janela_s=LOGIN_JANELA_S):
+        self.baldes = baldes
+        self.por_ip = por_ip
+        self.por_usuario = por_usuario
+        self.janela_s = janela_s
+        self.permitidas = 0
+        self.rejeitadas = 0
+
+    def verificar(self, ip, username):
+        """
+        Registra uma tentativa de `username` vinda de `ip`. Retorna 0 se ela pode
+        prosseguir ou os segundos que o cliente deve esperar.
+        """
+        espera = self.baldes.consumir(f'ip:{ip}', self.por_ip, self.por_ip / self.janela_s)
+        if not espera:
+            usuario = (username or '').strip().lower()
+            espera = self.baldes.consumir(f'usuario:{usuario}', self.por_usuario, self.por_usuario / self.janela_s)
+        if espera:
+            self.rejeitadas += 1
+        else:
+            self.permitidas += 1
+        return espera
+
+    def estatisticas(self):
+        return {
+            'backend': type(self.baldes).__name__,
+            'permitidas': self.permitidas,
+            'rejeitadas': self.rejeitadas,
+        }
+
+
+def obter_limitador_de_login(app):
+    """Limitador de login da aplicação, criado na primeira chamada com o backend de LIMITE_LOGIN_BACKEND."""
+    limitador = app.extensions.get('limite_login')
+    if limitador is None:
+        baldes = BaldesNoBanco() if app.config.get('LIMITE_LOGIN_BACKEND') == 'banco' else BaldesEmMemoria()
+        limitador = app.extensions['limite_login'] = LimitadorDeLogin(baldes)
+    return limitador
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+from lxml import etree
+
+# Data de referência dos carimbos cp-datetime, em milissegundos
+EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Consultas compiladas uma única vez, reaproveitadas em todas as páginas. O contains() só
+# pré-seleciona os itens; a classe exata é conferida em Python (ver _tem_classe)
+XPATH_ITENS = etree.XPath('//li[contains(@class, "result-item")]')
+XPATH_TITULOS = etree.XPath('//h1[contains(@class, "title")]')  # Layout sem <li class="result-item">
+
+
+def _texto(elemento):
+    """Texto do elemento e dos descendentes, sem o tail (mais barato que XPath string())."""
+    if not len(elemento):
+        return elemento.text or ''
+    return etree.tostring(elemento, method='text', encoding=str, with_tail=False)
+
+
+def _tem_classe(classe, nome):
+    # A busca na string descarta a maioria dos elementos antes de separar as classes
+    return classe is not None and nome in classe and nome in classe.split()
+
+
+def _ler_informacao(projeto, informacao):
+    """
+    Lê propostas e orçamento da linha "Categoria | Orçamento: ... | Propostas: N | ...",
+    com buscas simples no texto em vez de expressões regulares.
+    """
+    inicio = informacao.find('Propostas:')
+    if inicio >= 0:
+        inicio += len('Propostas:')
+        valor = informacao[inicio:inicio + 20].split(None, 1)  # Só o trecho do número
+        if valor and valor[0].isdigit():
+            projeto['propostas'] = int(valor[0])
+    inicio = informacao.find('Orçamento:')
+    if inicio >= 0:
+        fim = informacao.find('|', inicio)
+        valor = informacao[inicio + len('Orçamento:'):fim if fim >= 0 else None]
+        projeto['orcamento'] = ' '.join(valor.split()) or None
+
+
+def extrair_projetos(conteudo):
+    """
+    Extrai os projetos de uma página de listagem do 99Freelas.
+    Cada projeto é um dicionário com titulo, link, publicado_em, propostas e orcamento
+    (os três últimos podem ser None quando a página não os informa).
+    """
+    # etree.HTML devolve elementos simples, sem o custo das classes de lxml.html
+    return extrair_projetos_da_arvore(etree.HTML(conteudo))
+
+
+def _extrair_item(item):
+    """
+    Percorre o nó de um projeto uma única vez, coletando título, link, data de publicação,
+    propostas e orçamento apenas dos elementos dentro dele. Retorna None se o nó não tiver
+    título ou link.
+    """
+    projeto = {'titulo': None, 'link': None, 'publicado_em': None, 'propostas': None, 'orcamento': None}
+    titulo = informacao = data = False
+    for elemento in item.iter('h1', 'p', 'b'):
+        tag = elemento.tag
+        if tag == 'h1':
+            if not titulo and _tem_classe(elemento.get('class'), 'title'):
+                titulo = True
+                ancora = elemento.find('a')
+                if ancora is not None:
+                    projeto['titulo'] = _texto(ancora).strip()
+                    projeto['link'] = ancora.get('href')
+        elif tag == 'p':
+            if not informacao and _tem_classe(elemento.get('class'), 'information'):
+                informacao = True
+                _ler_informacao(projeto, _texto(elemento))
+        elif not data:
+            carimbo = elemento.get('cp-datetime')
+            if carimbo and carimbo.isdigit():
+                data = True
+                projeto['publicado_em'] = EPOCA + timedelta(milliseconds=int(carimbo))
+        if titulo and informacao and data:
+            break  # A descrição e o restante do item não têm mais campos da listagem
+    if not projeto['titulo'] or not projeto['link']:
+        return None
+    return projeto
+
+
+def extrair_projetos_da_arvore(tree):
+    """
+    Extrai os projetos de uma página já interpretada pelo lxml. Cada <li class="result-item">
+    é lido isoladamente, então informações de fora dele (barra lateral, outros itens) nunca
+    são atribuídas ao projeto. Sem esses itens, cada <h1 class="title"> vira um projeto só
+    com título e link.
+    """
+    if tree is None:
+        return []
+    itens = [item for item in XPATH_ITENS(tree) if _tem_classe(item.get('class'), 'result-item')]
+    if not itens:
+        itens = [titulo for titulo in XPATH_TITULOS(tree) if _tem_classe(titulo.get('class'), 'title')]
+    projetos = []
+    for item in itens:
+        projeto = _extrair_item(item)
+        if projeto is not None:
+            projetos.append(projeto)
+    return projetos
+
+
+def filtrar_projetos(projetos, max_idade=None, max_propostas=None, agora=None):
+    """
+    Descarta projetos publicados há mais de `max_idade` (timedelta) ou com mais de
+    `max_propostas` propostas. Projetos sem a informação correspondente são mantidos.
+    """
+    if max_idade is None and max_propostas is None:
+        return projetos
+    agora = agora or datetime.now(timezone.utc)
+    return [
+        projeto for projeto in projetos
+        if not (max_idade is not None and projeto.get('publicado_em') and agora - projeto['publicado_em'] > max_idade)
+        and not (max_propostas is not None and projeto.get('propostas') is not None and projeto['propostas'] > max_propostas)
+    ]
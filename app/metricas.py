@@ -0,0 +1,147 @@
+import os
+import bisect
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_CONTAGEM = (0, 1, 2, 5, 10, 20, 50, 100)
+MAX_LOGS_DO_BOT = int(os.getenv('MAX_LOGS_DO_BOT', 500))  # Eventos mantidos no log circular do bot
+
+
+def _formatar_labels(labels, extra=()):
+    pares = list(labels) + list(extra)
+    if not pares:
+        return ''
+    escapar = lambda valor: str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _formatar_valor(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exportar_medidores(medidores):
+    """Gauges no formato de texto do Prometheus: nome -> (ajuda, valor)."""
+    linhas = []
+    for nome, (ajuda, valor) in medidores.items():
+        linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} gauge', f'{nome} {_formatar_valor(valor)}']
+    return ''.join(linha + '\n' for linha in linhas)
+
+
+def filtrar_eventos(eventos, limite=100, nivel_minimo=logging.DEBUG):
+    """Os primeiros `limite` eventos de `eventos` com nível a partir de `nivel_minimo`."""
+    filtrados = [evento for evento in eventos if logging.getLevelName(evento['nivel']) >= nivel_minimo]
+    return filtrados[:limite]
+
+
+class Metricas:
+    """
+    Contadores e histogramas do processo, em memória, exportados no formato de texto do
+    Prometheus ou como dicionário. Cada série é identificada pelo nome e pelos labels.
+    """
+
+    def __init__(self):
+        self._tipos = {}  # nome -> ('counter' | 'histogram', ajuda, buckets)
+        self._series = {}  # nome -> {labels: valor ou [contagens por bucket, soma, total]}
+        self._lock = threading.Lock()
+
+    def declarar_contador(self, nome, ajuda):
+        self._tipos.setdefault(nome, ('counter', ajuda, None))
+        self._series.setdefault(nome, {})
+
+    def declarar_histograma(self, nome, ajuda, buckets=BUCKETS_SEGUNDOS):
+        self._tipos.setdefault(nome, ('histogram', ajuda, tuple(buckets)))
+        self._series.setdefault(nome, {})
+
+    def incrementar(self, nome, valor=1, **labels):
+        chave = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series[nome]
+            series[chave] = series.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **labels):
+        buckets = self._tipos[nome][2]
+        chave = tuple(sorted(labels.items()))
+        with self._lock:
+            serie = self._series[nome].get(chave)
+            if serie is None:
+                serie = self._series[nome][chave] = [[0] * len(buckets), 0.0, 0]
+            posicao = bisect.bisect_left(buckets, valor)
+            if posicao < len(buckets):
+                serie[0][posicao] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self, medidores=None):
+        """
+        Texto no formato de exposição do Prometheus. `medidores` acrescenta gauges
+        calculados por quem chama: nome -> (ajuda, valor).
+        """
+        linhas = []
+        with self._lock:
+            for nome, (tipo, ajuda, buckets) in self._tipos.items():
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+                for labels, serie in sorted(self._series[nome].items()):
+                    if tipo == 'counter':
+                        linhas.append(f'{nome}{_formatar_labels(labels)} {_formatar_valor(serie)}')
+                        continue
+                    acumulado = 0
+                    for limite, contagem in zip(buckets, serie[0]):
+                        acumulado += contagem
+                        linhas.append(f'{nome}_bucket{_formatar_labels(labels, [("le", limite)])} {acumulado}')
+                    linhas.append(f'{nome}_bucket{_formatar_labels(labels, [("le", "+Inf")])} {serie[2]}')
+                    linhas.append(f'{nome}_sum{_formatar_labels(labels)} {_formatar_valor(serie[1])}')
+                    linhas.append(f'{nome}_count{_formatar_labels(labels)} {serie[2]}')
+        return ''.join(linha + '\n' for linha in linhas) + exportar_medidores(medidores or {})
+
+    def como_dict(self):
+        """Resumo das séries para o painel do admin: contadores e contagem/soma/média dos histogramas."""
+        resultado = {}
+        with self._lock:
+            for nome, (tipo, _, _) in self._tipos.items():
+                for labels, serie in sorted(self._series[nome].items()):
+                    chave = nome + _formatar_labels(labels)
+                    if tipo == 'counter':
+                        resultado[chave] = serie
+                    else:
+                        resultado[chave] = {
+                            'total': serie[2],
+                            'soma': round(serie[1], 4),
+                            'media': round(serie[1] / serie[2], 4) if serie[2] else None,
+                        }
+        return resultado
+
+
+class LogCircular:
+    """
+    Últimos eventos estruturados do bot (dicts com instante, nível, evento e campos), em um
+    buffer de tamanho fixo. Cada evento também é enviado ao logging do módulo.
+    """
+
+    def __init__(self, max_eventos=MAX_LOGS_DO_BOT):
+        self._eventos = deque(maxlen=max_eventos)
+        self._lock = threading.Lock()
+
+    def registrar(self, nivel, evento, **campos):
+        registro = {
+            'quando': datetime.now(timezone.utc).isoformat(),
+            'nivel': logging.getLevelName(nivel),
+            'evento': evento,
+            **campos,
+        }
+        with self._lock:
+            self._eventos.append(registro)
+        logger.log(nivel, f"{evento}: {campos}")
+
+    def recentes(self, limite=100, nivel_minimo=logging.DEBUG):
+        """Eventos mais recentes primeiro, a partir de `nivel_minimo`."""
+        with self._lock:
+            eventos = list(self._eventos)
+        return filtrar_eventos(reversed(eventos), limite, nivel_minimo)
+
+    def __len__(self):
+        return len(self._eventos)
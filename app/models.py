@@ -2,10 +2,42 @@ from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
 from datetime import datetime, timezone, timedelta
+from hashlib import blake2b
+import time
+import json
+import secrets
+
+def _insert_do_dialeto(modelo, registros):
+    """INSERT de várias linhas com suporte a ON CONFLICT, ou None se o banco não tiver essa cláusula."""
+    dialeto = db.session.get_bind().dialect
+    if dialeto.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(modelo).values(registros)
+    if dialeto.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(modelo).values(registros)
+    return None
+
+
+def _insert_ignorando_conflitos(modelo, registros, colunas_unicas):
+    """
+    Monta um INSERT de várias linhas que ignora conflitos no índice único `colunas_unicas`
+    quando o banco suporta ON CONFLICT (PostgreSQL e SQLite).
+    """
+    stmt = _insert_do_dialeto(modelo, registros)
+    if stmt is None:
+        return db.insert(modelo).values(registros)
+    return stmt.on_conflict_do_nothing(index_elements=colunas_unicas)
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
+    # Modos de entrega das notificações
+    MODO_INSTANTANEO = 'instantaneo'  # Uma mensagem por projeto
+    MODO_RESUMO = 'resumo'  # Um resumo com todos os projetos do ciclo
+    MODOS_NOTIFICACAO = (MODO_INSTANTANEO, MODO_RESUMO)
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(150), unique=True, nullable=False, index=True)
     email = db.Column(db.String(150), unique=True, nullable=False, index=True)
@@ -13,7 +45,10 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(512), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
     is_subscriber = db.Column(db.Boolean, default=False)  # Campo para status de assinante
-    chat_id = db.Column(db.String(50), nullable=True)
+    chat_id = db.Column(db.String(50), nullable=True, index=True)  # Buscado pelo webhook em /stop e /status
+    bot_ativo = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # Verificação ligada
+    modo_notificacao = db.Column(db.String(20), nullable=False, default=MODO_INSTANTANEO, server_default=MODO_INSTANTANEO)
+    keywords_versao = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Muda a cada alteração das palavras-chave
     keywords = db.relationship('Keyword', backref='user', lazy=True, cascade="all, delete-orphan")
 
     def set_password(self, password):
@@ -24,6 +59,10 @@ class User(UserMixin, db.Model):
         """Verifica se a senha informada corresponde ao hash armazenado."""
         return check_password_hash(self.password_hash, password)
 
+    def marcar_keywords_alteradas(self):
+        """Incrementa a versão das palavras-chave para que o bot em execução recarregue o índice."""
+        self.keywords_versao = User.keywords_versao + 1
+
     def set_phone_number(self, phone_number):
         """Define ou atualiza o número de telefone, adicionando o código do país '55' se necessário."""
         if phone_number and not phone_number.startswith('55'):
@@ -33,9 +72,57 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+    @staticmethod
+    def listar_para_admin(busca=None, is_subscriber=None, is_admin=None, apos_id=None, limite=50):
+        """
+        Lista os usuários para o painel do admin em uma única consulta, paginada por
+        chave (id > apos_id), com total de palavras-chave, total de projetos e data do
+        último projeto encontrado calculados por subconsultas correlacionadas sobre os índices por user_id.
+        Retorna (linhas, próximo apos_id ou None).
+        """
+        total_keywords = (
+            db.select(db.func.count(Keyword.id))
+            .where(Keyword.user_id == User.id)
+            .correlate(User).scalar_subquery()
+        )
+        total_projetos = (
+            db.select(db.func.count(UserMatch.project_id))
+            .where(UserMatch.user_id == User.id)
+            .correlate(User).scalar_subquery()
+        )
+        ultimo_projeto = (
+            db.select(db.func.max(UserMatch.matched_at))
+            .where(UserMatch.user_id == User.id)
+            .correlate(User).scalar_subquery()
+        )
+        consulta = db.select(
+            User.id, User.username, User.email, User.is_admin, User.is_subscriber, User.bot_ativo,
+            total_keywords.label('total_keywords'),
+            total_projetos.label('total_projetos'),
+            ultimo_projeto.label('ultimo_projeto'),
+        )
+        if busca:
+            padrao = f"%{busca.strip()}%"
+            consulta = consulta.where(db.or_(User.username.ilike(padrao), User.email.ilike(padrao)))
+        # As colunas aceitam NULL em registros antigos, tratados como False
+        if is_subscriber is not None:
+            consulta = consulta.where(db.func.coalesce(User.is_subscriber, db.false()) == is_subscriber)
+        if is_admin is not None:
+            consulta = consulta.where(db.func.coalesce(User.is_admin, db.false()) == is_admin)
+        if apos_id is not None:
+            consulta = consulta.where(User.id > apos_id)
+
+        # Busca um registro a mais para saber se existe próxima página
+        linhas = db.session.execute(consulta.order_by(User.id).limit(limite + 1)).all()
+        proximo = linhas[limite - 1].id if len(linhas) > limite else None
+        return linhas[:limite], proximo
+
 
 class Keyword(db.Model):
     __tablename__ = 'keywords'
+    __table_args__ = (
+        db.Index('ix_keywords_user_id_keyword', 'user_id', 'keyword', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     keyword = db.Column(db.String(50), nullable=False)
@@ -49,6 +136,44 @@ class Keyword(db.Model):
         """Método para limpar e formatar a palavra-chave antes de armazenar."""
         return keyword.strip().lower()
 
+    @staticmethod
+    def normalizar_lista(keywords):
+        """
+        Limpa as palavras-chave em uma única passada, preservando a ordem.
+        Retorna (válidas sem repetição, repetidas na própria lista, inválidas).
+        Itens que não são strings (null, números, objetos do JSON) contam como inválidos.
+        """
+        tamanho_maximo = Keyword.keyword.type.length
+        validas = {}
+        repetidas = invalidas = 0
+        for keyword in keywords:
+            keyword = Keyword.clean_keyword(keyword) if isinstance(keyword, str) else None
+            if not keyword or len(keyword) > tamanho_maximo:
+                invalidas += 1
+            elif keyword in validas:
+                repetidas += 1
+            else:
+                validas[keyword] = None
+        return list(validas), repetidas, invalidas
+
+    @staticmethod
+    def inserir_em_lote(user_id, keywords):
+        """
+        Normaliza as palavras-chave e insere as novas em um único INSERT, ignorando as que o
+        usuário já possui pelo índice único (user_id, keyword). Não faz commit.
+        Retorna um dicionário com as contagens 'inseridas', 'duplicadas' e 'invalidas'.
+        """
+        validas, repetidas, invalidas = Keyword.normalizar_lista(keywords)
+        inseridas = 0
+        if validas:
+            stmt = _insert_ignorando_conflitos(
+                Keyword, [{'keyword': keyword, 'user_id': user_id} for keyword in validas], ['user_id', 'keyword'])
+            if db.session.get_bind().dialect.insert_returning:
+                inseridas = len(db.session.execute(stmt.returning(Keyword.id)).all())
+            else:
+                inseridas = db.session.execute(stmt).rowcount
+        return {'inseridas': inseridas, 'duplicadas': repetidas + len(validas) - inseridas, 'invalidas': invalidas}
+
     def save(self):
         """Salva a palavra-chave no banco de dados."""
         self.keyword = Keyword.clean_keyword(self.keyword)
@@ -57,13 +182,17 @@ class Keyword(db.Model):
 
 
 class Project(db.Model):
+    """Catálogo global de projetos do 99Freelas: um registro por link, compartilhado por todos os usuários."""
     __tablename__ = 'projects'
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
-    link = db.Column(db.String(255), nullable=False)
-    date_added = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))  # Garantindo que o fuso horário seja UTC
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    link = db.Column(db.String(255), nullable=False, unique=True, index=True)
+    published_at = db.Column(db.DateTime, nullable=True)  # Data de publicação informada pela listagem
+    proposals = db.Column(db.Integer, nullable=True)
+    budget = db.Column(db.String(100), nullable=True)
+    date_added = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)  # Garantindo que o fuso horário seja UTC
+    matches = db.relationship('UserMatch', backref='project', lazy=True, passive_deletes=True)
 
     def __repr__(self):
         return f'<Project {self.title}>'
@@ -71,13 +200,437 @@ class Project(db.Model):
     @staticmethod
     def delete_old_projects():
         """
-        Exclui projetos que foram adicionados há mais de 12 horas de uma vez.
+        Exclui projetos que foram adicionados há mais de 12 horas de uma vez,
+        junto com as correspondências dos usuários.
         """
         threshold_time = datetime.now(timezone.utc) - timedelta(hours=12)
-        Project.query.filter(Project.date_added < threshold_time).delete()
+        antigos = db.select(Project.id).where(Project.date_added < threshold_time)
+        UserMatch.query.filter(UserMatch.project_id.in_(antigos)).delete(synchronize_session=False)
+        Project.query.filter(Project.date_added < threshold_time).delete(synchronize_session=False)
         db.session.commit()
 
+    @staticmethod
+    def registrar_em_lote(projetos):
+        """
+        Grava os projetos no catálogo em um único INSERT ... ON CONFLICT (link) DO UPDATE,
+        atualizando título, propostas e orçamento dos que já existem.
+        Retorna o dicionário link -> id. Não faz commit.
+        """
+        registros = {
+            projeto['link']: {
+                'title': projeto['titulo'][:255],
+                'link': projeto['link'],
+                'published_at': projeto.get('publicado_em'),
+                'proposals': projeto.get('propostas'),
+                'budget': (projeto.get('orcamento') or '')[:100] or None,
+            }
+            for projeto in projetos
+        }
+        if not registros:
+            return {}
+        stmt = _insert_do_dialeto(Project, list(registros.values()))
+        if stmt is not None and db.session.get_bind().dialect.insert_returning:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['link'],
+                set_={coluna: stmt.excluded[coluna] for coluna in ('title', 'proposals', 'budget')},
+            )
+            return {link: project_id for project_id, link in db.session.execute(stmt.returning(Project.id, Project.link))}
+
+        # Bancos sem ON CONFLICT: insere apenas os links que ainda não estão no catálogo
+        consulta = db.select(Project.link, Project.id).where(Project.link.in_(registros))
+        ids = dict(db.session.execute(consulta).all())
+        faltantes = [registro for link, registro in registros.items() if link not in ids]
+        if faltantes:
+            db.session.execute(db.insert(Project).values(faltantes))
+            ids = dict(db.session.execute(consulta).all())
+        return ids
+
     def save(self):
         """Salva o projeto no banco de dados."""
         db.session.add(self)
         db.session.commit()
+
+
+class UserMatch(db.Model):
+    """Projeto do catálogo encontrado para um usuário, com a palavra-chave que correspondeu."""
+    __tablename__ = 'user_matches'
+    __table_args__ = (
+        db.Index('ix_user_matches_user_id_matched_at', 'user_id', 'matched_at'),
+        db.Index('ix_user_matches_project_id', 'project_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    matched_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    keyword_id = db.Column(db.Integer, db.ForeignKey('keywords.id', ondelete='SET NULL'), nullable=True)
+
+    def __repr__(self):
+        return f'<UserMatch {self.user_id}:{self.project_id}>'
+
+    @staticmethod
+    def inserir_em_lote(correspondencias):
+        """
+        Insere as correspondências (dicionários com user_id, project_id e keyword_id) em um
+        único INSERT, ignorando as que já existem. Não faz commit.
+        """
+        if not correspondencias:
+            return
+        agora = datetime.now(timezone.utc)
+        registros = [dict(correspondencia, matched_at=agora) for correspondencia in correspondencias]
+        db.session.execute(_insert_ignorando_conflitos(UserMatch, registros, ['user_id', 'project_id']))
+
+
+class LinkVisto(db.Model):
+    """
+    Links já notificados, guardados como um hash de 64 bits de (user_id, link).
+    Sobrevivem à limpeza de `projects` e expiram após TTL_LINKS_VISTOS_HORAS.
+    """
+    __tablename__ = 'links_vistos'
+
+    hash = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    visto_em = db.Column(db.DateTime, nullable=False, index=True, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<LinkVisto {self.hash}>'
+
+    @staticmethod
+    def calcular_hash(user_id, link):
+        """Hash estável de 64 bits (com sinal, para caber em BIGINT) do par (user_id, link)."""
+        digest = blake2b(f'{user_id}:{link}'.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big', signed=True)
+
+    @staticmethod
+    def existentes(hashes):
+        """Retorna, em uma única consulta pela chave primária, os hashes já gravados."""
+        if not hashes:
+            return set()
+        return set(db.session.scalars(db.select(LinkVisto.hash).where(LinkVisto.hash.in_(hashes))))
+
+    @staticmethod
+    def inserir_em_lote(hashes):
+        """
+        Grava os hashes em um único INSERT, ignorando os que já existem.
+        Retorna o conjunto efetivamente inserido. Não faz commit.
+        """
+        if not hashes:
+            return set()
+        agora = datetime.now(timezone.utc)
+        stmt = _insert_ignorando_conflitos(LinkVisto, [{'hash': h, 'visto_em': agora} for h in hashes], ['hash'])
+        if db.session.get_bind().dialect.insert_returning:
+            return set(db.session.scalars(stmt.returning(LinkVisto.hash)))
+        db.session.execute(stmt)
+        return set(hashes)
+
+    @staticmethod
+    def delete_expired(ttl_horas):
+        """Exclui os links vistos há mais de `ttl_horas` horas."""
+        limite = datetime.now(timezone.utc) - timedelta(hours=ttl_horas)
+        LinkVisto.query.filter(LinkVisto.visto_em < limite).delete()
+        db.session.commit()
+
+
+class TarefaAgendada(db.Model):
+    """
+    Lease das tarefas periódicas (APScheduler). Cada processo tenta reivindicar a próxima
+    execução com um UPDATE condicional; só quem consegue executa, então a tarefa roda uma vez
+    por intervalo no deploy inteiro, em PostgreSQL ou SQLite.
+    """
+    __tablename__ = 'tarefas_agendadas'
+
+    nome = db.Column(db.String(100), primary_key=True)
+    proxima_execucao = db.Column(db.DateTime, nullable=False)
+    executada_por = db.Column(db.String(100), nullable=True)  # host:pid de quem reivindicou por último
+    ultima_execucao = db.Column(db.DateTime, nullable=True)
+    ultima_duracao_s = db.Column(db.Float, nullable=True)
+    ultimo_erro = db.Column(db.String(255), nullable=True)
+
+    def __repr__(self):
+        return f'<TarefaAgendada {self.nome}>'
+
+    @staticmethod
+    def reivindicar(nome, intervalo, dono, agora=None):
+        """
+        Reivindica a execução da tarefa se ela estiver vencida, adiando a próxima para
+        agora + `intervalo` (timedelta). Retorna True para quem deve executar. Faz commit.
+        """
+        agora = agora or datetime.now(timezone.utc)
+        db.session.execute(_insert_ignorando_conflitos(
+            TarefaAgendada, [{'nome': nome, 'proxima_execucao': agora}], ['nome']))
+        resultado = db.session.execute(
+            db.update(TarefaAgendada)
+            .where(TarefaAgendada.nome == nome, TarefaAgendada.proxima_execucao <= agora)
+            .values(proxima_execucao=agora + intervalo, executada_por=dono)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    @staticmethod
+    def assumir_lideranca(nome, duracao, dono, agora=None):
+        """
+        Lease renovável: `dono` assume a tarefa `nome` por `duracao` (timedelta) se ela
+        estiver livre ou vencida, ou renova o lease que já é seu. Retorna True enquanto
+        `dono` for o líder. Faz commit.
+        """
+        agora = agora or datetime.now(timezone.utc)
+        db.session.execute(_insert_ignorando_conflitos(
+            TarefaAgendada, [{'nome': nome, 'proxima_execucao': agora}], ['nome']))
+        resultado = db.session.execute(
+            db.update(TarefaAgendada)
+            .where(TarefaAgendada.nome == nome,
+                   db.or_(TarefaAgendada.proxima_execucao <= agora, TarefaAgendada.executada_por == dono))
+            .values(proxima_execucao=agora + duracao, executada_por=dono)
+        )
+        db.session.commit()
+        return resultado.rowcount == 1
+
+    @staticmethod
+    def liberar(nome, dono, agora=None):
+        """Devolve o lease de `dono` para que outro processo assuma sem esperar o vencimento. Faz commit."""
+        db.session.execute(
+            db.update(TarefaAgendada)
+            .where(TarefaAgendada.nome == nome, TarefaAgendada.executada_por == dono)
+            .values(proxima_execucao=agora or datetime.now(timezone.utc))
+        )
+        db.session.commit()
+
+    @staticmethod
+    def registrar_execucao(nome, inicio, duracao, erro=None):
+        """Grava o início, a duração e o erro (se houver) da última execução. Faz commit."""
+        db.session.execute(
+            db.update(TarefaAgendada)
+            .where(TarefaAgendada.nome == nome)
+            .values(ultima_execucao=inicio, ultima_duracao_s=duracao, ultimo_erro=erro[:255] if erro else None)
+        )
+        db.session.commit()
+
+
+class EstadoDoBot(db.Model):
+    """
+    Última fotografia das métricas, dos logs e das estatísticas do runtime do bot, gravada
+    periodicamente pelo processo líder. Os demais processos (o web com o bot no worker,
+    outros workers do gunicorn) leem daqui em vez de criar um verificador vazio.
+    """
+    __tablename__ = 'estado_do_bot'
+
+    nome = db.Column(db.String(100), primary_key=True)
+    processo = db.Column(db.String(100), nullable=False)  # host:pid de quem gravou
+    atualizado_em = db.Column(db.DateTime, nullable=False)
+    dados = db.Column(db.Text, nullable=False)  # JSON
+
+    def __repr__(self):
+        return f'<EstadoDoBot {self.nome}>'
+
+    @staticmethod
+    def gravar(nome, processo, dados, agora=None):
+        """Substitui a fotografia `nome` por `dados` (serializáveis em JSON). Faz commit."""
+        agora = agora or datetime.now(timezone.utc)
+        valores = {'processo': processo, 'atualizado_em': agora, 'dados': json.dumps(dados, default=str)}
+        db.session.execute(_insert_ignorando_conflitos(EstadoDoBot, [{'nome': nome, **valores}], ['nome']))
+        db.session.execute(db.update(EstadoDoBot).where(EstadoDoBot.nome == nome).values(**valores))
+        db.session.commit()
+
+    @staticmethod
+    def ler(nome):
+        """
+        Retorna os dados da fotografia `nome` com `atualizado_em` (UTC) e `processo`,
+        ou None se ela ainda não foi gravada.
+        """
+        estado = db.session.get(EstadoDoBot, nome, populate_existing=True)
+        if estado is None:
+            return None
+        atualizado_em = estado.atualizado_em
+        if atualizado_em.tzinfo is None:
+            atualizado_em = atualizado_em.replace(tzinfo=timezone.utc)
+        return dict(json.loads(estado.dados), atualizado_em=atualizado_em, processo=estado.processo)
+
+
+class BaldeDeLogin(db.Model):
+    """
+    Token bucket das tentativas de login, compartilhado entre processos. A chave identifica
+    o IP ou o nome de usuário; `tokens` é o saldo no instante `atualizado_em` (epoch em
+    segundos, para que a recarga seja calculada no próprio UPDATE em PostgreSQL ou SQLite).
+    """
+    __tablename__ = 'baldes_login'
+
+    chave = db.Column(db.String(200), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    atualizado_em = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<BaldeDeLogin {self.chave}>'
+
+    @staticmethod
+    def consumir(chave, capacidade, taxa, agora=None):
+        """
+        Retira um token do balde `chave` (recarregado a `taxa` tokens por segundo até
+        `capacidade`) com um UPDATE condicional. Retorna 0 se havia token ou os segundos
+        até o próximo. Faz commit.
+        """
+        agora = time.time() if agora is None else agora
+        db.session.execute(_insert_ignorando_conflitos(
+            BaldeDeLogin, [{'chave': chave, 'tokens': capacidade, 'atualizado_em': agora}], ['chave']))
+        recarregado = BaldeDeLogin.tokens + (agora - BaldeDeLogin.atualizado_em) * taxa
+        disponivel = db.case((recarregado > capacidade, capacidade), else_=recarregado)
+        resultado = db.session.execute(
+            db.update(BaldeDeLogin)
+            .where(BaldeDeLogin.chave == chave, disponivel >= 1)
+            .values(tokens=disponivel - 1, atualizado_em=agora)
+        )
+        db.session.commit()
+        if resultado.rowcount == 1:
+            return 0
+        balde = db.session.get(BaldeDeLogin, chave, populate_existing=True)
+        return max(0.0, (1 - balde.tokens) / taxa - (agora - balde.atualizado_em))
+
+    @staticmethod
+    def delete_expired(idade_s):
+        """Exclui os baldes sem tentativas há mais de `idade_s` segundos (já estariam cheios)."""
+        BaldeDeLogin.query.filter(BaldeDeLogin.atualizado_em < time.time() - idade_s).delete()
+        db.session.commit()
+
+
+class NotificacaoPendente(db.Model):
+    """
+    Caixa de saída das mensagens do Telegram. As linhas são gravadas na mesma transação
+    que as correspondências (ou a associação do chat, no webhook) e só são excluídas depois
+    do envio, então uma reinicialização no meio do ciclo não perde notificações: a entrega
+    é "pelo menos uma vez". Itens de `resumo` são agrupados por chat no envio.
+    """
+    __tablename__ = 'notificacoes_pendentes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.String(100), nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    resumo = db.Column(db.Boolean, nullable=False, default=False)
+    criada_em = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, index=True)
+    reservada_por = db.Column(db.String(100), nullable=True)  # Lote que está enviando a mensagem
+    reservada_ate = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<NotificacaoPendente {self.id} {self.chat_id}>'
+
+    @staticmethod
+    def enfileirar_em_lote(mensagens):
+        """
+        Grava as mensagens (dicts com chat_id, texto e, opcionalmente, resumo) em um único
+        INSERT. Não faz commit: quem chama confirma junto com o restante da transação.
+        """
+        if not mensagens:
+            return
+        agora = datetime.now(timezone.utc)
+        db.session.execute(db.insert(NotificacaoPendente).values([
+            {
+                'chat_id': str(mensagem['chat_id']),
+                'texto': mensagem['texto'],
+                'resumo': mensagem.get('resumo', False),
+                'criada_em': agora,
+                'tentativas': 0,
+                'proxima_tentativa': agora,
+            }
+            for mensagem in mensagens
+        ]))
+
+    @staticmethod
+    def reservar(lote, limite, duracao, incluir_resumos=True, agora=None):
+        """
+        Reserva até `limite` mensagens vencidas e livres para o lote `lote` por `duracao`
+        (timedelta), com um UPDATE condicional, e as retorna em ordem de criação. Reservas
+        vencidas voltam a ficar livres, então um processo que morreu no meio do envio não
+        prende as mensagens. Faz commit.
+        """
+        agora = agora or datetime.now(timezone.utc)
+        livre = db.and_(
+            NotificacaoPendente.proxima_tentativa <= agora,
+            db.or_(NotificacaoPendente.reservada_ate.is_(None), NotificacaoPendente.reservada_ate < agora),
+        )
+        if not incluir_resumos:
+            livre = db.and_(livre, NotificacaoPendente.resumo.is_(False))
+        ids = db.select(NotificacaoPendente.id).where(livre).order_by(NotificacaoPendente.id).limit(limite)
+        db.session.execute(
+            db.update(NotificacaoPendente)
+            .where(NotificacaoPendente.id.in_(ids.scalar_subquery()), livre)
+            .values(reservada_por=lote, reservada_ate=agora + duracao)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return NotificacaoPendente.query.filter_by(reservada_por=lote).order_by(NotificacaoPendente.id).all()
+
+    @staticmethod
+    def concluir(ids):
+        """Exclui as mensagens entregues (ou descartadas). Faz commit."""
+        if ids:
+            NotificacaoPendente.query.filter(NotificacaoPendente.id.in_(ids)).delete()
+            db.session.commit()
+
+    @staticmethod
+    def adiar(ids, max_tentativas, espera_inicial, agora=None):
+        """
+        Libera as mensagens que falharam para uma nova tentativa com backoff exponencial
+        a partir de `espera_inicial` (timedelta). Exclui as que chegaram a `max_tentativas`
+        e retorna quantas foram descartadas. Faz commit.
+        """
+        if not ids:
+            return 0
+        agora = agora or datetime.now(timezone.utc)
+        descartadas = 0
+        for mensagem in NotificacaoPendente.query.filter(NotificacaoPendente.id.in_(ids)):
+            mensagem.tentativas += 1
+            if mensagem.tentativas >= max_tentativas:
+                db.session.delete(mensagem)
+                descartadas += 1
+                continue
+            mensagem.proxima_tentativa = agora + espera_inicial * 2 ** (mensagem.tentativas - 1)
+            mensagem.reservada_por = None
+            mensagem.reservada_ate = None
+        db.session.commit()
+        return descartadas
+
+
+class TokenTelegram(db.Model):
+    """
+    Token de uso único do deep link `https://t.me/<bot>?start=<token>`, que associa o chat
+    do Telegram ao usuário que gerou o link no dashboard. O webhook busca o token pela
+    chave primária, então a associação não depende do tamanho da tabela de usuários.
+    """
+    __tablename__ = 'tokens_telegram'
+
+    token = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    expira_em = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<TokenTelegram {self.user_id}>'
+
+    @staticmethod
+    def gerar(user_id, validade):
+        """
+        Cria um token para o usuário, válido por `validade` (timedelta), substituindo os
+        anteriores. Não faz commit.
+        """
+        TokenTelegram.query.filter_by(user_id=user_id).delete()
+        token = secrets.token_urlsafe(24)  # Só usa caracteres aceitos no parâmetro start do Telegram
+        db.session.add(TokenTelegram(token=token, user_id=user_id, expira_em=datetime.now(timezone.utc) + validade))
+        return token
+
+    @staticmethod
+    def consumir(token, agora=None):
+        """
+        Exclui o token e retorna o id do usuário dono, ou None se ele não existir ou
+        tiver expirado. Um token só pode ser consumido uma vez. Não faz commit.
+        """
+        agora = agora or datetime.now(timezone.utc)
+        stmt = db.delete(TokenTelegram).where(TokenTelegram.token == token, TokenTelegram.expira_em > agora)
+        if db.session.get_bind().dialect.delete_returning:
+            return db.session.scalar(stmt.returning(TokenTelegram.user_id))
+        user_id = db.session.scalar(db.select(TokenTelegram.user_id).where(stmt.whereclause))
+        if user_id is not None and db.session.execute(stmt).rowcount != 1:
+            return None  # Consumido por outra requisição
+        return user_id
+
+    @staticmethod
+    def delete_expired():
+        """Exclui os tokens vencidos."""
+        TokenTelegram.query.filter(TokenTelegram.expira_em <= datetime.now(timezone.utc)).delete()
+        db.session.commit()
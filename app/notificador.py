@@ -0,0 +1,182 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Limites da API do Telegram: ~30 mensagens/s no total e ~1 mensagem/s por chat
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+TAXA_GLOBAL = 30
+TAXA_POR_CHAT = 1
+MAX_TENTATIVAS = 4
+ESPERA_INICIAL = 1  # segundos; dobra a cada nova tentativa
+BLOQUEIO_CHAT_S = int(os.getenv('BLOQUEIO_CHAT_S', 3600))  # Tempo sem envios para um chat que respondeu 403
+
+
+class BaldeDeTokens:
+    """
+    Token bucket sem travas: cada chamada a `reservar` consome um token e devolve quanto
+    tempo é preciso esperar até que ele esteja disponível. Como o saldo pode ficar negativo,
+    chamadas concorrentes no mesmo loop são enfileiradas de forma justa.
+    """
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or taxa
+        self.tokens = self.capacidade
+        self.atualizado_em = time.monotonic()
+
+    def reservar(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.taxa
+
+
+class NotificadorTelegram:
+    """
+    Envia mensagens ao Telegram reaproveitando uma única sessão HTTP, respeitando os limites
+    global e por chat, repetindo com backoff em falhas temporárias e em 429 (`retry_after`)
+    e suspendendo por `bloqueio_s` segundos os envios para chats que bloquearam o bot (403).
+    """
+
+    def __init__(self, bot_token, api_url=TELEGRAM_API_URL, taxa_global=TAXA_GLOBAL,
+                 taxa_por_chat=TAXA_POR_CHAT, max_tentativas=MAX_TENTATIVAS, metricas=None,
+                 bloqueio_s=BLOQUEIO_CHAT_S):
+        self.url = f"{api_url}/bot{bot_token}/sendMessage"
+        self.taxa_por_chat = taxa_por_chat
+        self.max_tentativas = max_tentativas
+        self.balde_global = BaldeDeTokens(taxa_global)
+        self.baldes_por_chat = {}
+        self.bloqueio_s = bloqueio_s
+        self.chats_bloqueados = {}  # chat_id -> time.monotonic() em que o bloqueio expira
+        self._sessao = None
+        self._loop_da_sessao = None
+
+        # Métricas de entrega
+        self.enviados = 0
+        self.falhas = 0
+        self.descartados = 0
+        self.limitados = 0
+        self.latencias = deque(maxlen=1000)
+        self.metricas = metricas  # app.metricas.Metricas opcional, exportada em /metrics
+        if metricas is not None:
+            metricas.declarar_histograma('telegram_latencia_segundos', 'Latência das chamadas ao sendMessage.')
+            metricas.declarar_contador('telegram_envios_total', 'Mensagens do Telegram por resultado.')
+            metricas.declarar_contador('telegram_erros_total', 'Respostas de erro e falhas de rede do Telegram.')
+
+    def _contar(self, nome, **labels):
+        if self.metricas is not None:
+            self.metricas.incrementar(nome, **labels)
+
+    async def _obter_sessao(self):
+        """Cria a sessão na primeira chamada e a reaproveita enquanto o loop for o mesmo."""
+        loop = asyncio.get_running_loop()
+        if self._sessao is None or self._sessao.closed or self._loop_da_sessao is not loop:
+            connector = aiohttp.TCPConnector(limit=TAXA_GLOBAL, keepalive_timeout=60)
+            self._sessao = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=15))
+            self._loop_da_sessao = loop
+        return self._sessao
+
+    async def fechar(self):
+        """Fecha a sessão HTTP."""
+        if self._sessao is not None and not self._sessao.closed:
+            await self._sessao.close()
+        self._sessao = None
+
+    async def _aguardar_vez(self, chat_id):
+        balde_chat = self.baldes_por_chat.get(chat_id)
+        if balde_chat is None:
+            balde_chat = self.baldes_por_chat[chat_id] = BaldeDeTokens(self.taxa_por_chat)
+        espera = max(balde_chat.reservar(), self.balde_global.reservar())
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    async def enviar(self, chat_id, texto, parse_mode='HTML'):
+        """
+        Envia uma mensagem. Retorna a resposta da API em caso de sucesso ou None.
+        """
+        chat_id = str(chat_id)
+        if self.esta_bloqueado(chat_id):
+            self.descartados += 1
+            self._contar('telegram_envios_total', resultado='descartado')
+            return None
+
+        payload = {"chat_id": chat_id, "text": texto, "parse_mode": parse_mode}
+        sessao = await self._obter_sessao()
+        espera = ESPERA_INICIAL
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self._aguardar_vez(chat_id)
+            inicio = time.perf_counter()
+            try:
+                async with sessao.post(self.url, data=payload) as response:
+                    dados = await response.json(content_type=None)
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self._contar('telegram_erros_total', tipo=type(e).__name__)
+                logger.warning(f"Falha ao enviar mensagem para o chat {chat_id} (tentativa {tentativa}): {e}")
+                await asyncio.sleep(espera)
+                espera *= 2
+                continue
+            finally:
+                self.latencias.append(time.perf_counter() - inicio)
+                if self.metricas is not None:
+                    self.metricas.observar('telegram_latencia_segundos', self.latencias[-1])
+
+            if status == 200 and dados.get('ok'):
+                self.enviados += 1
+                self._contar('telegram_envios_total', resultado='enviado')
+                return dados
+            self._contar('telegram_erros_total', tipo=str(status))
+            if status == 429:
+                self.limitados += 1
+                retry_after = (dados.get('parameters') or {}).get('retry_after', espera)
+                logger.warning(f"Limite do Telegram atingido; aguardando {retry_after}s.")
+                await asyncio.sleep(retry_after)
+                continue
+            if status == 403:
+                logger.warning(f"Chat {chat_id} bloqueou o bot; envios suspensos por {self.bloqueio_s}s.")
+                self.chats_bloqueados[chat_id] = time.monotonic() + self.bloqueio_s
+                break
+            if status >= 500:
+                await asyncio.sleep(espera)
+                espera *= 2
+                continue
+            logger.error(f"Erro ao enviar mensagem para o chat {chat_id}: {dados}")
+            break
+
+        self.falhas += 1
+        self._contar('telegram_envios_total', resultado='falha')
+        return None
+
+    def esta_bloqueado(self, chat_id):
+        """Indica se os envios para o chat estão suspensos; bloqueios vencidos são removidos."""
+        chat_id = str(chat_id)
+        expira_em = self.chats_bloqueados.get(chat_id)
+        if expira_em is None:
+            return False
+        if time.monotonic() >= expira_em:
+            del self.chats_bloqueados[chat_id]  # O usuário pode ter desbloqueado o bot; tenta de novo
+            return False
+        return True
+
+    def desbloquear(self, chat_id):
+        """Volta a permitir envios para um chat (por exemplo, após um novo /start)."""
+        self.chats_bloqueados.pop(str(chat_id), None)
+
+    def estatisticas(self):
+        """Resumo das entregas para monitoramento."""
+        latencias = sorted(self.latencias)
+        return {
+            'enviados': self.enviados,
+            'falhas': self.falhas,
+            'descartados': self.descartados,
+            'limitados_429': self.limitados,
+            'chats_bloqueados': len(self.chats_bloqueados),
+            'latencia_media_ms': round(1000 * sum(latencias) / len(latencias), 1) if latencias else None,
+            'latencia_p95_ms': round(1000 * latencias[int(0.95 * (len(latencias) - 1))], 1) if latencias else None,
+        }
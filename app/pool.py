@@ -0,0 +1,84 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+ESPERA_ALERTA = float(os.getenv('DB_POOL_ESPERA_ALERTA', 0.5))  # Segundos de espera que geram aviso no log
+INTERVALO_ALERTA = 60  # Segundos mínimos entre dois avisos
+AMOSTRAS = 1000  # Esperas recentes usadas no p95
+
+
+class QueuePoolMonitorado(QueuePool):
+    """
+    QueuePool que mede o tempo de espera de cada checkout e a ocupação do pool,
+    para detectar a exaustão de conexões antes que ela vire erro 500.
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30.0, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, timeout=timeout, **kw)
+        self.capacidade = pool_size + max(0, max_overflow)
+        self._lock_metricas = threading.Lock()
+        self._esperas = deque(maxlen=AMOSTRAS)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._pico_em_uso = 0
+        self._ultimo_alerta = 0.0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_metricas:
+                self._timeouts += 1
+            logger.error(f"Pool de conexões esgotado: {self.status()}")
+            raise
+        espera = time.perf_counter() - inicio
+        em_uso = self.checkedout()
+        with self._lock_metricas:
+            self._checkouts += 1
+            self._esperas.append(espera)
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+            self._pico_em_uso = max(self._pico_em_uso, em_uso)
+            alertar = espera >= ESPERA_ALERTA and inicio - self._ultimo_alerta >= INTERVALO_ALERTA
+            if alertar:
+                self._ultimo_alerta = inicio
+        if alertar:
+            logger.warning(f"Checkout do pool esperou {espera:.3f}s ({em_uso}/{self.capacidade} conexões em uso)")
+        return conexao
+
+    def estatisticas(self):
+        """Métricas do pool desde a criação do processo."""
+        em_uso = self.checkedout()
+        with self._lock_metricas:
+            esperas = sorted(self._esperas)
+            checkouts = self._checkouts
+            return {
+                'tamanho': self.size(),
+                'capacidade': self.capacidade,
+                'em_uso': em_uso,
+                'pico_em_uso': self._pico_em_uso,
+                'saturacao': round(em_uso / self.capacidade, 3) if self.capacidade else None,
+                'pico_saturacao': round(self._pico_em_uso / self.capacidade, 3) if self.capacidade else None,
+                'checkouts': checkouts,
+                'timeouts': self._timeouts,
+                'espera_media_ms': round(1000 * self._espera_total / checkouts, 3) if checkouts else None,
+                'espera_p95_ms': round(1000 * esperas[int(0.95 * (len(esperas) - 1))], 3) if esperas else None,
+                'espera_maxima_ms': round(1000 * self._espera_maxima, 3),
+            }
+
+
+def estatisticas_do_pool(engine):
+    """Métricas do pool do engine; para pools sem monitoramento, apenas o status do SQLAlchemy."""
+    pool = engine.pool
+    if isinstance(pool, QueuePoolMonitorado):
+        return pool.estatisticas()
+    return {'status': pool.status()}
@@ -1,13 +1,21 @@
+import io
 import os
-import requests
-from flask import render_template, request, redirect, url_for, flash, jsonify, current_app
+import hmac
+import csv
+import json
+import time
+from flask import render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context, abort
 from flask_login import login_required, current_user
-from .models import Keyword, User
+from .models import Keyword, User, Project, UserMatch, TarefaAgendada, NotificacaoPendente, TokenTelegram
 from . import db
 from flask import Blueprint
 from .decorators import admin_required
-from .bot import VerificadorDeProjetos
-from datetime import datetime
+from .agendador import obter_agendador
+from .pool import estatisticas_do_pool
+from .cache_usuarios import obter_cache_de_usuarios, recarregar
+from .limite_login import obter_limitador_de_login
+from .metricas import exportar_medidores, filtrar_eventos
+from datetime import datetime, timedelta, timezone
 import logging
 
 # Definindo o blueprint "main"
@@ -17,9 +25,6 @@ main = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Inicialização global do bot (uma instância global para manter o estado)
-verificador = VerificadorDeProjetos()
-
 # Carrega o token do bot a partir do arquivo .env
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 
@@ -40,6 +45,9 @@ def dashboard():
         if keywords_input:
             save_keywords(keywords_input)
 
+    # O usuário pode vir do cache: permissão e chat vinculado (pelo webhook, talvez em
+    # outro processo) são relidos do banco
+    recarregar(current_user._get_current_object(), 'is_admin', 'chat_id')
     if current_user.is_admin:
         return redirect(url_for('main.admin_dashboard'))
 
@@ -53,28 +61,178 @@ def dashboard():
 
 def save_keywords(keywords_input):
     """Salva as palavras-chave no banco de dados."""
-    keywords_list = [keyword.strip() for keyword in keywords_input.split(',') if keyword.strip()]
-    for keyword in keywords_list:
-        existing_keyword = Keyword.query.filter_by(keyword=keyword, user_id=current_user.id).first()
-        if not existing_keyword:
-            new_keyword = Keyword(keyword=keyword, user_id=current_user.id)
-            db.session.add(new_keyword)
     try:
-        db.session.commit()
-        flash('Palavras-chave salvas com sucesso!', 'success')
+        resultado = importar_keywords(keywords_input.split(','))
+        flash(f"Palavras-chave salvas com sucesso! ({resultado['inseridas']} novas, "
+              f"{resultado['duplicadas']} já existentes)", 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Erro ao salvar as palavras-chave: {e}', 'danger')
         logger.error(f"Erro ao salvar palavras-chave: {e}")
 
 
+def importar_keywords(keywords):
+    """
+    Insere em lote as palavras-chave do usuário atual e avisa o bot se algo mudou.
+    Retorna as contagens de Keyword.inserir_em_lote.
+    """
+    resultado = Keyword.inserir_em_lote(current_user.id, keywords)
+    if resultado['inseridas']:
+        current_user.marcar_keywords_alteradas()
+    db.session.commit()
+    if resultado['inseridas']:
+        notificar_keywords_alteradas()
+    return resultado
+
+
+def notificar_keywords_alteradas():
+    """Antecipa o próximo ciclo do bot para aplicar as novas palavras-chave do usuário."""
+    if recarregar(current_user._get_current_object(), 'bot_ativo').bot_ativo:
+        obter_agendador(current_app._get_current_object()).acordar()
+
+
 @main.route('/admin', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def admin_dashboard():
-    users = User.query.all()
+    busca = request.args.get('q', '').strip()
+    filtros = {
+        'is_subscriber': ler_filtro_booleano('assinante'),
+        'is_admin': ler_filtro_booleano('admin'),
+    }
+    users, proximo = User.listar_para_admin(
+        busca=busca or None,
+        apos_id=request.args.get('apos', type=int),
+        limite=current_app.config.get('USUARIOS_POR_PAGINA', 50),
+        **filtros,
+    )
     keywords = Keyword.query.filter_by(user_id=current_user.id).all()
-    return render_template('admin.html', users=users, keywords=keywords)
+    # Mantém busca e filtros nos links de paginação
+    parametros = {chave: valor for chave, valor in request.args.items() if chave != 'apos' and valor}
+    return render_template('admin.html', users=users, keywords=keywords, busca=busca,
+                           proximo=proximo, parametros=parametros)
+
+def ler_filtro_booleano(nome):
+    """Converte o parâmetro '1'/'0' da query string em True/False (None se ausente)."""
+    valor = request.args.get(nome, '')
+    if valor in ('1', '0'):
+        return valor == '1'
+    return None
+
+@main.route('/admin/notificador', methods=['GET'])
+@login_required
+@admin_required
+def notificador_status():
+    """Métricas de entrega das notificações do Telegram e tamanho da caixa de saída."""
+    pendentes = NotificacaoPendente.query.count()
+    estatisticas = obter_agendador(current_app._get_current_object()).estado_do_bot()['notificador']
+    if estatisticas is None:
+        return jsonify({'status': 'Notificador ainda não utilizado.', 'pendentes': pendentes})
+    return jsonify(dict(estatisticas, pendentes=pendentes))
+
+@main.route('/admin/pool', methods=['GET'])
+@login_required
+@admin_required
+def pool_status():
+    """Ocupação do pool de conexões deste processo e tempo de espera nos checkouts."""
+    opcoes = current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    return jsonify({
+        **estatisticas_do_pool(db.engine),
+        'configuracao': {chave: valor for chave, valor in opcoes.items() if chave != 'poolclass'},
+    })
+
+@main.route('/admin/tarefas', methods=['GET'])
+@login_required
+@admin_required
+def tarefas_status():
+    """Última execução, duração e próximo horário de cada tarefa periódica."""
+    return jsonify([
+        {
+            'nome': tarefa.nome,
+            'proxima_execucao': tarefa.proxima_execucao.isoformat(),
+            'executada_por': tarefa.executada_por,
+            'ultima_execucao': tarefa.ultima_execucao.isoformat() if tarefa.ultima_execucao else None,
+            'ultima_duracao_s': tarefa.ultima_duracao_s,
+            'ultimo_erro': tarefa.ultimo_erro,
+        }
+        for tarefa in TarefaAgendada.query.order_by(TarefaAgendada.nome)
+    ])
+
+@main.route('/admin/cache_usuarios', methods=['GET'])
+@login_required
+@admin_required
+def cache_usuarios_status():
+    """Taxa de acerto do cache de usuários do Flask-Login neste processo."""
+    return jsonify(obter_cache_de_usuarios(current_app._get_current_object()).estatisticas())
+
+@main.route('/admin/limite_login', methods=['GET'])
+@login_required
+@admin_required
+def limite_login_status():
+    """Tentativas de login permitidas e recusadas pelo limite neste processo."""
+    return jsonify(obter_limitador_de_login(current_app._get_current_object()).estatisticas())
+
+@main.route('/admin/crawler', methods=['GET'])
+@login_required
+@admin_required
+def crawler_status():
+    """Páginas baixadas, quantas foram puladas por não terem mudado e o registro de links vistos."""
+    return jsonify(obter_agendador(current_app._get_current_object()).estado_do_bot()['crawler'])
+
+def medidores_da_coleta(estado):
+    """
+    Gauges calculados no momento da coleta, exportados junto com as métricas do bot. Não
+    dependem do verificador, então o processo web sem o bot não cria um.
+    """
+    medidores = {
+        # Do banco, e não do registro de jobs deste processo, que só conhece os usuários que
+        # passaram por ele: o valor não depende de qual worker atende a coleta
+        'bot_jobs_ativos': ('Usuários com o bot ativo.', User.query.filter(User.bot_ativo.is_(True)).count()),
+        'notificacoes_pendentes': ('Mensagens na caixa de saída.', NotificacaoPendente.query.count()),
+    }
+    if estado['atualizado_em'] is not None:
+        idade = (datetime.now(timezone.utc) - estado['atualizado_em']).total_seconds()
+        medidores['bot_estado_idade_segundos'] = ('Segundos desde a última fotografia do bot gravada pelo líder.', round(idade, 3))
+    return medidores
+
+@main.route('/metrics', methods=['GET'])
+def metricas():
+    """
+    Métricas do bot no formato de texto do Prometheus (do líder, ver AgendadorDoBot.estado_do_bot)
+    e gauges deste processo. Aceita um admin logado ou o cabeçalho
+    `Authorization: Bearer <METRICAS_TOKEN>` (para o coletor).
+    """
+    token = current_app.config.get('METRICAS_TOKEN')
+    por_token = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not por_token and not (current_user.is_authenticated
+                              and recarregar(current_user._get_current_object(), 'is_admin').is_admin):
+        abort(401)
+    agendador = obter_agendador(current_app._get_current_object())
+    estado = agendador.estado_do_bot()
+    texto = estado['prometheus'] + exportar_medidores(medidores_da_coleta(estado))
+    return Response(texto, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@main.route('/admin/metricas', methods=['GET'])
+@login_required
+@admin_required
+def metricas_admin():
+    """As mesmas métricas de /metrics em JSON, com contagem, soma e média dos histogramas."""
+    agendador = obter_agendador(current_app._get_current_object())
+    estado = agendador.estado_do_bot()
+    medidores = {nome: valor for nome, (_, valor) in medidores_da_coleta(estado).items()}
+    return jsonify({**estado['metricas'], **medidores})
+
+@main.route('/admin/logs', methods=['GET'])
+@login_required
+@admin_required
+def logs_do_bot():
+    """Eventos recentes do bot (log circular), do mais novo ao mais antigo. Aceita ?nivel= e ?limite=."""
+    nivel = logging.getLevelName(request.args.get('nivel', 'DEBUG').upper())
+    if not isinstance(nivel, int):
+        return jsonify({'erro': 'Nível de log inválido.'}), 400
+    limite = request.args.get('limite', 100, type=int)
+    eventos = obter_agendador(current_app._get_current_object()).estado_do_bot()['logs']
+    return jsonify(filtrar_eventos(eventos, limite, nivel))
 
 # Controle do bot: Iniciar e parar bot
 @main.route('/start_bot', methods=['POST'])
@@ -84,34 +242,201 @@ def start_bot():
     Rota para iniciar o bot.
     """
     logger.info(f"Iniciando bot para o usuário {current_user.username}")
-    total_pages = 5  # Número de páginas para verificar (exemplo)
-    keywords = [keyword.keyword for keyword in current_user.keywords]  # Palavras-chave do usuário atual
-    bot_token = TELEGRAM_TOKEN  # Carrega o token do bot
-    chat_id = current_user.chat_id  # ID do chat do Telegram do usuário
-    user_id = current_user.id  # ID do usuário atual
-
-    if not chat_id:
+    # Como em status_do_usuario, o estado vem do banco e não do usuário em cache: /stop_bot,
+    # o /stop do Telegram e o webhook podem ter rodado em outro processo
+    recarregar(current_user._get_current_object(), 'bot_ativo', 'chat_id')
+    if not current_user.chat_id:
         logger.error(f"Usuário {current_user.username} não tem chat_id associado.")
-        return jsonify({'status': 'Chat ID não associado. Por favor, inicie o bot no Telegram com /start.'}), 400
+        return jsonify({'status': 'Chat ID não associado. Use o botão "Vincular Telegram" no painel.'}), 400
 
-    if not verificador.bot_ativo:
-        verificador.iniciar_verificacao(total_pages, keywords, bot_token, chat_id, user_id)
-        logger.info(f"Bot iniciado para o usuário {current_user.username}.")
-        return jsonify({'status': 'Bot iniciado com sucesso!'}), 200
-    else:
+    if current_user.bot_ativo:
         logger.info("Bot já está em execução.")
         return jsonify({'status': 'Bot já está em execução.'}), 200
 
+    # O runtime do bot lê os usuários ativos do banco a cada ciclo
+    current_user.bot_ativo = True
+    db.session.commit()
+    obter_agendador(current_app._get_current_object()).iniciar_usuario(current_user.id)
+    logger.info(f"Bot iniciado para o usuário {current_user.username}.")
+    return jsonify({'status': 'Bot iniciado com sucesso!'}), 200
+
 @main.route('/stop_bot', methods=['POST'])
 @login_required
 def stop_bot():
-    verificador.parar_verificacao()
+    current_user.bot_ativo = False
+    db.session.commit()
+    obter_agendador(current_app._get_current_object()).parar_usuario(current_user.id)
     logger.info(f"Bot parado para o usuário {current_user.username}.")
     return jsonify({"status": "Bot parado com sucesso."})
 
+@main.route('/notification_mode', methods=['POST'])
+@login_required
+def notification_mode():
+    """Define se o usuário recebe uma mensagem por projeto ou um resumo por ciclo."""
+    modo = request.form.get('modo_notificacao')
+    if modo not in User.MODOS_NOTIFICACAO:
+        flash('Modo de notificação inválido.', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    current_user.modo_notificacao = modo
+    db.session.commit()
+    flash('Modo de notificação atualizado!', 'success')
+    return redirect(url_for('main.dashboard'))
+
 @main.route('/status_bot', methods=['GET'])
 def status_bot():
-    return jsonify({'status': verificador.status_bot()})
+    if not current_user.is_authenticated:
+        return jsonify({'status': 'Verificação não iniciada'})
+    agendador = obter_agendador(current_app._get_current_object())
+    return jsonify(agendador.jobs.serializar(agendador.status_do_usuario(current_user.id)))
+
+def formatar_evento_sse(evento_id, tipo, dados):
+    """Formata um evento no protocolo Server-Sent Events."""
+    return f"id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+# Cursor de quem ainda não tem correspondências: todas as futuras são novas
+CURSOR_SSE_INICIAL = (datetime.min, 0)
+
+def formatar_cursor_sse(cursor):
+    """Id SSE de uma correspondência, (matched_at, project_id), válido em qualquer processo."""
+    matched_at, project_id = cursor
+    return f"{matched_at.isoformat()}|{project_id}"
+
+def ler_cursor_sse(valor):
+    """Interpreta o Last-Event-ID; retorna None se ausente ou em outro formato."""
+    instante, separador, project_id = (valor or '').partition('|')
+    if not separador:
+        return None
+    try:
+        return datetime.fromisoformat(instante), int(project_id)
+    except ValueError:
+        return None
+
+@main.route('/stream_bot', methods=['GET'])
+@login_required
+def stream_bot():
+    """
+    Stream SSE com mudanças de estado do bot e novos projetos do usuário, servido como
+    long-poll: a conexão é encerrada no primeiro evento (além do status inicial) ou após
+    SSE_DURACAO segundos, para que abas abertas não prendam as threads do worker. O
+    EventSource do navegador reconecta sozinho após SSE_RECONEXAO_S segundos, enviando o
+    Last-Event-ID.
+
+    Os projetos vêm sempre de user_matches, seja qual for o processo que executa o bot,
+    e o id de cada evento é o cursor (matched_at, project_id) da última correspondência
+    enviada: ao reconectar, inclusive em outro worker, o stream retoma do ponto exato,
+    sem perder o que foi gravado enquanto o navegador estava desconectado.
+    """
+    app = current_app._get_current_object()
+    agendador = obter_agendador(app)
+    user_id = current_user.id
+    job = agendador.status_do_usuario(user_id)
+    cursor = ler_cursor_sse(request.headers.get('Last-Event-ID'))
+    if cursor is None:
+        ultima = (
+            db.session.query(UserMatch.matched_at, UserMatch.project_id)
+            .filter(UserMatch.user_id == user_id)
+            .order_by(UserMatch.matched_at.desc(), UserMatch.project_id.desc())
+            .first()
+        )
+        cursor = tuple(ultima) if ultima else CURSOR_SSE_INICIAL
+    # O canal do processo só acorda o stream (mudança de estado, ciclo do bot local)
+    ultimo_evento = agendador.eventos.ultimo_id()
+    duracao = app.config.get('SSE_DURACAO', 5)
+    reconexao_ms = int(1000 * app.config.get('SSE_RECONEXAO_S', 10))
+    # Libera a conexão com o banco enquanto o stream estiver aberto
+    db.session.remove()
+
+    def novos_projetos():
+        matched_at, project_id = cursor
+        projetos = (
+            db.session.query(Project.title, Project.link, UserMatch.matched_at, UserMatch.project_id)
+            .join(UserMatch, UserMatch.project_id == Project.id)
+            .filter(
+                UserMatch.user_id == user_id,
+                db.or_(
+                    UserMatch.matched_at > matched_at,
+                    db.and_(UserMatch.matched_at == matched_at, UserMatch.project_id > project_id),
+                ),
+            )
+            .order_by(UserMatch.matched_at, UserMatch.project_id)
+            .all()
+        )
+        db.session.remove()
+        return projetos
+
+    def eventos_de_projetos():
+        nonlocal cursor
+        for titulo, link, matched_at, project_id in novos_projetos():
+            cursor = (matched_at, project_id)
+            yield formatar_evento_sse(formatar_cursor_sse(cursor), 'projeto', {
+                'titulo': titulo,
+                'link': f"https://www.99freelas.com.br{link}",
+            })
+
+    def gerar():
+        nonlocal ultimo_evento
+        yield f"retry: {reconexao_ms}\n\n"
+        yield formatar_evento_sse(formatar_cursor_sse(cursor), 'status', agendador.jobs.serializar(job))
+        fim = time.monotonic() + duracao
+        while True:
+            enviados = list(eventos_de_projetos())  # O que foi gravado desde o cursor, em qualquer processo
+            yield from enviados
+            restante = fim - time.monotonic()
+            if enviados or restante <= 0:
+                return
+            eventos = agendador.eventos.aguardar(user_id, ultimo_evento, timeout=restante)
+            for evento_id, tipo, dados in eventos:
+                ultimo_evento = evento_id
+                if tipo == 'status':
+                    enviados.append(formatar_evento_sse(formatar_cursor_sse(cursor), tipo, dados))
+            yield from enviados
+            if enviados:
+                return
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def decodificar_csv(dados):
+    """
+    Texto de um CSV enviado para importação: UTF-8 (com ou sem BOM) ou, como o Excel
+    exporta em pt-BR, Windows-1252. O latin-1 aceita qualquer byte e fecha a lista.
+    """
+    for codificacao in ('utf-8-sig', 'cp1252'):
+        try:
+            return dados.decode(codificacao)
+        except UnicodeDecodeError:
+            continue
+    return dados.decode('latin-1')
+
+@main.route('/keywords/import', methods=['POST'])
+@login_required
+def import_keywords():
+    """
+    Importa palavras-chave em lote. Aceita um JSON (lista ou {"keywords": [...]})
+    ou um CSV (corpo text/csv ou arquivo no campo "file"), com termos separados por vírgula ou linha.
+    """
+    if request.is_json:
+        dados = request.get_json(silent=True)
+        keywords = dados.get('keywords') if isinstance(dados, dict) else dados
+        if not isinstance(keywords, list):
+            return jsonify({'status': 'error', 'message': 'Envie uma lista de palavras-chave.'}), 400
+    else:
+        arquivo = request.files.get('file')
+        conteudo = decodificar_csv(arquivo.read() if arquivo else request.get_data())
+        keywords = [celula for linha in csv.reader(io.StringIO(conteudo)) for celula in linha]
+
+    limite = current_app.config.get('MAX_KEYWORDS_IMPORTACAO', 1000)
+    if len(keywords) > limite:
+        return jsonify({'status': 'error', 'message': f'Envie no máximo {limite} palavras-chave por vez.'}), 413
+
+    try:
+        resultado = importar_keywords(keywords)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Erro ao importar palavras-chave: {e}")
+        return jsonify({'status': 'error', 'message': f'Erro ao importar palavras-chave: {e}'}), 500
+    return jsonify({'status': 'success', **resultado})
 
 @main.route('/remove_keyword/<int:keyword_id>', methods=['POST'])
 @login_required
@@ -122,7 +447,9 @@ def remove_keyword(keyword_id):
 
     try:
         db.session.delete(keyword)
+        current_user.marcar_keywords_alteradas()
         db.session.commit()
+        notificar_keywords_alteradas()
         return jsonify({'status': 'success', 'message': 'Palavra-chave removida com sucesso!'})
     except Exception as e:
         db.session.rollback()
@@ -184,56 +511,105 @@ def grant_access(user_id):
     return redirect(url_for('main.admin_dashboard'))
 
 
+@main.route('/telegram/vincular', methods=['GET'])
+@login_required
+def vincular_telegram():
+    """
+    Gera um token de uso único e abre a conversa com o bot pelo deep link
+    `/start <token>`, que associa o chat ao usuário logado.
+    """
+    validade = timedelta(minutes=current_app.config['TOKEN_TELEGRAM_VALIDADE_MINUTOS'])
+    token = TokenTelegram.gerar(current_user.id, validade)
+    db.session.commit()
+    return redirect(f"https://t.me/{current_app.config['TELEGRAM_BOT_USERNAME']}?start={token}")
+
 # Endpoint para receber mensagens via webhook do Telegram
 @main.route('/webhook/telegram', methods=['POST'])
 def telegram_webhook():
     """
-    Webhook do Telegram para capturar o chat ID e associá-lo ao usuário que ainda não tem chat_id,
-    apenas quando a mensagem é "/start".
+    Webhook do Telegram. "/start <token>" associa o chat ao usuário que gerou o token no
+    dashboard; "/stop" e "/status" localizam o usuário pelo chat_id (indexado).
+    As respostas vão para a caixa de saída, sem esperar o Telegram. Só aceita requisições
+    com o segredo registrado no setWebhook (flask registrar-webhook).
     """
-    data = request.get_json()
+    if not webhook_autenticado():
+        logger.warning(f"Webhook do Telegram recusado para {request.remote_addr}: segredo ausente ou inválido.")
+        abort(403)
+
+    data = request.get_json(silent=True) or {}
 
     if 'message' in data:
         message = data['message']
-        chat_id = message['chat']['id']
-        text = message.get('text', '')
+        chat_id = str(message['chat']['id'])
+        comando, _, argumento = message.get('text', '').strip().partition(' ')
 
-        # Verificar se o comando é "/start"
-        if text == "/start":
+        if comando == "/start":
             logger.info(f"Comando /start recebido do chat ID: {chat_id}")
+            if not argumento:
+                responder_no_telegram(chat_id, "Para receber os projetos, use o botão \"Vincular Telegram\" no seu painel.")
+                return jsonify({"status": "Token não informado"}), 200
+
+            user_id = TokenTelegram.consumir(argumento.strip())
+            user = db.session.get(User, user_id) if user_id is not None else None
+            if user is None:
+                logger.warning(f"Token inválido ou expirado recebido do chat ID {chat_id}.")
+                responder_no_telegram(chat_id, "Link inválido ou expirado. Gere um novo link no seu painel.")
+                return jsonify({"status": "Token inválido ou expirado"}), 404
+
+            # Um chat pertence a uma única conta
+            for outro in User.query.filter(User.chat_id == chat_id, User.id != user.id):
+                outro.chat_id = None
+            user.chat_id = chat_id
+            responder_no_telegram(chat_id, "Seu chat ID foi associado com sucesso!")
+            logger.info(f"Chat ID {chat_id} associado ao usuário {user.username}.")
+            return jsonify({"status": "Chat ID associado com sucesso"}), 200
+
+        if comando in ("/stop", "/status"):
+            user = User.query.filter_by(chat_id=chat_id).first()
+            if user is None:
+                responder_no_telegram(chat_id, "Este chat não está associado a nenhuma conta.")
+                return jsonify({"status": "Chat não associado"}), 404
+
+            if comando == "/stop":
+                user.bot_ativo = False
+                responder_no_telegram(chat_id, "Bot parado. Você não receberá novos projetos.")
+                obter_agendador(current_app._get_current_object()).parar_usuario(user.id)
+                logger.info(f"Bot parado pelo Telegram para o usuário {user.username}.")
+                return jsonify({"status": "Bot parado com sucesso."}), 200
+
+            estado = "ativo" if user.bot_ativo else "parado"
+            total = Keyword.query.filter_by(user_id=user.id).count()
+            responder_no_telegram(chat_id, f"Bot {estado} para {user.username}, com {total} palavras-chave.")
+            return jsonify({"status": estado}), 200
+
+    # Outras mensagens não têm ação
+    return jsonify({"status": "Nenhuma ação realizada"}), 200
 
-            # Encontrar o primeiro usuário sem chat_id associado
-            user = User.query.filter_by(chat_id=None).first()
-
-            if user:
-                # Associar o chat_id ao usuário
-                user.chat_id = chat_id
-                db.session.commit()
 
-                logger.info(f"Chat ID {chat_id} associado ao usuário {user.username}.")
+def webhook_autenticado():
+    """Confere o cabeçalho X-Telegram-Bot-Api-Secret-Token com TELEGRAM_WEBHOOK_SECRET."""
+    segredo = current_app.config.get('TELEGRAM_WEBHOOK_SECRET')
+    if not segredo:
+        return False
+    recebido = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    return hmac.compare_digest(recebido.encode(), segredo.encode())
 
-                # Enviar mensagem de confirmação
-                send_telegram_message(chat_id, "Seu chat ID foi associado com sucesso!")
-                return jsonify({"status": "Chat ID associado com sucesso"}), 200
-            else:
-                logger.warning("Nenhum usuário disponível para associação.")
-                send_telegram_message(chat_id, "Nenhum usuário disponível para associação.")
-                return jsonify({"status": "Nenhum usuário disponível para associação"}), 404
 
-    # Se não for "/start", retorna 200 sem fazer nada
-    return jsonify({"status": "Nenhuma ação realizada"}), 200
+def responder_no_telegram(chat_id, texto):
+    """
+    Enfileira a resposta na caixa de saída e confirma a transação da requisição. Quem
+    escreveu para o bot não o bloqueia mais, então o chat é liberado no notificador local.
+    """
+    obter_agendador(current_app._get_current_object()).desbloquear_chat(chat_id)
+    NotificacaoPendente.enfileirar_em_lote([{'chat_id': chat_id, 'texto': texto}])
+    db.session.commit()
+    acordar_envio()
 
 
-def send_telegram_message(chat_id, text):
+def acordar_envio():
     """
-    Função para enviar mensagem ao Telegram.
+    Antecipa o envio da caixa de saída quando o bot roda neste processo. Com o worker
+    separado, as mensagens saem na próxima varredura (INTERVALO_ENVIO).
     """
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": text
-    }
-    response = requests.post(url, json=payload)
-    if response.status_code != 200:
-        logger.error(f"Erro ao enviar mensagem para o chat ID {chat_id}: {response.text}")
-    return response
+    if current_app.config.get('BOT_EMBUTIDO'):
+        obter_agendador(current_app._get_current_object()).acordar_envio()
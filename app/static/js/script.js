@@ -16,11 +16,65 @@ document.addEventListener("DOMContentLoaded", function() {
         }
     }
 
-    // Atualiza o status do bot a cada 10 segundos
-    setInterval(atualizarStatusBot, 10000); // 10 segundos
+    // Polling a cada 10 segundos, usado apenas quando o stream SSE não está disponível
+    let intervaloPolling = null;
+    function iniciarPolling() {
+        if (intervaloPolling === null) {
+            atualizarStatusBot();
+            intervaloPolling = setInterval(atualizarStatusBot, 10000); // 10 segundos
+        }
+    }
+
+    // Adiciona um projeto recém-encontrado à lista do dashboard
+    function adicionarProjeto(projeto) {
+        const lista = document.getElementById("projetos-recentes");
+        if (!lista) {
+            return;
+        }
+        const item = document.createElement("li");
+        item.className = "list-group-item";
+        const link = document.createElement("a");
+        link.href = projeto.link;
+        link.target = "_blank";
+        link.textContent = projeto.titulo;
+        item.appendChild(link);
+        lista.prepend(item);
+        const vazio = document.getElementById("projetos-recentes-vazio");
+        if (vazio) {
+            vazio.remove();
+        }
+    }
+
+    // Recebe o status do bot e os novos projetos via Server-Sent Events
+    function iniciarStream() {
+        if (!window.EventSource || !statusElement) {
+            iniciarPolling();
+            return;
+        }
+        const stream = new EventSource('/stream_bot');
+        let falhasSeguidas = 0;
+
+        stream.addEventListener("open", function() {
+            falhasSeguidas = 0;
+        });
+        stream.addEventListener("status", function(event) {
+            statusElement.textContent = 'Status: ' + JSON.parse(event.data).status;
+        });
+        stream.addEventListener("projeto", function(event) {
+            adicionarProjeto(JSON.parse(event.data));
+        });
+        stream.addEventListener("error", function() {
+            // O servidor encerra a conexão periodicamente e o navegador reconecta sozinho;
+            // só volta ao polling se as reconexões falharem repetidamente
+            falhasSeguidas += 1;
+            if (falhasSeguidas >= 3) {
+                stream.close();
+                iniciarPolling();
+            }
+        });
+    }
 
-    // Atualiza o status imediatamente ao carregar a página
-    atualizarStatusBot();
+    iniciarStream();
 
     // Função para iniciar o bot
     if (startBotButton) {
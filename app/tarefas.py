@@ -0,0 +1,41 @@
+import os
+import time
+import socket
+import logging
+from datetime import datetime, timezone
+from . import db
+from .models import TarefaAgendada
+
+logger = logging.getLogger(__name__)
+
+IDENTIDADE = f"{socket.gethostname()}:{os.getpid()}"  # Identifica o processo que executou a tarefa
+
+
+def executar_uma_vez_por_intervalo(app, nome, intervalo, funcao):
+    """
+    Executa `funcao` se este processo conseguir reivindicar a tarefa `nome`, vencida há
+    mais de `intervalo` (timedelta). Os demais workers do gunicorn apenas retornam False.
+    O início, a duração e o erro da execução ficam registrados em `tarefas_agendadas`.
+    """
+    with app.app_context():
+        try:
+            if not TarefaAgendada.reivindicar(nome, intervalo, IDENTIDADE):
+                return False
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Erro ao reivindicar a tarefa {nome}: {e}")
+            return False
+
+        inicio = datetime.now(timezone.utc)
+        cronometro = time.perf_counter()
+        erro = None
+        try:
+            funcao()
+        except Exception as e:
+            db.session.rollback()
+            erro = str(e)
+            logger.error(f"Erro na tarefa {nome}: {e}", exc_info=True)
+        duracao = time.perf_counter() - cronometro
+        TarefaAgendada.registrar_execucao(nome, inicio, duracao, erro)
+        logger.info(f"Tarefa {nome} executada em {duracao:.3f}s por {IDENTIDADE}.")
+        return True
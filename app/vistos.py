@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+from .models import LinkVisto
+
+TTL_LINKS_VISTOS_HORAS = float(os.getenv('TTL_LINKS_VISTOS_HORAS', 7 * 24))  # Por quanto tempo um link não é notificado de novo
+INTERVALO_EXPIRACAO = 60 * 60  # Segundos entre as varreduras de expiração em memória
+
+
+class RegistroDeLinksVistos:
+    """
+    Registro dos links já notificados a cada usuário, usado na deduplicação do bot.
+
+    Mantém em memória um dicionário hash -> instante de expiração, com um inteiro por par
+    (user_id, link), e usa a tabela `links_vistos` como fonte da verdade: só os hashes
+    ausentes da memória são consultados no banco, em uma única consulta por página.
+    """
+
+    def __init__(self, ttl_horas=TTL_LINKS_VISTOS_HORAS):
+        self.ttl = ttl_horas * 3600
+        self._vistos = {}  # hash -> time.time() em que a entrada expira
+        self._proxima_expiracao = 0
+        self.acertos = 0  # Pares resolvidos apenas pela memória
+        self.faltas = 0  # Pares que precisaram ser consultados no banco
+
+    def _expirar(self, agora):
+        if agora < self._proxima_expiracao:
+            return
+        self._vistos = {h: expira for h, expira in self._vistos.items() if expira > agora}
+        self._proxima_expiracao = agora + INTERVALO_EXPIRACAO
+
+    def lembrar(self, hashes, agora=None):
+        """Registra os hashes em memória (após o commit no banco)."""
+        expira = (agora or time.time()) + self.ttl
+        for h in hashes:
+            self._vistos[h] = expira
+
+    def filtrar_novos(self, correspondencias):
+        """
+        Recebe pares (user_id, projeto) e devolve triplas (user_id, projeto, hash) dos que
+        ainda não foram vistos, sem repetição. Precisa de um contexto de aplicação
+        apenas quando algum par não está em memória.
+        """
+        agora = time.time()
+        self._expirar(agora)
+        candidatos = {}
+        for user_id, projeto in correspondencias:
+            h = LinkVisto.calcular_hash(user_id, projeto['link'])
+            if self._vistos.get(h, 0) > agora:
+                self.acertos += 1
+            elif h not in candidatos:
+                candidatos[h] = (user_id, projeto, h)
+        if not candidatos:
+            return []
+        self.faltas += len(candidatos)
+        existentes = LinkVisto.existentes(list(candidatos))
+        self.lembrar(existentes, agora)
+        return [tripla for h, tripla in candidatos.items() if h not in existentes]
+
+    def estatisticas(self):
+        """Tamanho e taxa de acerto do registro em memória."""
+        consultas = self.acertos + self.faltas
+        return {
+            'itens': len(self._vistos),
+            'memoria_bytes': sys.getsizeof(self._vistos) + sum(
+                sys.getsizeof(h) + sys.getsizeof(expira) for h, expira in self._vistos.items()),
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'taxa_acerto': round(self.acertos / consultas, 4) if consultas else None,
+        }
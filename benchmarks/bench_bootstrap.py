@@ -0,0 +1,70 @@
+"""
+Tempo de importação e memória (RSS) na inicialização do processo web e do worker do bot.
+
+Cada medição roda em um subprocesso novo, para que os módulos já importados não interfiram.
+O processo web é medido com BOT_EMBUTIDO=false (bot em worker separado), que é quando ele
+não deveria carregar a pilha de scraping.
+
+Uso:
+    python -m benchmarks.bench_bootstrap [--repeticoes 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+
+# Código executado em cada subprocesso: inicializa o processo e devolve as métricas em JSON
+SCRIPT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+if sys.argv[1] == 'web':
+    import run
+else:
+    import app as pacote
+    from app.agendador import AgendadorDoBot
+    criar = getattr(pacote, 'create_worker_app', pacote.create_app)
+    AgendadorDoBot(criar('development')).verificador  # O worker sempre usa a pilha de scraping
+duracao = time.perf_counter() - inicio
+print(json.dumps({
+    'tempo_ms': 1000 * duracao,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modulos': len(sys.modules),
+    'aiohttp': 'aiohttp' in sys.modules,
+    'lxml': 'lxml.etree' in sys.modules,
+    'flask_login': 'flask_login' in sys.modules,
+    'flask_migrate': 'flask_migrate' in sys.modules,
+    'wtforms': 'wtforms' in sys.modules,
+    'requests': 'requests' in sys.modules,
+}))
+"""
+
+
+def medir(processo, repeticoes):
+    ambiente = dict(os.environ, BOT_EMBUTIDO='false', FLASK_ENV='development',
+                    DATABASE_URL=os.environ.get('DATABASE_URL', 'sqlite:///:memory:'))
+    amostras = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', SCRIPT, processo], cwd=RAIZ, env=ambiente,
+                               capture_output=True, text=True, check=True).stdout
+        amostras.append(json.loads(saida.strip().splitlines()[-1]))
+    resultado = dict(amostras[-1])
+    resultado['tempo_ms'] = round(statistics.median(amostra['tempo_ms'] for amostra in amostras), 1)
+    resultado['rss_mb'] = round(statistics.median(amostra['rss_mb'] for amostra in amostras), 1)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    for processo in ('web', 'worker'):
+        print(processo, json.dumps(medir(processo, args.repeticoes), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
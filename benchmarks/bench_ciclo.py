@@ -0,0 +1,192 @@
+"""
+Benchmark ponta a ponta do bot, sem acesso à rede.
+
+Sobe dois servidores aiohttp locais: um imita a listagem do 99Freelas (servindo as páginas
+gravadas em test/fixtures) e outro imita o `sendMessage` do Telegram, ambos com latência
+configurável e injeção de 429. Em seguida executa ciclos completos do
+VerificadorDeProjetos para N usuários sintéticos e imprime as métricas em JSON.
+
+Uso:
+    python -m benchmarks.bench_ciclo [--usuarios 200] [--paginas 5] [--ciclos 3]
+        [--latencia-pagina 0.05] [--latencia-telegram 0.02] [--taxa-429 0.05]
+        [--modo resumo|instantaneo] [--variar] [--saida resultado.json]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import time
+
+from aiohttp import web
+from sqlalchemy import event
+
+from app import create_app, db
+from app.bot import VerificadorDeProjetos
+from app.models import User, Keyword
+from app.notificador import NotificadorTelegram
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'test', 'fixtures')
+PALAVRAS = ['python', 'excel', 'vba', 'wordpress', 'site', 'bot', 'telegram', 'android', 'power bi',
+            'api', 'django', 'react', 'scraping', 'logo', 'vídeo', 'linux', 'banco de dados', 'chrome']
+
+
+class Estado:
+    """Estado compartilhado entre os servidores falsos e o laço do benchmark."""
+
+    def __init__(self, args):
+        self.args = args
+        self.ciclo = 0
+        self.aleatorio = random.Random(args.semente)
+        self.paginas_servidas = 0
+        self.mensagens_recebidas = 0
+        self.respostas_429 = 0
+
+
+def carregar_paginas():
+    paginas = []
+    for caminho in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(caminho, encoding='utf-8') as arquivo:
+            paginas.append(arquivo.read())
+    return paginas
+
+
+def criar_servidor_99freelas(estado, paginas):
+    async def projects(request):
+        await asyncio.sleep(estado.args.latencia_pagina)
+        page = int(request.query.get('page', 1))
+        conteudo = paginas[(page - 1) % len(paginas)]
+        # Links únicos por página e, com --variar, por ciclo (força o processamento completo)
+        sufixo = f'-p{page}' + (f'-c{estado.ciclo}' if estado.args.variar else '')
+        conteudo = conteudo.replace('href="/project/', f'href="/project/x{sufixo}-')
+        estado.paginas_servidas += 1
+        return web.Response(text=conteudo, content_type='text/html')
+
+    aplicacao = web.Application()
+    aplicacao.router.add_get('/projects', projects)
+    return aplicacao
+
+
+def criar_servidor_telegram(estado):
+    async def send_message(request):
+        await request.post()
+        await asyncio.sleep(estado.args.latencia_telegram)
+        if estado.aleatorio.random() < estado.args.taxa_429:
+            estado.respostas_429 += 1
+            return web.json_response({'ok': False, 'error_code': 429, 'parameters': {'retry_after': 0}}, status=429)
+        estado.mensagens_recebidas += 1
+        return web.json_response({'ok': True, 'result': {}})
+
+    aplicacao = web.Application()
+    aplicacao.router.add_post('/bot{token}/sendMessage', send_message)
+    return aplicacao
+
+
+async def iniciar(aplicacao):
+    runner = web.AppRunner(aplicacao)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def criar_usuarios(total, modo, aleatorio):
+    assinantes = {}
+    for indice in range(total):
+        user = User(username=f'usuario{indice}', email=f'usuario{indice}@example.com',
+                    chat_id=str(100000 + indice), modo_notificacao=modo)
+        user.password_hash = 'x'  # Evita o custo do hash de senha no benchmark
+        db.session.add(user)
+        db.session.flush()
+        keywords = aleatorio.sample(PALAVRAS, k=aleatorio.randint(1, 4))
+        db.session.add_all(Keyword(keyword=keyword, user_id=user.id) for keyword in keywords)
+        assinantes[user.id] = {'keywords': keywords, 'chat_id': user.chat_id, 'modo_notificacao': modo}
+    db.session.commit()
+    return assinantes
+
+
+async def executar(args):
+    estado = Estado(args)
+    app = create_app('testing')
+    contexto = app.app_context()
+    contexto.push()
+    db.create_all()
+
+    consultas = {'total': 0}
+
+    @event.listens_for(db.engine, 'before_cursor_execute')
+    def contar_consulta(*_):
+        consultas['total'] += 1
+
+    assinantes = criar_usuarios(args.usuarios, args.modo, estado.aleatorio)
+
+    runner_site, url_site = await iniciar(criar_servidor_99freelas(estado, carregar_paginas()))
+    runner_telegram, url_telegram = await iniciar(criar_servidor_telegram(estado))
+
+    verificador = VerificadorDeProjetos(url_base=f'{url_site}/projects?page=')
+    verificador.notificador = NotificadorTelegram('token', api_url=url_telegram,
+                                                  taxa_global=args.taxa_global, taxa_por_chat=args.taxa_por_chat)
+    ciclos = []
+    try:
+        for ciclo in range(1, args.ciclos + 1):
+            estado.ciclo = ciclo
+            antes = (consultas['total'], estado.mensagens_recebidas, verificador.estatisticas_paginas['processadas'],
+                     verificador.estatisticas_paginas['tempo_parse_s'])
+            inicio = time.perf_counter()
+            await verificador.executar_verificacao_compartilhada(args.paginas, assinantes, 'token', app)
+            duracao = time.perf_counter() - inicio
+            mensagens = estado.mensagens_recebidas - antes[1]
+            ciclos.append({
+                'ciclo': ciclo,
+                'tempo_s': round(duracao, 4),
+                'paginas_por_s': round(args.paginas / duracao, 2),
+                'paginas_processadas': verificador.estatisticas_paginas['processadas'] - antes[2],
+                'tempo_parse_ms': round(1000 * (verificador.estatisticas_paginas['tempo_parse_s'] - antes[3]), 2),
+                'consultas_db': consultas['total'] - antes[0],
+                'notificacoes': mensagens,
+                'notificacoes_por_s': round(mensagens / duracao, 2),
+            })
+    finally:
+        await verificador.fechar()
+        await runner_site.cleanup()
+        await runner_telegram.cleanup()
+        db.session.remove()
+        db.drop_all()
+        contexto.pop()
+
+    return {
+        'parametros': vars(args),
+        'ciclos': ciclos,
+        'crawler': verificador.estatisticas_crawler(),
+        'notificador': verificador.notificador.estatisticas(),
+        'respostas_429_injetadas': estado.respostas_429,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--paginas', type=int, default=5)
+    parser.add_argument('--ciclos', type=int, default=3)
+    parser.add_argument('--latencia-pagina', type=float, default=0.05, help='segundos por página')
+    parser.add_argument('--latencia-telegram', type=float, default=0.02, help='segundos por sendMessage')
+    parser.add_argument('--taxa-429', type=float, default=0.05, help='fração de sendMessage respondidos com 429')
+    parser.add_argument('--taxa-global', type=float, default=30)
+    parser.add_argument('--taxa-por-chat', type=float, default=1)
+    parser.add_argument('--modo', choices=User.MODOS_NOTIFICACAO, default=User.MODO_RESUMO)
+    parser.add_argument('--variar', action='store_true', help='muda os links a cada ciclo')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    resultado = json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(resultado)
+    else:
+        print(resultado)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Micro-benchmark: índice Aho-Corasick x laço `any(...)` do antigo `projeto_corresponde`.
+
+Uso:
+    python -m benchmarks.bench_indice [--keywords 10000] [--usuarios 500] [--titulos 200]
+"""
+import argparse
+import random
+import string
+import time
+
+from app.indice import IndicePalavrasChave
+
+PALAVRAS_TITULO = [
+    'python', 'django', 'flask', 'excel', 'vba', 'planilha', 'automação', 'site',
+    'wordpress', 'loja', 'virtual', 'api', 'integração', 'react', 'aplicativo',
+    'android', 'scraping', 'dados', 'dashboard', 'power', 'bi', 'design', 'logo',
+]
+
+
+def projeto_corresponde(titulo_projeto, keywords):
+    """Implementação original, usada como referência."""
+    return any(keyword.lower() in titulo_projeto.lower() for keyword in keywords)
+
+
+def gerar_dados(total_keywords, total_usuarios, total_titulos, semente=42):
+    aleatorio = random.Random(semente)
+    assinantes = {user_id: {'keywords': []} for user_id in range(total_usuarios)}
+    for _ in range(total_keywords):
+        if aleatorio.random() < 0.2:
+            keyword = aleatorio.choice(PALAVRAS_TITULO)
+        else:
+            keyword = ''.join(aleatorio.choices(string.ascii_lowercase, k=aleatorio.randint(4, 10)))
+        assinantes[aleatorio.randrange(total_usuarios)]['keywords'].append(keyword)
+    titulos = [
+        ' '.join(aleatorio.choices(PALAVRAS_TITULO, k=aleatorio.randint(4, 10))).capitalize()
+        for _ in range(total_titulos)
+    ]
+    return assinantes, titulos
+
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--keywords', type=int, default=10000)
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--titulos', type=int, default=200)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    assinantes, titulos = gerar_dados(args.keywords, args.usuarios, args.titulos)
+
+    def laco_any():
+        return {
+            (titulo, user_id)
+            for titulo in titulos
+            for user_id, assinante in assinantes.items()
+            if projeto_corresponde(titulo, assinante['keywords'])
+        }
+
+    tempo_construcao, indice = medir(lambda: IndicePalavrasChave.a_partir_de_assinantes(assinantes), args.repeticoes)
+
+    def laco_indice():
+        return {
+            (titulo, user_id)
+            for titulo in titulos
+            for user_id in indice.usuarios_correspondentes(titulo)
+        }
+
+    tempo_any, esperado = medir(laco_any, args.repeticoes)
+    tempo_indice, obtido = medir(laco_indice, args.repeticoes)
+    assert esperado == obtido, 'O índice divergiu da implementação original'
+
+    print(f"keywords={args.keywords} usuarios={args.usuarios} titulos={args.titulos} correspondencias={len(obtido)}")
+    print(f"any(...)            : {tempo_any * 1000:10.2f} ms")
+    print(f"Aho-Corasick (busca): {tempo_indice * 1000:10.2f} ms")
+    print(f"Aho-Corasick (build): {tempo_construcao * 1000:10.2f} ms")
+    print(f"Ganho na busca      : {tempo_any / tempo_indice:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark do parser de listagem sobre as páginas gravadas em test/fixtures.
+
+Compara o parser antigo (duas consultas XPath recompiladas e pareamento por índice)
+com `extrair_projetos` (um XPath compilado seleciona os itens e cada item é percorrido
+uma única vez, sem expressões regulares). Cada medida é o melhor de várias rodadas, para reduzir o ruído da máquina.
+
+Uso:
+    python -m benchmarks.bench_listagem [--repeticoes 200]
+"""
+import argparse
+import glob
+import os
+import time
+
+from lxml import etree, html
+
+from app.listagem import extrair_projetos, extrair_projetos_da_arvore
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'test', 'fixtures')
+
+
+def parser_antigo(conteudo):
+    """Implementação original de `obter_titulos_links_projetos`, usada como referência."""
+    return consultas_antigas(html.fromstring(conteudo))
+
+
+def consultas_antigas(tree):
+    titulos = tree.xpath('//h1[@class="title"]/a/text()')
+    links = tree.xpath('//h1[@class="title"]/a/@href')
+    return [{"titulo": titulos[i], "link": links[i]} for i in range(len(titulos))]
+
+
+def medir(funcao, paginas, repeticoes, rodadas=5):
+    melhor = None
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            for conteudo in paginas:
+                funcao(conteudo)
+        tempo = (time.perf_counter() - inicio) / (repeticoes * len(paginas))
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=200)
+    args = parser.parse_args()
+
+    paginas = []
+    for caminho in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(caminho, encoding='utf-8') as arquivo:
+            paginas.append(arquivo.read())
+
+    projetos = sum(len(extrair_projetos(conteudo)) for conteudo in paginas)
+    arvores = [html.fromstring(conteudo) for conteudo in paginas]
+    arvores_simples = [etree.HTML(conteudo) for conteudo in paginas]
+    tempo_parse = medir(html.fromstring, paginas, args.repeticoes)
+    tempo_parse_simples = medir(etree.HTML, paginas, args.repeticoes)
+    tempo_antigo = medir(parser_antigo, paginas, args.repeticoes)
+    tempo_novo = medir(extrair_projetos, paginas, args.repeticoes)
+    tempo_consultas_antigas = medir(consultas_antigas, arvores, args.repeticoes)
+    tempo_extracao_nova = medir(extrair_projetos_da_arvore, arvores_simples, args.repeticoes)
+
+    print(f"paginas={len(paginas)} projetos={projetos} repeticoes={args.repeticoes}")
+    print(f"html.fromstring                      : {tempo_parse * 1e6:9.1f} us/pagina")
+    print(f"etree.HTML                           : {tempo_parse_simples * 1e6:9.1f} us/pagina")
+    print(f"parser antigo (titulo, link)         : {tempo_antigo * 1e6:9.1f} us/pagina")
+    print(f"  so as consultas XPath              : {tempo_consultas_antigas * 1e6:9.1f} us/pagina")
+    print(f"extrair_projetos (todos os campos)   : {tempo_novo * 1e6:9.1f} us/pagina")
+    print(f"  so a extracao                      : {tempo_extracao_nova * 1e6:9.1f} us/pagina")
+
+
+if __name__ == '__main__':
+    main()
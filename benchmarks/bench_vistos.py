@@ -0,0 +1,124 @@
+"""
+Benchmark do registro de links vistos: memória, taxa de acerto e custo da deduplicação.
+
+Simula ciclos em que a listagem avança `--novos` projetos por ciclo e cada projeto corresponde
+a alguns usuários. Compara o RegistroDeLinksVistos (memória + links_vistos) com a
+deduplicação feita só no banco (consulta a user_matches por página), em um SQLite em memória.
+
+Uso:
+    python -m benchmarks.bench_vistos [--usuarios 500] [--ciclos 50] [--por-pagina 100]
+        [--novos 10] [--por-projeto 20] [--itens 100000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from app import create_app, db
+from app.models import User, Project, UserMatch, LinkVisto
+from app.vistos import RegistroDeLinksVistos
+
+
+def medir_memoria(total_itens):
+    """Memória ocupada por `total_itens` pares no registro em memória."""
+    tracemalloc.start()
+    registro = RegistroDeLinksVistos()
+    registro.lembrar(LinkVisto.calcular_hash(indice % 1000, f'/project/{indice}') for indice in range(total_itens))
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'itens': total_itens, 'bytes': atual, 'bytes_por_item': round(atual / total_itens, 1)}
+
+
+def gerar_ciclos(args):
+    """Lista de correspondências (user_id, projeto) de cada ciclo, com a listagem andando `novos` por ciclo."""
+    aleatorio = random.Random(args.semente)
+    interessados = {}
+    ciclos = []
+    for ciclo in range(args.ciclos):
+        primeiro = ciclo * args.novos
+        correspondencias = []
+        for numero in range(primeiro, primeiro + args.por_pagina):
+            if numero not in interessados:
+                interessados[numero] = aleatorio.sample(range(1, args.usuarios + 1), args.por_projeto)
+            projeto = {'titulo': f'Projeto {numero}', 'link': f'/project/{numero}'}
+            correspondencias.extend((user_id, projeto) for user_id in interessados[numero])
+        ciclos.append(correspondencias)
+    return ciclos
+
+
+def executar_registro(ciclos):
+    registro = RegistroDeLinksVistos()
+    inicio = time.perf_counter()
+    for correspondencias in ciclos:
+        candidatos = registro.filtrar_novos(correspondencias)
+        inseridos = LinkVisto.inserir_em_lote([h for _, _, h in candidatos])
+        db.session.commit()
+        registro.lembrar(inseridos)
+    return time.perf_counter() - inicio, registro.estatisticas()
+
+
+def filtrar_pelo_banco(correspondencias):
+    """Referência: deduplicação com uma consulta a user_matches por página, sem registro em memória."""
+    user_ids = {user_id for user_id, _ in correspondencias}
+    links = {projeto['link'] for _, projeto in correspondencias}
+    existentes = set(
+        db.session.query(UserMatch.user_id, Project.link)
+        .join(Project, Project.id == UserMatch.project_id)
+        .filter(UserMatch.user_id.in_(user_ids), Project.link.in_(links))
+    )
+    novos = {}
+    for user_id, projeto in correspondencias:
+        if (user_id, projeto['link']) not in existentes:
+            novos.setdefault((user_id, projeto['link']), (user_id, projeto))
+    return list(novos.values())
+
+
+def executar_banco(ciclos):
+    inicio = time.perf_counter()
+    for correspondencias in ciclos:
+        novos = filtrar_pelo_banco(correspondencias)
+        if novos:
+            ids = Project.registrar_em_lote(projeto for _, projeto in novos)
+            UserMatch.inserir_em_lote([
+                {'user_id': user_id, 'project_id': ids[projeto['link']], 'keyword_id': None} for user_id, projeto in novos
+            ])
+        db.session.commit()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--ciclos', type=int, default=50)
+    parser.add_argument('--por-pagina', type=int, default=100, help='projetos na listagem por ciclo')
+    parser.add_argument('--novos', type=int, default=10, help='projetos novos por ciclo')
+    parser.add_argument('--por-projeto', type=int, default=20, help='usuários interessados em cada projeto')
+    parser.add_argument('--itens', type=int, default=100000, help='itens da medição de memória')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    ciclos = gerar_ciclos(args)
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all(User(username=f'u{indice}', email=f'u{indice}@example.com', password_hash='x')
+                           for indice in range(args.usuarios))
+        db.session.commit()
+
+        tempo_registro, estatisticas = executar_registro(ciclos)
+        tempo_banco = executar_banco(ciclos)
+        db.session.remove()
+        db.drop_all()
+
+    pares = sum(len(correspondencias) for correspondencias in ciclos)
+    print(f"{args.ciclos} ciclos, {pares} pares verificados")
+    print(f"registro de links vistos: {tempo_registro * 1000:8.1f} ms  "
+          f"(taxa de acerto em memória {estatisticas['taxa_acerto']:.1%}, {estatisticas['itens']} itens)")
+    print(f"somente banco:            {tempo_banco * 1000:8.1f} ms")
+    memoria = medir_memoria(args.itens)
+    print(f"memória: {memoria['bytes'] / 1024 / 1024:.1f} MiB para {memoria['itens']} itens "
+          f"({memoria['bytes_por_item']} bytes/item)")
+
+
+if __name__ == '__main__':
+    main()
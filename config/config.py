@@ -4,9 +4,74 @@ from dotenv import load_dotenv
 # Carregar variáveis do arquivo .env
 load_dotenv()
 
+# Pool de conexões do SQLAlchemy. O PostgreSQL de produção aceita poucas conexões, que são
+# divididas entre todos os processos: os workers do gunicorn (WEB_CONCURRENCY) e, quando o bot
+# não roda embutido, o worker.py. Dentro de cada processo, rotas, APScheduler e o runtime do bot
+# compartilham o mesmo pool.
+DB_MAX_CONEXOES = int(os.getenv('DB_MAX_CONEXOES', 20))  # Limite do banco menos uma folga para migrações e psql
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # Segundos esperando uma conexão livre
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Segundos até renovar uma conexão
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+
+def orcamento_de_conexoes(max_conexoes=DB_MAX_CONEXOES, web_workers=WEB_CONCURRENCY, bot_embutido=None):
+    """Conexões que cada processo pode abrir para que, somados, não passem de `max_conexoes`."""
+    if bot_embutido is None:
+        bot_embutido = os.getenv('BOT_EMBUTIDO', 'true').lower() == 'true'
+    processos = max(1, web_workers) + (0 if bot_embutido else 1)
+    return max(1, max_conexoes // processos)
+
+
+def opcoes_do_engine(uri, orcamento=None):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS para a URI. Em bancos servidor, pool_size + max_overflow
+    ficam dentro do orçamento de conexões do processo; o SQLite usa o pool padrão.
+    """
+    opcoes = {'pool_pre_ping': DB_POOL_PRE_PING, 'pool_recycle': DB_POOL_RECYCLE}
+    if not uri or uri.startswith('sqlite'):
+        return opcoes
+    orcamento = orcamento or orcamento_de_conexoes()
+    pool_size = max(1, min(DB_POOL_SIZE, orcamento))
+    opcoes.update(
+        pool_size=pool_size,
+        max_overflow=max(0, min(DB_MAX_OVERFLOW, orcamento - pool_size)),
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return opcoes
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY') or os.urandom(24)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Executa o bot dentro do processo web. Desative quando o worker (worker.py) estiver rodando.
+    BOT_EMBUTIDO = os.getenv('BOT_EMBUTIDO', 'true').lower() == 'true'
+    # O stream SSE do dashboard é um long-poll: cada conexão termina no primeiro evento ou após
+    # SSE_DURACAO segundos, e o navegador reconecta SSE_RECONEXAO_S segundos depois. Enquanto
+    # aberta, ela ocupa uma thread do gunicorn (gthread, GUNICORN_THREADS no Procfile): cada aba
+    # aberta usa em média SSE_DURACAO / (SSE_DURACAO + SSE_RECONEXAO_S) de uma thread, então um
+    # worker com 8 threads comporta cerca de 24 abas ociosas com os valores padrão antes de as
+    # demais requisições esperarem. O --timeout do gunicorn deve ser maior que SSE_DURACAO.
+    SSE_DURACAO = float(os.getenv('SSE_DURACAO', 5))
+    SSE_RECONEXAO_S = float(os.getenv('SSE_RECONEXAO_S', 10))
+    # Quantidade máxima de palavras-chave aceitas por requisição de importação em lote
+    MAX_KEYWORDS_IMPORTACAO = int(os.getenv('MAX_KEYWORDS_IMPORTACAO', 1000))
+    # Usuários por página na listagem do painel do admin
+    USUARIOS_POR_PAGINA = int(os.getenv('USUARIOS_POR_PAGINA', 50))
+    # Onde ficam os limites de tentativas de login: 'memoria' (por processo) ou 'banco' (compartilhado)
+    LIMITE_LOGIN_BACKEND = os.getenv('LIMITE_LOGIN_BACKEND', 'memoria')
+    # Proxies à frente da aplicação que acrescentam X-Forwarded-For (1 no Heroku)
+    PROXIES_CONFIAVEIS = int(os.getenv('PROXIES_CONFIAVEIS', 0))
+    # Bot usado no deep link de associação do chat (https://t.me/<bot>?start=<token>)
+    TELEGRAM_BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME', 'O_Freela_bot')
+    # Segredo (A-Z, a-z, 0-9, _ e -) que o Telegram envia em X-Telegram-Bot-Api-Secret-Token;
+    # registrado com `flask --app run registrar-webhook <url>`. Sem ele o webhook recusa tudo
+    TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+    # Por quantos minutos o link de associação gerado no dashboard continua válido
+    TOKEN_TELEGRAM_VALIDADE_MINUTOS = int(os.getenv('TOKEN_TELEGRAM_VALIDADE_MINUTOS', 15))
+    # Token que o coletor do Prometheus envia em /metrics (Authorization: Bearer <token>)
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN')
 
     @staticmethod
     def init_app(app):
@@ -16,6 +81,7 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///app.db')
+    SQLALCHEMY_ENGINE_OPTIONS = opcoes_do_engine(SQLALCHEMY_DATABASE_URI)
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -25,10 +91,16 @@ class ProductionConfig(Config):
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://")
 
+    SQLALCHEMY_ENGINE_OPTIONS = opcoes_do_engine(SQLALCHEMY_DATABASE_URI)
+    # O roteador do Heroku acrescenta o IP do cliente ao X-Forwarded-For; sem isso todos os
+    # clientes dividiriam o mesmo balde de login (o do roteador)
+    PROXIES_CONFIAVEIS = int(os.getenv('PROXIES_CONFIAVEIS', 1))
+
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # Banco de dados em memória para testes
     WTF_CSRF_ENABLED = False  # Desativar CSRF para facilitar testes
+    BOT_EMBUTIDO = False  # Os testes não devem iniciar o bot em segundo plano
 
 # Mapeando os ambientes para facilitar o uso no create_app
 config = {
@@ -0,0 +1,9 @@
+# Configuração lida automaticamente pelo gunicorn (./gunicorn.conf.py); as opções de linha
+# de comando do Procfile continuam valendo.
+
+
+def post_worker_init(worker):
+    # O bot embutido só é iniciado nos workers que atendem requisições, depois de carregarem
+    # a aplicação; importar run.py (por exemplo, em `flask --app run ...`) não o inicia
+    from run import iniciar_bot_embutido
+    iniciar_bot_embutido()
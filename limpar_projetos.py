@@ -1,5 +1,5 @@
 from app import create_app, db
-from app.models import Project
+from app.models import Project, UserMatch
 import logging
 
 # Inicializando o aplicativo Flask
@@ -11,10 +11,11 @@ logging.basicConfig(level=logging.INFO)
 
 def limpar_projetos():
     """
-    Remove todos os projetos da tabela Project.
+    Remove todos os projetos do catálogo e as correspondências dos usuários.
     """
     try:
         with app.app_context():
+            db.session.query(UserMatch).delete()
             num_rows_deleted = db.session.query(Project).delete()
             db.session.commit()
             logger.info(f"{num_rows_deleted} projetos removidos do banco de dados.")
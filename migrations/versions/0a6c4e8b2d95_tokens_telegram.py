@@ -0,0 +1,43 @@
+"""tokens_telegram para o deep link /start e índice em users.chat_id
+
+Revision ID: 0a6c4e8b2d95
+Revises: f3a8d1c6b270
+Create Date: 2026-10-18 16:48:12.604931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c4e8b2d95'
+down_revision = 'f3a8d1c6b270'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tokens_telegram',
+    sa.Column('token', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('token')
+    )
+    with op.batch_alter_table('tokens_telegram', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tokens_telegram_expira_em'), ['expira_em'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tokens_telegram_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_chat_id'), ['chat_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_chat_id'))
+
+    with op.batch_alter_table('tokens_telegram', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tokens_telegram_user_id'))
+        batch_op.drop_index(batch_op.f('ix_tokens_telegram_expira_em'))
+
+    op.drop_table('tokens_telegram')
@@ -0,0 +1,26 @@
+"""versão das palavras-chave por usuário
+
+Revision ID: 3f7a2c9e5b14
+Revises: 8e4b1d6a09c5
+Create Date: 2026-10-18 11:42:31.508216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a2c9e5b14'
+down_revision = '8e4b1d6a09c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('keywords_versao', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('keywords_versao')
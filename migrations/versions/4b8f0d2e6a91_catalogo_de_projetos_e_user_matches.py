@@ -0,0 +1,97 @@
+"""catálogo global de projetos e tabela user_matches
+
+Revision ID: 4b8f0d2e6a91
+Revises: e91b5a3c7d28
+Create Date: 2026-10-18 13:21:07.362514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b8f0d2e6a91'
+down_revision = 'e91b5a3c7d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A tabela antiga, com uma cópia do projeto por usuário, é mantida até os dados serem movidos
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_user_id_link')
+    op.rename_table('projects', 'projects_por_usuario')
+
+    op.create_table('projects',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('link', sa.String(length=255), nullable=False),
+    sa.Column('published_at', sa.DateTime(), nullable=True),
+    sa.Column('proposals', sa.Integer(), nullable=True),
+    sa.Column('budget', sa.String(length=100), nullable=True),
+    sa.Column('date_added', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_projects_link'), ['link'], unique=True)
+        batch_op.create_index(batch_op.f('ix_projects_date_added'), ['date_added'], unique=False)
+
+    op.create_table('user_matches',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('matched_at', sa.DateTime(), nullable=False),
+    sa.Column('keyword_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['keyword_id'], ['keywords.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('user_id', 'project_id')
+    )
+    with op.batch_alter_table('user_matches', schema=None) as batch_op:
+        batch_op.create_index('ix_user_matches_user_id_matched_at', ['user_id', 'matched_at'], unique=False)
+        batch_op.create_index('ix_user_matches_project_id', ['project_id'], unique=False)
+
+    # Um registro por link no catálogo, com o título da primeira cópia gravada (menor id)
+    # e a data mais antiga
+    op.execute(
+        "INSERT INTO projects (title, link, date_added) "
+        "SELECT antigo.title, antigo.link, primeiras.date_added "
+        "FROM projects_por_usuario AS antigo JOIN ("
+        "SELECT MIN(id) AS id, MIN(date_added) AS date_added FROM projects_por_usuario GROUP BY link"
+        ") AS primeiras ON primeiras.id = antigo.id"
+    )
+    op.execute(
+        "INSERT INTO user_matches (user_id, project_id, matched_at) "
+        "SELECT antigo.user_id, projects.id, COALESCE(antigo.date_added, projects.date_added, CURRENT_TIMESTAMP) "
+        "FROM projects_por_usuario AS antigo JOIN projects ON projects.link = antigo.link"
+    )
+    op.drop_table('projects_por_usuario')
+
+
+def downgrade():
+    op.create_table('projects_por_usuario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('link', sa.String(length=255), nullable=False),
+    sa.Column('date_added', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO projects_por_usuario (title, link, date_added, user_id) "
+        "SELECT projects.title, projects.link, user_matches.matched_at, user_matches.user_id "
+        "FROM user_matches JOIN projects ON projects.id = user_matches.project_id"
+    )
+
+    with op.batch_alter_table('user_matches', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_matches_project_id')
+        batch_op.drop_index('ix_user_matches_user_id_matched_at')
+    op.drop_table('user_matches')
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_projects_date_added'))
+        batch_op.drop_index(batch_op.f('ix_projects_link'))
+    op.drop_table('projects')
+
+    op.rename_table('projects_por_usuario', 'projects')
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_user_id_link', ['user_id', 'link'], unique=True)
@@ -0,0 +1,26 @@
+"""modo de notificação do usuário
+
+Revision ID: 5c1e07b9d3f2
+Revises: a20a74cb1bc0
+Create Date: 2026-10-18 10:02:47.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e07b9d3f2'
+down_revision = 'a20a74cb1bc0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('modo_notificacao', sa.String(length=20), nullable=False, server_default='instantaneo'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('modo_notificacao')
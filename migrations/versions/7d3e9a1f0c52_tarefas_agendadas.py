@@ -0,0 +1,32 @@
+"""tabela tarefas_agendadas para as tarefas periódicas
+
+Revision ID: 7d3e9a1f0c52
+Revises: 4b8f0d2e6a91
+Create Date: 2026-10-18 14:02:44.185630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3e9a1f0c52'
+down_revision = '4b8f0d2e6a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tarefas_agendadas',
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('proxima_execucao', sa.DateTime(), nullable=False),
+    sa.Column('executada_por', sa.String(length=100), nullable=True),
+    sa.Column('ultima_execucao', sa.DateTime(), nullable=True),
+    sa.Column('ultima_duracao_s', sa.Float(), nullable=True),
+    sa.Column('ultimo_erro', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('nome')
+    )
+
+
+def downgrade():
+    op.drop_table('tarefas_agendadas')
@@ -0,0 +1,26 @@
+"""estado do bot por usuário
+
+Revision ID: 8e4b1d6a09c5
+Revises: 5c1e07b9d3f2
+Create Date: 2026-10-18 11:20:05.117342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b1d6a09c5'
+down_revision = '5c1e07b9d3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bot_ativo', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('bot_ativo')
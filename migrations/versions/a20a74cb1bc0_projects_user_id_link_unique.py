@@ -0,0 +1,31 @@
+"""índice único (user_id, link) em projects
+
+Revision ID: a20a74cb1bc0
+Revises: dad8cfee7417
+Create Date: 2026-10-18 09:12:31.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a20a74cb1bc0'
+down_revision = 'dad8cfee7417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Remove duplicatas antigas, mantendo o registro mais antigo de cada (user_id, link)
+    op.execute(
+        "DELETE FROM projects WHERE id NOT IN "
+        "(SELECT MIN(id) FROM projects GROUP BY user_id, link)"
+    )
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.create_index('ix_projects_user_id_link', ['user_id', 'link'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_index('ix_projects_user_id_link')
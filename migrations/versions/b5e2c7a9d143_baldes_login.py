@@ -0,0 +1,34 @@
+"""tabela baldes_login para o limite de tentativas de login
+
+Revision ID: b5e2c7a9d143
+Revises: 7d3e9a1f0c52
+Create Date: 2026-10-18 15:21:09.532817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2c7a9d143'
+down_revision = '7d3e9a1f0c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('baldes_login',
+    sa.Column('chave', sa.String(length=200), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('atualizado_em', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('chave')
+    )
+    with op.batch_alter_table('baldes_login', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_baldes_login_atualizado_em'), ['atualizado_em'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('baldes_login', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_baldes_login_atualizado_em'))
+
+    op.drop_table('baldes_login')
@@ -0,0 +1,33 @@
+"""índice único (user_id, keyword) em keywords
+
+Revision ID: c62d8e1f4a07
+Revises: 3f7a2c9e5b14
+Create Date: 2026-10-18 12:05:48.730915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62d8e1f4a07'
+down_revision = '3f7a2c9e5b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Aplica a mesma limpeza de Keyword.clean_keyword e remove as duplicatas resultantes,
+    # mantendo o registro mais antigo de cada (user_id, keyword)
+    op.execute("UPDATE keywords SET keyword = LOWER(TRIM(keyword))")
+    op.execute(
+        "DELETE FROM keywords WHERE id NOT IN "
+        "(SELECT MIN(id) FROM keywords GROUP BY user_id, keyword)"
+    )
+    with op.batch_alter_table('keywords', schema=None) as batch_op:
+        batch_op.create_index('ix_keywords_user_id_keyword', ['user_id', 'keyword'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('keywords', schema=None) as batch_op:
+        batch_op.drop_index('ix_keywords_user_id_keyword')
@@ -0,0 +1,50 @@
+"""tabela links_vistos para deduplicação com TTL
+
+Revision ID: e91b5a3c7d28
+Revises: c62d8e1f4a07
+Create Date: 2026-10-18 12:40:12.904471
+
+"""
+from datetime import datetime, timezone
+from hashlib import blake2b
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b5a3c7d28'
+down_revision = 'c62d8e1f4a07'
+branch_labels = None
+depends_on = None
+
+
+def calcular_hash(user_id, link):
+    # Mesmo cálculo de LinkVisto.calcular_hash, copiado para a migração não depender do modelo
+    digest = blake2b(f'{user_id}:{link}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def upgrade():
+    links_vistos = op.create_table('links_vistos',
+    sa.Column('hash', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('visto_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    with op.batch_alter_table('links_vistos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_links_vistos_visto_em'), ['visto_em'], unique=False)
+
+    # Os projetos já salvos continuam contando como vistos, para não serem notificados de novo
+    agora = datetime.now(timezone.utc)
+    projetos = op.get_bind().execute(
+        sa.text("SELECT user_id, link, date_added FROM projects").columns(date_added=sa.DateTime()))
+    registros = {calcular_hash(user_id, link): date_added or agora for user_id, link, date_added in projetos}
+    if registros:
+        op.bulk_insert(links_vistos, [{'hash': h, 'visto_em': visto_em} for h, visto_em in registros.items()])
+
+
+def downgrade():
+    with op.batch_alter_table('links_vistos', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_links_vistos_visto_em'))
+
+    op.drop_table('links_vistos')
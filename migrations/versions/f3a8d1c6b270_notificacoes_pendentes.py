@@ -0,0 +1,40 @@
+"""caixa de saída notificacoes_pendentes
+
+Revision ID: f3a8d1c6b270
+Revises: b5e2c7a9d143
+Create Date: 2026-10-18 16:04:37.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d1c6b270'
+down_revision = 'b5e2c7a9d143'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notificacoes_pendentes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.String(length=100), nullable=False),
+    sa.Column('texto', sa.Text(), nullable=False),
+    sa.Column('resumo', sa.Boolean(), nullable=False),
+    sa.Column('criada_em', sa.DateTime(), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+    sa.Column('reservada_por', sa.String(length=100), nullable=True),
+    sa.Column('reservada_ate', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notificacoes_pendentes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notificacoes_pendentes_proxima_tentativa'), ['proxima_tentativa'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notificacoes_pendentes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notificacoes_pendentes_proxima_tentativa'))
+
+    op.drop_table('notificacoes_pendentes')
@@ -0,0 +1,30 @@
+"""estado_do_bot com a fotografia do runtime do bot
+
+Revision ID: fdb16f29e60b
+Revises: 0a6c4e8b2d95
+Create Date: 2026-10-18 12:24:40.242672
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fdb16f29e60b'
+down_revision = '0a6c4e8b2d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('estado_do_bot',
+    sa.Column('nome', sa.String(length=100), nullable=False),
+    sa.Column('processo', sa.String(length=100), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.Column('dados', sa.Text(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+
+
+def downgrade():
+    op.drop_table('estado_do_bot')
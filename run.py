@@ -1,8 +1,13 @@
 import os
+import click
 from app import create_app, db
 from flask_apscheduler import APScheduler
-from datetime import datetime
-from app.models import Project
+from datetime import datetime, timedelta
+from app.models import Project, LinkVisto, BaldeDeLogin, TokenTelegram
+from app.vistos import TTL_LINKS_VISTOS_HORAS
+from app.limite_login import LOGIN_JANELA_S
+from app.agendador import obter_agendador
+from app.tarefas import executar_uma_vez_por_intervalo
 
 class Config:
     SCHEDULER_API_ENABLED = True
@@ -23,20 +28,70 @@ if env == 'development':
 # Inicializa o APScheduler
 scheduler = APScheduler()
 
-@scheduler.task('interval', hours=12)
+# Cada worker do gunicorn consulta a tarefa a cada poucos minutos, mas só quem reivindica
+# a execução vencida no banco a executa: uma limpeza a cada 12 horas no deploy inteiro,
+# mesmo que os processos sejam reiniciados antes disso.
+INTERVALO_LIMPEZA = timedelta(hours=12)
+VERIFICACAO_TAREFAS_MINUTOS = int(os.getenv('VERIFICACAO_TAREFAS_MINUTOS', 5))
+
+def delete_old_projects():
+    Project.delete_old_projects()
+    # A deduplicação usa links_vistos, que tem TTL próprio e mais longo
+    LinkVisto.delete_expired(TTL_LINKS_VISTOS_HORAS)
+    # Baldes de login parados há mais de uma janela já estão cheios
+    BaldeDeLogin.delete_expired(LOGIN_JANELA_S)
+    TokenTelegram.delete_expired()
+    print(f"[{datetime.now()}] Projetos antigos deletados com sucesso.")
+
+@scheduler.task('interval', minutes=VERIFICACAO_TAREFAS_MINUTOS)
 def delete_old_projects_task():
     """
-    Tarefa agendada para excluir projetos antigos a cada 12 horas.
-    Garantindo que o contexto de aplicação esteja ativo.
+    Tarefa agendada para excluir projetos antigos a cada 12 horas,
+    executada por apenas um processo (ver app.tarefas).
     """
-    with app.app_context():
-        Project.delete_old_projects()
-        print(f"[{datetime.now()}] Projetos antigos deletados com sucesso.")
+    executar_uma_vez_por_intervalo(app, 'delete_old_projects', INTERVALO_LIMPEZA, delete_old_projects)
 
 # Inicializa o agendamento no app Flask
 scheduler.init_app(app)
 scheduler.start()
 
+@app.cli.command('registrar-webhook')
+@click.argument('url')
+def registrar_webhook(url):
+    """
+    Registra URL (https://<app>/webhook/telegram) como webhook do bot, com o segredo de
+    TELEGRAM_WEBHOOK_SECRET que o Telegram passa a enviar em cada atualização.
+    """
+    import requests
+    from app.notificador import TELEGRAM_API_URL
+
+    token = os.getenv('TELEGRAM_TOKEN')
+    segredo = app.config.get('TELEGRAM_WEBHOOK_SECRET')
+    if not token or not segredo:
+        raise click.ClickException('Defina TELEGRAM_TOKEN e TELEGRAM_WEBHOOK_SECRET antes de registrar o webhook.')
+    resposta = requests.post(f"{TELEGRAM_API_URL}/bot{token}/setWebhook", data={
+        'url': url,
+        'secret_token': segredo,
+        'allowed_updates': '["message"]',
+    }, timeout=15)
+    dados = resposta.json()
+    if not dados.get('ok'):
+        raise click.ClickException(f"O Telegram recusou o webhook: {dados.get('description')}")
+    click.echo(f"Webhook registrado em {url}.")
+
+def iniciar_bot_embutido():
+    """
+    Retoma o bot dos usuários ativos quando ele roda dentro do processo web. Chamado só por
+    processos que atendem requisições (gunicorn.conf.py e app.run abaixo), nunca na
+    importação: comandos como `flask --app run db upgrade` não devem assumir o lease do bot.
+    """
+    if app.config.get('BOT_EMBUTIDO'):
+        obter_agendador(app).iniciar_em_thread()
+
 if __name__ == '__main__':
+    debug = env == 'development'
+    # Com o reloader, só o processo filho (WERKZEUG_RUN_MAIN) atende requisições
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        iniciar_bot_embutido()
     # Executa o aplicativo no modo debug apenas se o ambiente for 'development'
-    app.run(debug=(env == 'development'))
+    app.run(debug=debug)
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Keyword, Project, UserMatch
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def usuarios(app):
+    admin = User(username='admin', email='admin@example.com', is_admin=True)
+    admin.set_password('senha')
+    db.session.add(admin)
+    for indice in range(5):
+        user = User(username=f'usuario{indice}', email=f'usuario{indice}@example.com', password_hash='x',
+                    is_subscriber=indice % 2 == 0, bot_ativo=indice == 1)
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Keyword(keyword=f'termo{n}', user_id=user.id) for n in range(indice))
+    db.session.commit()
+    ids = Project.registrar_em_lote({'titulo': 'Projeto', 'link': f'/project/{n}'} for n in range(10))
+    UserMatch.inserir_em_lote([
+        {'user_id': user.id, 'project_id': ids[f'/project/{n}'], 'keyword_id': None}
+        for indice, user in enumerate(User.query.filter(User.username != 'admin').order_by(User.id))
+        for n in range(2 * indice)
+    ])
+    db.session.commit()
+
+def test_listagem_agregada_em_uma_consulta(app, usuarios):
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+    linhas, proximo = User.listar_para_admin(busca='usuario', limite=10)
+
+    assert len(consultas) == 1
+    assert proximo is None
+    assert [(linha.username, linha.total_keywords, linha.total_projetos) for linha in linhas] == [
+        (f'usuario{indice}', indice, 2 * indice) for indice in range(5)
+    ]
+    assert linhas[0].ultimo_projeto is None and linhas[1].ultimo_projeto is not None
+    assert [linha.bot_ativo for linha in linhas] == [False, True, False, False, False]
+
+def test_paginacao_por_chave_e_filtros(app, usuarios):
+    primeira, proximo = User.listar_para_admin(is_admin=False, limite=2)
+    segunda, ultimo = User.listar_para_admin(is_admin=False, apos_id=proximo, limite=2)
+    terceira, fim = User.listar_para_admin(is_admin=False, apos_id=ultimo, limite=2)
+
+    assert [linha.username for linha in primeira + segunda + terceira] == [f'usuario{indice}' for indice in range(5)]
+    assert fim is None
+    assert [linha.username for linha in User.listar_para_admin(is_subscriber=True)[0]] == ['usuario0', 'usuario2', 'usuario4']
+    assert [linha.username for linha in User.listar_para_admin(is_admin=True)[0]] == ['admin']
+
+def test_painel_do_admin_pagina_e_filtra(app, usuarios):
+    app.config['USUARIOS_POR_PAGINA'] = 2
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='admin', password='senha'))
+
+    pagina = client.get('/admin?q=usuario&assinante=1').get_data(as_text=True)
+
+    assert 'usuario0' in pagina and 'usuario2' in pagina and 'usuario4' not in pagina
+    assert 'apos=' in pagina and 'assinante=1' in pagina
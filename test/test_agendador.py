@@ -0,0 +1,285 @@
+import asyncio
+from datetime import timedelta
+import time
+import pytest
+from app import create_app, create_worker_app, db
+from app.models import User, Keyword, Project, UserMatch, TarefaAgendada
+from app.agendador import AgendadorDoBot, LIDERANCA_BOT
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def usuarios(app):
+    # ana: bot ligado; bruno: bot desligado; carla: bot ligado, mas sem chat_id
+    dados = [('ana', True, 'chat-ana'), ('bruno', False, 'chat-bruno'), ('carla', True, None)]
+    for nome, bot_ativo, chat_id in dados:
+        user = User(username=nome, email=f'{nome}@example.com', chat_id=chat_id, bot_ativo=bot_ativo)
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Keyword(keyword='python', user_id=user.id))
+    db.session.commit()
+    return {user.username: user.id for user in User.query.all()}
+
+class VerificadorFalso:
+    def __init__(self):
+        self.ciclos = []
+        self.fechado = False
+
+    async def executar_verificacao_compartilhada(self, total_pages, assinantes, bot_token, app, indice=None):
+        self.ciclos.append(assinantes)
+
+    async def despachar_notificacoes(self, bot_token, app, incluir_resumos=True):
+        return 0
+
+    async def fechar(self):
+        self.fechado = True
+
+def test_carrega_apenas_usuarios_ativos_com_chat(app, usuarios):
+    agendador = AgendadorDoBot(app, verificador=VerificadorFalso())
+
+    assinantes = agendador.carregar_assinantes()
+
+    assert assinantes == {
+        usuarios['ana']: {
+            'keywords': ['python'],
+            'keyword_ids': {'python': Keyword.query.filter_by(user_id=usuarios['ana']).one().id},
+            'chat_id': 'chat-ana',
+            'modo_notificacao': User.MODO_INSTANTANEO,
+        },
+    }
+
+def test_recarrega_apenas_palavras_chave_alteradas(app, usuarios):
+    agendador = AgendadorDoBot(app, verificador=VerificadorFalso())
+    agendador.carregar_assinantes()
+    assert agendador.indice.usuarios_correspondentes('Bot em Python') == {usuarios['ana']}
+
+    ana = db.session.get(User, usuarios['ana'])
+    db.session.add(Keyword(keyword='django', user_id=ana.id))
+    Keyword.query.filter_by(user_id=ana.id, keyword='python').delete()
+    ana.marcar_keywords_alteradas()
+    db.session.commit()
+    agendador.carregar_assinantes()
+
+    assert agendador.indice.usuarios_correspondentes('Bot em Python') == set()
+    assert agendador.indice.usuarios_correspondentes('API em Django') == {usuarios['ana']}
+    assert agendador.keywords_carregadas[usuarios['ana']] == (1, ['django'])
+
+    ana.bot_ativo = False
+    db.session.commit()
+    assert agendador.carregar_assinantes() == {}
+    assert len(agendador.indice) == 0
+
+def test_runtime_executa_ciclos_em_um_unico_loop_e_para_imediatamente(app, usuarios):
+    verificador = VerificadorFalso()
+    agendador = AgendadorDoBot(app, verificador=verificador, intervalo_min=60, intervalo_max=60)
+
+    async def executar():
+        tarefa = asyncio.create_task(agendador.executar())
+        await asyncio.sleep(0.05)
+        agendador.acordar()  # Antecipa o segundo ciclo sem esperar o intervalo
+        await asyncio.sleep(0.05)
+        agendador.parar()  # Interrompe o intervalo de 60 s
+        await asyncio.wait_for(tarefa, timeout=1)
+
+    asyncio.run(executar())
+
+    assert len(verificador.ciclos) == 2
+    assert verificador.fechado
+
+def test_apenas_um_processo_executa_o_bot(app, usuarios, monkeypatch):
+    verificadores = [VerificadorFalso(), VerificadorFalso()]
+    agendadores = [AgendadorDoBot(app, verificador=verificador, intervalo_min=60, intervalo_max=60)
+                   for verificador in verificadores]
+    # Simula dois workers do gunicorn com identidades diferentes
+    monkeypatch.setattr('app.agendador.IDENTIDADE', 'web-1:1')
+    assert agendadores[0].renovar_lideranca()
+    monkeypatch.setattr('app.agendador.IDENTIDADE', 'web-2:2')
+    assert not agendadores[1].renovar_lideranca()
+
+    async def executar():
+        tarefa = asyncio.create_task(agendadores[1].executar())
+        await asyncio.sleep(0.05)
+        agendadores[1].parar()
+        await asyncio.wait_for(tarefa, timeout=1)
+
+    asyncio.run(executar())
+
+    assert verificadores[1].ciclos == []
+    assert db.session.get(TarefaAgendada, LIDERANCA_BOT).executada_por == 'web-1:1'
+    monkeypatch.setattr('app.agendador.IDENTIDADE', 'web-1:1')
+    agendadores[0].liberar_lideranca()
+    monkeypatch.setattr('app.agendador.IDENTIDADE', 'web-2:2')
+    assert agendadores[1].renovar_lideranca()  # Assume sem esperar o lease vencer
+
+def test_parar_usuario_remove_do_ciclo_em_andamento(app, usuarios):
+    class VerificadorLento(VerificadorFalso):
+        async def executar_verificacao_compartilhada(self, total_pages, assinantes, bot_token, app, indice=None):
+            await asyncio.sleep(0.05)
+            self.ciclos.append(dict(assinantes))
+            return {user_id: [{'titulo': 'Python', 'link': '/project/1'}] for user_id in assinantes}
+
+    verificador = VerificadorLento()
+    agendador = AgendadorDoBot(app, verificador=verificador)
+
+    async def executar():
+        agendador.loop = asyncio.get_running_loop()
+        ciclo = asyncio.create_task(agendador.executar_ciclo())
+        await asyncio.sleep(0.01)
+        agendador.parar_usuario(usuarios['ana'])
+        await ciclo
+
+    asyncio.run(executar())
+
+    assert verificador.ciclos == [{}]
+    status = agendador.jobs.status(usuarios['ana'])
+    assert status['status'] == 'Verificação não iniciada'
+    assert status['ultimo_ciclo'] is None
+
+def test_rotas_de_controle_usam_o_registro(app, usuarios):
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+
+    assert client.get('/status_bot').get_json()['status'] == 'Verificação não iniciada'
+    assert client.post('/start_bot').status_code == 200
+    assert client.get('/status_bot').get_json()['status'] == 'Ativo'
+    assert db.session.get(User, usuarios['bruno']).bot_ativo is True
+
+    client.post('/dashboard', data=dict(keyword='django, python'))
+    db.session.expire_all()
+    assert db.session.get(User, usuarios['bruno']).keywords_versao == 1
+
+    client.post('/stop_bot')
+    assert client.get('/status_bot').get_json()['status'] == 'Verificação não iniciada'
+    db.session.expire_all()
+    assert db.session.get(User, usuarios['bruno']).bot_ativo is False
+
+def test_status_fora_do_lider_vem_do_banco(app, usuarios):
+    agendador = AgendadorDoBot(app, verificador=VerificadorFalso())
+    agendador.jobs.marcar_parado(usuarios['ana'])  # Cache antigo: o bot foi ligado em outro processo
+    job = agendador.status_do_usuario(usuarios['ana'])
+    assert (job['status'], job['ultimo_ciclo'], job['projetos_notificados']) == ('Ativo', None, 0)
+
+    lider = AgendadorDoBot(app, verificador=VerificadorFalso())
+    assert lider.renovar_lideranca()
+    asyncio.run(lider.executar_ciclo())
+    ids = Project.registrar_em_lote([{'titulo': 'Bot em Python', 'link': '/project/9'}])
+    UserMatch.inserir_em_lote([{'user_id': usuarios['ana'], 'project_id': ids['/project/9'], 'keyword_id': None}])
+    db.session.commit()
+
+    job = agendador.status_do_usuario(usuarios['ana'])
+    assert job['ultimo_ciclo'] is not None
+    assert job['projetos_notificados'] == 1
+    assert agendador.status_do_usuario(usuarios['bruno'])['status'] == 'Verificação não iniciada'
+
+def test_stream_envia_status_e_projetos_do_usuario(app, usuarios):
+    app.config['SSE_DURACAO'] = 0.2
+    app.config['BOT_EMBUTIDO'] = True
+    agendador = app.extensions.get('agendador_bot') or AgendadorDoBot(app, verificador=VerificadorFalso())
+    app.extensions['agendador_bot'] = agendador
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+
+    db.session.get(User, usuarios['bruno']).bot_ativo = True
+    db.session.commit()
+    agendador.jobs.marcar_ativo(usuarios['bruno'])
+    ids = Project.registrar_em_lote([{'titulo': 'Python', 'link': '/project/1'}, {'titulo': 'Outro', 'link': '/project/2'}])
+    UserMatch.inserir_em_lote([
+        {'user_id': usuarios['bruno'], 'project_id': ids['/project/1'], 'keyword_id': None},
+        {'user_id': usuarios['ana'], 'project_id': ids['/project/2'], 'keyword_id': None},
+    ])
+    db.session.commit()
+    resposta = client.get('/stream_bot', headers={'Last-Event-ID': '0001-01-01T00:00:00|0'})
+    corpo = resposta.get_data(as_text=True)
+
+    assert resposta.mimetype == 'text/event-stream'
+    assert 'event: status\ndata: {"status": "Ativo"' in corpo
+    assert 'event: projeto\ndata: {"titulo": "Python"' in corpo
+    assert 'Outro' not in corpo
+
+def test_stream_retoma_do_cursor_do_last_event_id(app, usuarios):
+    app.config['SSE_DURACAO'] = 0.2
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+    ids = Project.registrar_em_lote([{'titulo': f'Projeto {i}', 'link': f'/project/{i}'} for i in range(3)])
+    # Correspondências do mesmo lote têm o mesmo matched_at; o project_id desempata
+    UserMatch.inserir_em_lote([{'user_id': usuarios['bruno'], 'project_id': ids[f'/project/{i}'], 'keyword_id': None}
+                               for i in range(2)])
+    db.session.commit()
+
+    primeira = client.get('/stream_bot').get_data(as_text=True)
+    assert 'event: projeto' not in primeira  # Sem Last-Event-ID, começa da última correspondência
+    cursor = primeira.split('id: ')[1].split('\n')[0]
+    assert cursor.endswith(f"|{max(ids['/project/0'], ids['/project/1'])}")
+
+    # Gravada no worker enquanto o navegador estava desconectado
+    UserMatch.inserir_em_lote([{'user_id': usuarios['bruno'], 'project_id': ids['/project/2'], 'keyword_id': None}])
+    db.session.commit()
+    segunda = client.get('/stream_bot', headers={'Last-Event-ID': cursor}).get_data(as_text=True)
+
+    assert segunda.count('event: projeto') == 1
+    assert 'Projeto 2' in segunda
+
+def test_stream_le_correspondencias_do_banco_no_modo_worker(app, usuarios):
+    app.config['SSE_DURACAO'] = 0.2
+    app.config['BOT_EMBUTIDO'] = False
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+
+    resposta = client.get('/stream_bot')
+    ids = Project.registrar_em_lote([{'titulo': 'Bot em Python', 'link': '/project/9'}])
+    UserMatch.inserir_em_lote([{'user_id': usuarios['bruno'], 'project_id': ids['/project/9'], 'keyword_id': None}])
+    db.session.commit()
+    corpo = resposta.get_data(as_text=True)
+
+    assert 'event: projeto\ndata: {"titulo": "Bot em Python", "link": "https://www.99freelas.com.br/project/9"}' in corpo
+
+def test_worker_app_tem_apenas_a_camada_de_banco():
+    app = create_worker_app('testing')
+
+    assert app.blueprints == {}
+    assert 'migrate' not in app.extensions
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='ana', email='ana@example.com', password_hash='x', chat_id='1', bot_ativo=True))
+        db.session.commit()
+        assert list(AgendadorDoBot(app, verificador=VerificadorFalso()).carregar_assinantes()) == [1]
+        db.drop_all()
+
+def test_stream_termina_no_primeiro_evento(app, usuarios):
+    app.config['SSE_DURACAO'] = 30
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+    ids = Project.registrar_em_lote([{'titulo': 'Bot em Python', 'link': '/project/9'}])
+    UserMatch.inserir_em_lote([{'user_id': usuarios['bruno'], 'project_id': ids['/project/9'], 'keyword_id': None}])
+    db.session.commit()
+
+    inicio = time.monotonic()
+    corpo = client.get('/stream_bot', headers={'Last-Event-ID': '0001-01-01T00:00:00|0'}).get_data(as_text=True)
+
+    assert time.monotonic() - inicio < 5  # Não prende a thread por SSE_DURACAO
+    assert corpo.startswith('retry: 10000\n\n')
+    assert corpo.count('event: projeto') == 1
+
+def test_runtime_em_thread_devolve_o_lease_ao_encerrar(app, usuarios):
+    verificador = VerificadorFalso()
+    agendador = AgendadorDoBot(app, verificador=verificador, intervalo_min=60, intervalo_max=60)
+    agendador.iniciar_em_thread()
+    for _ in range(100):
+        if agendador.lider:
+            break
+        time.sleep(0.05)
+    assert agendador.lider
+
+    agendador.encerrar_thread()  # Chamado pelo atexit ao sair do processo
+
+    assert not agendador.thread.is_alive()
+    assert verificador.fechado
+    assert TarefaAgendada.assumir_lideranca(LIDERANCA_BOT, timedelta(seconds=60), 'outro-host:1')  # Sem esperar o vencimento
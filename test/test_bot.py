@@ -0,0 +1,341 @@
+from datetime import datetime, timedelta, timezone
+import asyncio
+import aiohttp
+from aiohttp import web
+import pytest
+from app import create_app, db
+from app.models import User, Project, UserMatch, LinkVisto, NotificacaoPendente
+from app.bot import VerificadorDeProjetos
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def usuarios(app):
+    # Cria dois usuários de teste com chat_id associado
+    ids = []
+    for nome in ('ana', 'bruno'):
+        user = User(username=nome, email=f'{nome}@example.com', chat_id=f'chat-{nome}')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.commit()
+        ids.append(user.id)
+    return ids
+
+class VerificadorFalso(VerificadorDeProjetos):
+    """Verificador que não acessa a rede: devolve páginas fixas e guarda as mensagens."""
+
+    def __init__(self, paginas):
+        super().__init__()
+        self.paginas = paginas
+        self.paginas_baixadas = []
+        self.mensagens = []
+
+    def obter_sessao_site(self):
+        return None
+
+    async def obter_titulos_links_projetos(self, page, session):
+        self.paginas_baixadas.append(page)
+        return self.paginas.get(page, [])
+
+    async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
+        self.mensagens.append((chat_id, texto))
+        return {'ok': True}
+
+def test_verificacao_compartilhada_baixa_cada_pagina_uma_vez(app, usuarios):
+    ana_id, bruno_id = usuarios
+    verificador = VerificadorFalso({
+        1: [{'titulo': 'Automação em Python', 'link': '/project/python-1'}],
+        2: [{'titulo': 'Planilha Excel com VBA', 'link': '/project/excel-2'}],
+    })
+    assinantes = {
+        ana_id: {'keywords': ['python'], 'chat_id': 'chat-ana'},
+        bruno_id: {'keywords': ['python', 'excel'], 'chat_id': 'chat-bruno'},
+    }
+
+    asyncio.run(verificador.executar_verificacao_compartilhada(2, assinantes, 'token', app))
+
+    assert verificador.paginas_baixadas == [1, 2]
+    assert Project.query.count() == 2  # Cada projeto aparece uma única vez no catálogo
+    assert UserMatch.query.filter_by(user_id=ana_id).count() == 1
+    assert UserMatch.query.filter_by(user_id=bruno_id).count() == 2
+    assert sorted(chat for chat, _ in verificador.mensagens) == ['chat-ana', 'chat-bruno', 'chat-bruno']
+
+    # Um segundo ciclo não deve notificar projetos já salvos
+    verificador.mensagens.clear()
+    asyncio.run(verificador.executar_verificacao_compartilhada(2, assinantes, 'token', app))
+    assert verificador.mensagens == []
+
+    # Páginas sem alterações (None) são ignoradas pelo ciclo
+    verificador.paginas = {1: None, 2: None}
+    asyncio.run(verificador.executar_verificacao_compartilhada(2, assinantes, 'token', app))
+    assert verificador.mensagens == []
+
+def test_catalogo_grava_cada_link_uma_vez_e_atualiza_dados(app, usuarios):
+    ana_id, bruno_id = usuarios
+    ids = Project.registrar_em_lote([
+        {'titulo': 'Antigo', 'link': '/project/1', 'propostas': 2},
+        {'titulo': 'Novo', 'link': '/project/2'},
+        {'titulo': 'Novo', 'link': '/project/2'},
+    ])
+    UserMatch.inserir_em_lote([
+        {'user_id': ana_id, 'project_id': ids['/project/1'], 'keyword_id': None},
+        {'user_id': bruno_id, 'project_id': ids['/project/1'], 'keyword_id': None},
+    ])
+    db.session.commit()
+
+    assert Project.query.count() == 2
+    assert UserMatch.query.count() == 2
+
+    # Um link já catalogado mantém o id e recebe os dados atuais da listagem
+    assert Project.registrar_em_lote([{'titulo': 'Antigo', 'link': '/project/1', 'propostas': 7}]) == {'/project/1': ids['/project/1']}
+    UserMatch.inserir_em_lote([{'user_id': ana_id, 'project_id': ids['/project/1'], 'keyword_id': None}])
+    db.session.commit()
+    assert db.session.get(Project, ids['/project/1']).proposals == 7
+    assert UserMatch.query.count() == 2
+
+def test_correspondencia_guarda_a_palavra_chave(app, usuarios):
+    ana_id, _ = usuarios
+    verificador = VerificadorFalso({1: [{'titulo': 'Bot em Python', 'link': '/project/python-1'}]})
+    assinantes = {ana_id: {'keywords': ['python', 'bot'], 'keyword_ids': {'python': 10, 'bot': 11}, 'chat_id': 'chat-ana'}}
+
+    asyncio.run(verificador.executar_verificacao_compartilhada(1, assinantes, 'token', app))
+
+    correspondencia = UserMatch.query.one()
+    assert (correspondencia.user_id, correspondencia.keyword_id) == (ana_id, 11)
+    assert correspondencia.project.title == 'Bot em Python'
+
+def test_paginas_baixadas_em_paralelo_com_limite():
+    class VerificadorLento(VerificadorDeProjetos):
+        def __init__(self):
+            super().__init__(max_paginas_simultaneas=2)
+            self.em_andamento = 0
+            self.maximo = 0
+
+        async def obter_titulos_links_projetos(self, page, session):
+            self.em_andamento += 1
+            self.maximo = max(self.maximo, self.em_andamento)
+            # Páginas iniciais demoram mais para garantir que a ordem não depende da conclusão
+            await asyncio.sleep(0.01 * (5 - page))
+            self.em_andamento -= 1
+            return [{'titulo': f'Projeto {page}', 'link': f'/project/{page}'}]
+
+    async def executar():
+        verificador = VerificadorLento()
+        tarefas = await verificador.obter_paginas(5, session=None)
+        return verificador, [await tarefa for tarefa in tarefas]
+
+    verificador, paginas = asyncio.run(executar())
+
+    assert verificador.maximo == 2
+    assert [pagina[0]['link'] for pagina in paginas] == [f'/project/{page}' for page in range(1, 6)]
+
+def test_modo_resumo_agrupa_projetos_do_ciclo(app, usuarios):
+    ana_id, bruno_id = usuarios
+    verificador = VerificadorFalso({
+        1: [{'titulo': 'Python <urgente>', 'link': '/project/a'}],
+        2: [{'titulo': 'Bot em Python & Telegram', 'link': '/project/b'}],
+    })
+    assinantes = {
+        ana_id: {'keywords': ['python'], 'chat_id': 'chat-ana', 'modo_notificacao': User.MODO_RESUMO},
+        bruno_id: {'keywords': ['python'], 'chat_id': 'chat-bruno', 'modo_notificacao': User.MODO_INSTANTANEO},
+    }
+
+    asyncio.run(verificador.executar_verificacao_compartilhada(2, assinantes, 'token', app))
+
+    mensagens_ana = [texto for chat, texto in verificador.mensagens if chat == 'chat-ana']
+    mensagens_bruno = [texto for chat, texto in verificador.mensagens if chat == 'chat-bruno']
+    assert len(mensagens_ana) == 1
+    assert len(mensagens_bruno) == 2
+    assert 'Python &lt;urgente&gt;' in mensagens_ana[0]
+    assert 'Python &amp; Telegram' in mensagens_ana[0]
+
+def test_resumo_respeita_limite_do_telegram():
+    verificador = VerificadorDeProjetos()
+    projetos = [{'titulo': f'Projeto {i} ' + 'x' * 200, 'link': f'/project/{i}'} for i in range(60)]
+
+    itens = [(verificador.formatar_item_resumo(projeto), indice) for indice, projeto in enumerate(projetos)]
+
+    mensagens = verificador.agrupar_resumo(itens)
+
+    assert len(mensagens) > 1
+    assert all(len(mensagem) <= 4096 for mensagem, _ in mensagens)
+    assert sum(mensagem.count('Acessar Projeto') for mensagem, _ in mensagens) == 60
+    assert [indice for _, ids in mensagens for indice in ids] == list(range(60))
+
+def test_paginas_inalteradas_nao_sao_processadas():
+    pagina = '<html><body><p>{hora}</p><h1 class="title"><a href="/project/{page}">Projeto {page}</a></h1></body></html>'
+    requisicoes = []
+
+    async def projetos(request):
+        page = request.query['page']
+        requisicoes.append(dict(request.headers))
+        # Página 1 usa ETag; página 2 não tem validadores e muda apenas fora da listagem
+        if page == '1':
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304)
+            return web.Response(text=pagina.format(hora=len(requisicoes), page=page), content_type='text/html', headers={'ETag': '"v1"'})
+        return web.Response(text=pagina.format(hora=len(requisicoes), page=page), content_type='text/html')
+
+    async def executar():
+        aplicacao = web.Application()
+        aplicacao.router.add_get('/projects', projetos)
+        runner = web.AppRunner(aplicacao)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        verificador = VerificadorDeProjetos(url_base=f'http://127.0.0.1:{runner.addresses[0][1]}/projects?page=')
+        try:
+            async with aiohttp.ClientSession() as session:
+                primeiro = [await verificador.obter_titulos_links_projetos(page, session) for page in (1, 2)]
+                segundo = [await verificador.obter_titulos_links_projetos(page, session) for page in (1, 2)]
+        finally:
+            await runner.cleanup()
+        return verificador, primeiro, segundo
+
+    verificador, primeiro, segundo = asyncio.run(executar())
+
+    assert [[(projeto['titulo'], projeto['link']) for projeto in pagina] for pagina in primeiro] == [
+        [('Projeto 1', '/project/1')], [('Projeto 2', '/project/2')],
+    ]
+    assert segundo == [None, None]
+    estatisticas = verificador.estatisticas_crawler()
+    assert estatisticas['nao_modificadas'] == 1
+    assert estatisticas['conteudo_igual'] == 1
+    assert estatisticas['processadas'] == 2
+    assert estatisticas['taxa_de_paginas_puladas'] == 0.5
+
+def test_ciclo_com_pagina_inalterada_processa_as_demais(app, usuarios):
+    ana_id, _ = usuarios
+    pagina = '<html><body><h1 class="title"><a href="/project/{link}">Automação em Python {link}</a></h1></body></html>'
+    ciclos = []
+
+    async def projetos(request):
+        page = request.query['page']
+        # Página 1 nunca muda (304 no segundo ciclo); a página 2 traz um projeto novo a cada ciclo
+        if page == '1':
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304)
+            return web.Response(text=pagina.format(link='1'), content_type='text/html', headers={'ETag': '"v1"'})
+        return web.Response(text=pagina.format(link=f'2-{len(ciclos)}'), content_type='text/html')
+
+    class VerificadorSemTelegram(VerificadorDeProjetos):
+        async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
+            ciclos[-1].append(texto)
+            return {'ok': True}
+
+    async def executar():
+        aplicacao = web.Application()
+        aplicacao.router.add_get('/projects', projetos)
+        runner = web.AppRunner(aplicacao)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        verificador = VerificadorSemTelegram(url_base=f'http://127.0.0.1:{runner.addresses[0][1]}/projects?page=')
+        assinantes = {ana_id: {'keywords': ['python'], 'chat_id': 'chat-ana'}}
+        try:
+            for _ in range(2):
+                ciclos.append([])
+                await verificador.executar_verificacao_compartilhada(2, assinantes, 'token', app)
+        finally:
+            await verificador.fechar()
+            await runner.cleanup()
+        return verificador
+
+    verificador = asyncio.run(executar())
+
+    links = lambda mensagens: sorted(link for link in ('/project/1', '/project/2-1', '/project/2-2')
+                                     if any(f"{link}'" in mensagem for mensagem in mensagens))
+    assert [links(mensagens) for mensagens in ciclos] == [['/project/1', '/project/2-1'], ['/project/2-2']]
+    assert verificador.estatisticas_crawler()['nao_modificadas'] == 1
+
+def test_deduplicacao_sobrevive_a_limpeza_de_projetos(app, usuarios):
+    ana_id, _ = usuarios
+    verificador = VerificadorFalso({1: [{'titulo': 'Automação em Python', 'link': '/project/python-1'}]})
+    assinantes = {ana_id: {'keywords': ['python'], 'chat_id': 'chat-ana'}}
+
+    asyncio.run(verificador.executar_verificacao_compartilhada(1, assinantes, 'token', app))
+    UserMatch.query.delete()
+    Project.query.delete()
+    db.session.commit()
+    verificador.vistos = type(verificador.vistos)()  # Outro processo, sem nada em memória
+    asyncio.run(verificador.executar_verificacao_compartilhada(1, assinantes, 'token', app))
+    asyncio.run(verificador.executar_verificacao_compartilhada(1, assinantes, 'token', app))
+
+    assert len(verificador.mensagens) == 1
+    assert LinkVisto.query.count() == 1
+    assert verificador.vistos.estatisticas()['acertos'] == 1  # Só o primeiro ciclo do novo processo foi ao banco
+
+def test_notificacoes_sobrevivem_a_reinicializacao(app, usuarios):
+    ana_id, _ = usuarios
+
+    class VerificadorInterrompido(VerificadorFalso):
+        async def despachar_notificacoes(self, bot_token, app, incluir_resumos=True):
+            return 0  # O processo morre depois do commit, antes de enviar
+
+    verificador = VerificadorInterrompido({1: [{'titulo': 'Automação em Python', 'link': '/project/python-1'}]})
+    asyncio.run(verificador.executar_verificacao_compartilhada(
+        1, {ana_id: {'keywords': ['python'], 'chat_id': 'chat-ana'}}, 'token', app))
+    assert verificador.mensagens == []
+    assert NotificacaoPendente.query.count() == 1
+
+    novo_processo = VerificadorFalso({})
+    assert asyncio.run(novo_processo.despachar_notificacoes('token', app)) == 1
+    assert [chat for chat, _ in novo_processo.mensagens] == ['chat-ana']
+    assert NotificacaoPendente.query.count() == 0
+
+def test_falha_no_envio_volta_para_a_fila_com_backoff(app):
+    class VerificadorInstavel(VerificadorFalso):
+        async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
+            if chat_id == 'chat-ana' and not self.mensagens:
+                self.mensagens.append(('falha', texto))
+                return None
+            return await super().enviar_mensagem_telegram(texto, bot_token, chat_id)
+
+    NotificacaoPendente.enfileirar_em_lote([
+        {'chat_id': 'chat-ana', 'texto': 'primeira'},
+        {'chat_id': 'chat-ana', 'texto': 'segunda'},
+        {'chat_id': 'chat-bruno', 'texto': 'outra'},
+    ])
+    db.session.commit()
+    verificador = VerificadorInstavel({})
+
+    assert asyncio.run(verificador.despachar_notificacoes('token', app)) == 1
+    pendentes = NotificacaoPendente.query.order_by(NotificacaoPendente.id).all()
+    assert [(p.texto, p.tentativas, p.reservada_por) for p in pendentes] == [('primeira', 1, None), ('segunda', 1, None)]
+    assert asyncio.run(verificador.despachar_notificacoes('token', app)) == 0  # Ainda no backoff
+
+    NotificacaoPendente.query.update({'proxima_tentativa': datetime.now(timezone.utc)})
+    db.session.commit()
+    assert asyncio.run(verificador.despachar_notificacoes('token', app)) == 2
+    assert verificador.mensagens[1:] == [('chat-bruno', 'outra'), ('chat-ana', 'primeira'), ('chat-ana', 'segunda')]
+
+def test_reserva_nao_entrega_a_mesma_mensagem_a_dois_lotes(app):
+    NotificacaoPendente.enfileirar_em_lote([{'chat_id': '1', 'texto': 'a'}, {'chat_id': '2', 'texto': 'b', 'resumo': True}])
+    db.session.commit()
+    agora = datetime.now(timezone.utc)
+
+    assert [p.texto for p in NotificacaoPendente.reservar('lote-1', 10, timedelta(minutes=5), incluir_resumos=False, agora=agora)] == ['a']
+    assert [p.texto for p in NotificacaoPendente.reservar('lote-2', 10, timedelta(minutes=5), agora=agora)] == ['b']
+    assert NotificacaoPendente.reservar('lote-3', 10, timedelta(minutes=5), agora=agora) == []
+    # Reservas vencidas (processo morto no meio do envio) voltam à fila
+    reenvio = NotificacaoPendente.reservar('lote-4', 10, timedelta(minutes=5), agora=agora + timedelta(minutes=6))
+    assert [p.texto for p in reenvio] == ['a', 'b']
+
+def test_mensagens_de_chat_bloqueado_voltam_para_a_fila(app):
+    class VerificadorBloqueado(VerificadorFalso):
+        async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
+            return None  # O notificador respondeu 403 ou o chat está com envios suspensos
+
+    NotificacaoPendente.enfileirar_em_lote([{'chat_id': 'chat-ana', 'texto': 'primeira'}, {'chat_id': 'chat-ana', 'texto': 'segunda'}])
+    db.session.commit()
+
+    assert asyncio.run(VerificadorBloqueado({}).despachar_notificacoes('token', app)) == 0
+    pendentes = NotificacaoPendente.query.order_by(NotificacaoPendente.id).all()
+    assert [(p.texto, p.tentativas) for p in pendentes] == [('primeira', 1), ('segunda', 1)]
@@ -0,0 +1,135 @@
+import pytest
+from datetime import timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, TokenTelegram
+from app.cache_usuarios import obter_cache_de_usuarios
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def usuarios(app):
+    admin = User(username='admin', email='admin@example.com', is_admin=True, chat_id='chat-admin')
+    bruno = User(username='bruno', email='bruno@example.com')
+    for user in (admin, bruno):
+        user.set_password('senha')
+        db.session.add(user)
+    db.session.commit()
+    return {'admin': admin.id, 'bruno': bruno.id}
+
+def entrar(app, username):
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username=username, password='senha'))
+    return client
+
+def test_usuario_em_cache_nao_consulta_o_banco(app, usuarios):
+    cache = obter_cache_de_usuarios(app)
+    cache.obter(usuarios['bruno'])
+    db.session.remove()
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+    for _ in range(5):
+        assert cache.obter(usuarios['bruno']).username == 'bruno'
+        db.session.remove()
+
+    assert consultas == []
+    assert cache.estatisticas() == {'itens': 1, 'acertos': 5, 'faltas': 1, 'taxa_acerto': 0.8333}
+
+def test_usuario_do_cache_continua_gravavel(app, usuarios):
+    cache = obter_cache_de_usuarios(app)
+    cache.obter(usuarios['bruno'])
+    db.session.remove()
+
+    user = cache.obter(usuarios['bruno'])
+    user.bot_ativo = True
+    db.session.commit()
+    db.session.remove()
+
+    assert db.session.get(User, usuarios['bruno']).bot_ativo is True
+    assert cache.obter(usuarios['bruno']).bot_ativo is True  # A gravação invalidou a entrada
+
+def test_entradas_expiram_e_respeitam_o_limite(app, usuarios):
+    cache = obter_cache_de_usuarios(app)
+    cache.max_itens = 1
+    cache.obter(usuarios['admin'])
+    cache.obter(usuarios['bruno'])
+    assert list(cache._itens) == [usuarios['bruno']]
+
+    cache.ttl = 0
+    cache.guardar(db.session.get(User, usuarios['bruno']))
+    assert cache._do_cache(usuarios['bruno']) is None
+
+@pytest.mark.parametrize('acao', ['toggle_admin', 'grant_access', 'edit_email', 'reset_password', 'webhook'])
+def test_alteracoes_do_usuario_invalidam_o_cache(app, usuarios, acao):
+    cache = obter_cache_de_usuarios(app)
+    admin = entrar(app, 'admin')
+    cache.obter(usuarios['bruno'])
+    cache.obter(usuarios['admin'])
+
+    bruno_id = usuarios['bruno']
+    if acao == 'webhook':
+        token = TokenTelegram.gerar(bruno_id, timedelta(minutes=5))
+        db.session.commit()
+        app.config['TELEGRAM_WEBHOOK_SECRET'] = 'segredo'
+        admin.post('/webhook/telegram', json={'message': {'chat': {'id': 42}, 'text': f'/start {token}'}},
+                   headers={'X-Telegram-Bot-Api-Secret-Token': 'segredo'})
+    elif acao == 'edit_email':
+        admin.post(f'/admin/edit_email/{bruno_id}', data={'new_email': 'novo@example.com'})
+    else:
+        admin.post(f'/admin/{acao}/{bruno_id}')
+
+    assert cache._do_cache(bruno_id) is None
+    assert cache._do_cache(usuarios['admin']) is not None
+
+def alterar_em_outro_processo(user_id, **valores):
+    # Outra conexão, sem passar pela sessão nem pelos eventos do ORM deste processo
+    with db.engine.begin() as conexao:
+        conexao.execute(db.update(User).where(User.id == user_id).values(**valores))
+
+def test_decisoes_do_bot_releem_o_usuario_do_banco(app, usuarios):
+    bruno = entrar(app, 'bruno')
+    assert bruno.post('/start_bot').status_code == 400  # Ainda sem chat vinculado (e agora em cache)
+
+    alterar_em_outro_processo(usuarios['bruno'], chat_id='chat-bruno')  # O webhook em outro worker
+    assert bruno.post('/start_bot').get_json()['status'] == 'Bot iniciado com sucesso!'
+
+    alterar_em_outro_processo(usuarios['bruno'], bot_ativo=False)  # /stop_bot em outro worker
+    assert bruno.get('/status_bot').get_json()['status'] == 'Verificação não iniciada'
+    assert bruno.post('/start_bot').get_json()['status'] == 'Bot iniciado com sucesso!'
+    assert db.session.get(User, usuarios['bruno'], populate_existing=True).bot_ativo is True
+
+def test_admin_rebaixado_em_outro_processo_perde_o_acesso(app, usuarios):
+    admin = entrar(app, 'admin')
+    assert admin.get('/admin/cache_usuarios').status_code == 200
+
+    alterar_em_outro_processo(usuarios['admin'], is_admin=False)
+
+    assert admin.get('/admin/cache_usuarios').status_code == 403
+    assert admin.get('/metrics').status_code == 401
+
+def test_invalidacao_acontece_no_commit(app, usuarios):
+    cache = obter_cache_de_usuarios(app)
+    user = cache.obter(usuarios['bruno'])
+    user.email = 'outro@example.com'
+    db.session.flush()
+    assert cache._do_cache(usuarios['bruno']) is not None  # O flush ainda pode ser desfeito
+    db.session.rollback()
+    assert cache._do_cache(usuarios['bruno']) is not None
+
+    user = cache.obter(usuarios['bruno'])
+    user.email = 'outro@example.com'
+    db.session.flush()
+    antes_do_commit = cache._invalidacoes
+    db.session.commit()
+    assert cache._do_cache(usuarios['bruno']) is None
+    # Uma leitura feita antes do commit não volta para o cache
+    cache.guardar(user, antes_do_commit)
+    assert cache._do_cache(usuarios['bruno']) is None
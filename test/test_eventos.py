@@ -0,0 +1,28 @@
+import threading
+from app.eventos import CanalDeEventos
+
+def test_aguardar_retorna_apenas_eventos_novos_do_usuario():
+    canal = CanalDeEventos()
+    canal.publicar(1, 'status', {'status': 'Ativo'})
+    canal.publicar(2, 'status', {'status': 'Ativo'})
+    canal.publicar(1, 'projeto', {'titulo': 'Python'})
+
+    eventos = canal.aguardar(1, ultimo_id=0, timeout=0)
+    assert [tipo for _, tipo, _ in eventos] == ['status', 'projeto']
+    assert canal.aguardar(1, ultimo_id=eventos[-1][0], timeout=0) == []
+    assert canal.ultimo_id() == 3
+
+def test_aguardar_acorda_quando_um_evento_e_publicado():
+    canal = CanalDeEventos()
+    threading.Timer(0.05, canal.publicar, args=(1, 'status', {'status': 'Ativo'})).start()
+
+    eventos = canal.aguardar(1, timeout=5)
+
+    assert eventos[0][1:] == ('status', {'status': 'Ativo'})
+
+def test_mantem_apenas_os_eventos_mais_recentes():
+    canal = CanalDeEventos(max_eventos=2)
+    for indice in range(5):
+        canal.publicar(1, 'projeto', {'indice': indice})
+
+    assert [dados['indice'] for _, _, dados in canal.aguardar(1, timeout=0)] == [3, 4]
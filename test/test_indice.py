@@ -0,0 +1,32 @@
+from app.indice import IndicePalavrasChave
+
+def test_corresponder_retorna_todos_os_pares():
+    indice = IndicePalavrasChave.construir([
+        (1, 'python'), (1, 'excel'), (2, 'Python'), (2, 'vba'), (3, 'java'),
+    ])
+
+    pares = indice.corresponder('Automação em PYTHON e VBA para Excel')
+
+    assert pares == {(1, 'python'), (1, 'excel'), (2, 'python'), (2, 'vba')}
+    assert indice.usuarios_correspondentes('Sistema em Javascript') == {3}
+
+def test_mesma_semantica_do_laco_any():
+    keywords = ['he', 'she', 'his', 'hers', 'a', 'ção', 'são']
+    titulos = ['ushers', 'ahishers', 'Automação', 'nada', 'SÃO PAULO', '']
+    indice = IndicePalavrasChave.construir((0, keyword) for keyword in keywords)
+
+    for titulo in titulos:
+        esperado = {keyword for keyword in keywords if keyword.lower() in titulo.lower()}
+        assert indice.palavras_encontradas(titulo) == esperado
+
+def test_adicionar_e_remover():
+    indice = IndicePalavrasChave.construir([(1, 'python')])
+    indice.adicionar(2, 'python')
+    indice.adicionar(2, 'django')
+
+    assert indice.usuarios_correspondentes('Django com Python') == {1, 2}
+
+    indice.remover(1, 'python')
+    indice.remover(2, 'django')
+
+    assert indice.corresponder('Django com Python') == {(2, 'python')}
@@ -0,0 +1,25 @@
+from app.jobs import RegistroDeJobs
+
+def test_status_e_conciliado_com_o_valor_do_banco():
+    registro = RegistroDeJobs()
+
+    assert registro.status(1, ativo_no_banco=True)['status'] == 'Ativo'
+    registro.registrar_ciclo([1], {1: 2})
+    assert registro.status(1, ativo_no_banco=True)['projetos_notificados'] == 2  # Igual ao banco: mantém a entrada
+    registro.marcar_parado(1)
+    # Outro worker religou o bot: o cache deste processo passa a seguir o banco
+    assert registro.status(1, ativo_no_banco=True)['status'] == 'Ativo'
+    assert registro.status(1, ativo_no_banco=False)['status'] == 'Verificação não iniciada'
+    assert registro.status(1)['status'] == 'Verificação não iniciada'
+
+def test_registrar_ciclo_ignora_jobs_parados():
+    registro = RegistroDeJobs()
+    registro.marcar_ativo(1)
+    registro.marcar_parado(2)
+
+    registro.registrar_ciclo([1, 2], {1: 3, 2: 5})
+
+    assert registro.status(1)['projetos_notificados'] == 3
+    assert registro.status(1)['ultimo_ciclo'] is not None
+    assert registro.status(2)['projetos_notificados'] == 0
+    assert registro.ativos() == 1
@@ -0,0 +1,72 @@
+import io
+import pytest
+from app import create_app, db
+from app.models import User, Keyword
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    user = User(username='ana', email='ana@example.com')
+    user.set_password('senha')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Keyword(keyword='python', user_id=user.id))
+    db.session.commit()
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='ana', password='senha'))
+    return client
+
+def keywords_salvas():
+    return sorted(keyword.keyword for keyword in Keyword.query.all())
+
+def test_normalizar_lista_em_uma_passada():
+    validas, repetidas, invalidas = Keyword.normalizar_lista([' Python', 'python ', 'VBA', '', '   ', 'x' * 51])
+
+    assert validas == ['python', 'vba']
+    assert (repetidas, invalidas) == (1, 3)
+
+def test_importacao_json_conta_inseridas_e_duplicadas(client):
+    resposta = client.post('/keywords/import', json={'keywords': ['Python', 'Django ', 'django', 'Excel']})
+
+    assert resposta.get_json() == {'status': 'success', 'inseridas': 2, 'duplicadas': 2, 'invalidas': 0}
+    assert keywords_salvas() == ['django', 'excel', 'python']
+    assert db.session.get(User, 1).keywords_versao == 1
+
+def test_importacao_json_conta_itens_que_nao_sao_texto_como_invalidos(client):
+    resposta = client.post('/keywords/import', json={'keywords': [None, {'a': 1}, 42, ['vba'], 'Excel']})
+
+    assert resposta.get_json() == {'status': 'success', 'inseridas': 1, 'duplicadas': 0, 'invalidas': 4}
+    assert keywords_salvas() == ['excel', 'python']
+
+def test_importacao_csv(client):
+    resposta = client.post('/keywords/import', data='vba, excel\nPython\n', content_type='text/csv')
+
+    assert resposta.get_json()['inseridas'] == 2
+    assert keywords_salvas() == ['excel', 'python', 'vba']
+
+def test_importacao_csv_exportado_pelo_excel_em_windows_1252(client):
+    resposta = client.post('/keywords/import', data={'file': (io.BytesIO(b'caf\xe9,python\nsal\xe1rio'), 'termos.csv')},
+                           content_type='multipart/form-data')
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['inseridas'] == 2
+    assert keywords_salvas() == ['café', 'python', 'salário']
+
+def test_importacao_rejeita_formato_e_limite(app, client):
+    assert client.post('/keywords/import', json={'keywords': 'python'}).status_code == 400
+    app.config['MAX_KEYWORDS_IMPORTACAO'] = 2
+    assert client.post('/keywords/import', json=['a', 'b', 'c']).status_code == 413
+    assert keywords_salvas() == ['python']
+
+def test_formulario_do_dashboard_normaliza(client):
+    client.post('/dashboard', data=dict(keyword='Python , VBA, vba'))
+
+    assert keywords_salvas() == ['python', 'vba']
@@ -0,0 +1,75 @@
+import pytest
+from app import create_app, db
+from app.models import User, BaldeDeLogin
+from app.limite_login import BaldesEmMemoria, BaldesNoBanco, LimitadorDeLogin
+from config.config import ProductionConfig
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = User(username='bruno', email='bruno@example.com')
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_balde_em_memoria_recusa_e_recarrega():
+    baldes = BaldesEmMemoria()
+
+    assert baldes.consumir('ip:1', 2, 0.5, agora=0) == 0
+    assert baldes.consumir('ip:1', 2, 0.5, agora=0) == 0
+    assert baldes.consumir('ip:1', 2, 0.5, agora=0) == 2
+    assert baldes.consumir('ip:2', 2, 0.5, agora=0) == 0  # Baldes independentes
+    assert baldes.consumir('ip:1', 2, 0.5, agora=2) == 0  # Um token recarregado
+    assert baldes.consumir('ip:1', 2, 0.5, agora=2) == 2
+
+def test_balde_no_banco_recusa_e_recarrega(app):
+    assert BaldeDeLogin.consumir('ip:1', 2, 0.5, agora=1000) == 0
+    assert BaldeDeLogin.consumir('ip:1', 2, 0.5, agora=1000) == 0
+    assert BaldeDeLogin.consumir('ip:1', 2, 0.5, agora=1001) == pytest.approx(1)
+    assert BaldeDeLogin.consumir('ip:1', 2, 0.5, agora=1002) == 0
+    assert BaldeDeLogin.consumir('ip:1', 2, 0.5, agora=2000) == 0  # Recarga limitada à capacidade
+    assert db.session.get(BaldeDeLogin, 'ip:1').tokens == 1
+
+@pytest.mark.parametrize('baldes', [BaldesEmMemoria, BaldesNoBanco])
+def test_login_recusado_sem_calcular_o_hash(app, monkeypatch, baldes):
+    app.extensions['limite_login'] = LimitadorDeLogin(baldes(), por_ip=10, por_usuario=3, janela_s=300)
+    hashes = []
+    monkeypatch.setattr(User, 'check_password', lambda self, senha: hashes.append(senha) or False)
+    client = app.test_client()
+
+    respostas = [client.post('/auth/login', data=dict(username='bruno', password=f'errada{i}')) for i in range(5)]
+
+    assert [resposta.status_code for resposta in respostas] == [200, 200, 200, 429, 429]
+    assert hashes == ['errada0', 'errada1', 'errada2']
+    assert int(respostas[-1].headers['Retry-After']) > 0
+    assert 'Muitas tentativas de login' in respostas[-1].get_data(as_text=True)
+    # Outro usuário do mesmo IP ainda pode tentar
+    assert client.post('/auth/login', data=dict(username='ana', password='x')).status_code == 200
+
+def test_limite_por_ip_nao_consome_o_balde_do_usuario(app):
+    limitador = LimitadorDeLogin(BaldesEmMemoria(), por_ip=1, por_usuario=1, janela_s=60)
+
+    assert limitador.verificar('1.1.1.1', 'bruno') == 0
+    assert limitador.verificar('1.1.1.1', 'ana') > 0
+    assert limitador.verificar('2.2.2.2', 'ana') == 0
+    assert limitador.estatisticas() == {'backend': 'BaldesEmMemoria', 'permitidas': 2, 'rejeitadas': 1}
+
+def test_producao_confia_no_roteador_do_heroku(monkeypatch):
+    monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+    app = create_app('production')
+    app.config['WTF_CSRF_ENABLED'] = False
+    baldes = BaldesEmMemoria()
+    app.extensions['limite_login'] = LimitadorDeLogin(baldes)
+    with app.app_context():
+        db.create_all()
+        app.test_client().post('/auth/login', data=dict(username='ana', password='x'),
+                               headers={'X-Forwarded-For': '203.0.113.7'})
+        db.drop_all()
+
+    assert app.config['PROXIES_CONFIAVEIS'] == 1
+    assert 'ip:203.0.113.7' in baldes._baldes  # E não o IP do roteador
@@ -0,0 +1,64 @@
+import os
+from datetime import datetime, timedelta, timezone
+from app.listagem import extrair_projetos, filtrar_projetos
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def ler_fixture(nome):
+    with open(os.path.join(FIXTURES, nome), encoding='utf-8') as arquivo:
+        return arquivo.read()
+
+def test_extrai_todos_os_campos_da_listagem():
+    projetos = extrair_projetos(ler_fixture('listagem_99freelas.html'))
+
+    assert len(projetos) == 20
+    primeiro = projetos[0]
+    assert primeiro['titulo'] == 'Automação de planilha Excel com VBA'
+    assert primeiro['link'] == '/project/automação-600000'
+    assert primeiro['publicado_em'] == datetime.fromtimestamp(1729500000, tz=timezone.utc)
+    assert isinstance(primeiro['propostas'], int)
+    assert primeiro['orcamento'] == 'Aberto'
+    assert projetos[2]['orcamento'] == 'R$ 500,00 - R$ 1.000,00'
+    assert projetos[18]['titulo'] == 'Correção de bugs em React <urgente>'
+
+def test_titulo_sem_link_nao_desalinha_os_projetos():
+    conteudo = '''
+    <ul>
+      <li class="result-item"><h1 class="title"><a>Sem link</a></h1></li>
+      <li class="result-item"><h1 class="title"><a href="/project/b">Projeto B</a></h1></li>
+    </ul>'''
+
+    projetos = extrair_projetos(conteudo)
+
+    assert [(projeto['titulo'], projeto['link']) for projeto in projetos] == [('Projeto B', '/project/b')]
+
+def test_campos_de_fora_do_item_nao_sao_atribuidos_ao_projeto():
+    conteudo = '''
+    <ul class="result-list">
+      <li class="result-item"><h1 class="title"><a href="/project/a">Projeto A</a></h1></li>
+    </ul>
+    <aside><p class="information">Propostas: 99 | Orçamento: R$ 1,00</p><b cp-datetime="1000">agora</b></aside>
+    <ul class="result-list">
+      <li class="result-item destaque"><h1 class="title"><a href="/project/b">Projeto B</a></h1>
+        <p class="information">Orçamento: Aberto | Propostas: 2</p></li>
+    </ul>'''
+
+    projetos = extrair_projetos(conteudo)
+
+    assert projetos == [
+        {'titulo': 'Projeto A', 'link': '/project/a', 'publicado_em': None, 'propostas': None, 'orcamento': None},
+        {'titulo': 'Projeto B', 'link': '/project/b', 'publicado_em': None, 'propostas': 2, 'orcamento': 'Aberto'},
+    ]
+
+def test_filtra_projetos_antigos_e_concorridos():
+    agora = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+    projetos = [
+        {'titulo': 'Novo', 'publicado_em': agora - timedelta(hours=1), 'propostas': 3},
+        {'titulo': 'Antigo', 'publicado_em': agora - timedelta(days=3), 'propostas': 3},
+        {'titulo': 'Concorrido', 'publicado_em': agora - timedelta(hours=1), 'propostas': 50},
+        {'titulo': 'Sem dados', 'publicado_em': None, 'propostas': None},
+    ]
+
+    filtrados = filtrar_projetos(projetos, max_idade=timedelta(hours=24), max_propostas=20, agora=agora)
+
+    assert [projeto['titulo'] for projeto in filtrados] == ['Novo', 'Sem dados']
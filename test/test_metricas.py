@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import aiohttp
+import pytest
+from app import create_app, db
+from app.models import User
+from app.bot import VerificadorDeProjetos
+from app.agendador import AgendadorDoBot, obter_agendador
+from app.metricas import Metricas, LogCircular
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def admin(app):
+    user = User(username='admin', email='admin@example.com', is_admin=True, chat_id='chat-admin')
+    user.set_password('senha')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+class VerificadorFalso(VerificadorDeProjetos):
+    def __init__(self, paginas):
+        super().__init__()
+        self.paginas = paginas
+
+    def obter_sessao_site(self):
+        return None
+
+    async def obter_titulos_links_projetos(self, page, session):
+        return self.paginas.get(page, [])
+
+    async def enviar_mensagem_telegram(self, texto, bot_token, chat_id):
+        return {'ok': True}
+
+def test_exportacao_no_formato_do_prometheus():
+    metricas = Metricas()
+    metricas.declarar_contador('paginas_total', 'Páginas.')
+    metricas.declarar_histograma('latencia_segundos', 'Latência.', buckets=(0.1, 1))
+    metricas.incrementar('paginas_total', resultado='erro')
+    metricas.incrementar('paginas_total', 2, resultado='erro')
+    for valor in (0.05, 0.5, 3):
+        metricas.observar('latencia_segundos', valor)
+
+    texto = metricas.exportar({'jobs_ativos': ('Jobs.', 4)})
+
+    assert '# TYPE paginas_total counter\npaginas_total{resultado="erro"} 3\n' in texto
+    assert 'latencia_segundos_bucket{le="0.1"} 1\nlatencia_segundos_bucket{le="1"} 2\nlatencia_segundos_bucket{le="+Inf"} 3\n' in texto
+    assert 'latencia_segundos_sum 3.55\nlatencia_segundos_count 3\n' in texto
+    assert '# TYPE jobs_ativos gauge\njobs_ativos 4\n' in texto
+    assert metricas.como_dict()['latencia_segundos'] == {'total': 3, 'soma': 3.55, 'media': 1.1833}
+
+def test_log_circular_tem_tamanho_fixo_e_filtra_por_nivel():
+    logs = LogCircular(max_eventos=3)
+    for indice in range(5):
+        logs.registrar(logging.WARNING if indice % 2 else logging.INFO, 'evento', indice=indice)
+
+    assert len(logs) == 3
+    assert [evento['indice'] for evento in logs.recentes()] == [4, 3, 2]
+    assert [evento['indice'] for evento in logs.recentes(nivel_minimo=logging.WARNING)] == [3]
+    assert logs.recentes(limite=1)[0]['nivel'] == 'INFO'
+
+def test_falha_no_download_e_contada_e_registrada():
+    class SessaoComFalha:
+        def get(self, url, headers=None):
+            raise aiohttp.ClientConnectionError('conexão recusada')
+
+    verificador = VerificadorDeProjetos()
+
+    assert asyncio.run(verificador.obter_titulos_links_projetos(1, SessaoComFalha())) == []
+    assert verificador.metricas.como_dict()['bot_paginas_total{resultado="erro"}'] == 1
+    evento = verificador.logs.recentes()[0]
+    assert (evento['nivel'], evento['evento'], evento['pagina']) == ('WARNING', 'pagina_com_erro', 1)
+    assert 'conexão recusada' in evento['erro']
+
+def test_ciclo_registra_duracao_tempo_de_banco_e_correspondencias(app, admin):
+    verificador = VerificadorFalso({1: [{'titulo': 'Bot em Python', 'link': '/project/1'}]})
+    assinantes = {admin: {'keywords': ['python'], 'chat_id': 'chat-admin'}, 999: {'keywords': ['excel'], 'chat_id': 'x'}}
+
+    asyncio.run(verificador.executar_verificacao_compartilhada(1, assinantes, 'token', app))
+
+    metricas = verificador.metricas.como_dict()
+    assert metricas['bot_ciclo_segundos']['total'] == 1
+    assert metricas['bot_ciclo_db_segundos']['soma'] > 0
+    assert metricas['bot_correspondencias_total'] == 1
+    assert metricas['bot_correspondencias_por_usuario'] == {'total': 2, 'soma': 1, 'media': 0.5}
+    evento = verificador.logs.recentes()[0]
+    assert (evento['evento'], evento['projetos_novos'], evento['assinantes']) == ('ciclo_concluido', 1, 2)
+
+def test_rotas_de_metricas_e_logs(app, admin):
+    app.config['METRICAS_TOKEN'] = 'segredo'
+    web = obter_agendador(app)
+    db.session.get(User, admin).bot_ativo = True
+    db.session.commit()
+    web.jobs.marcar_ativo(999)  # O registro de jobs do processo não entra no gauge
+    client = app.test_client()
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer errado'}).status_code == 401
+    # Antes de o líder gravar a fotografia, só os gauges do processo web
+    resposta = client.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+    assert resposta.status_code == 200
+    assert resposta.content_type.startswith('text/plain; version=0.0.4')
+    assert 'bot_jobs_ativos 1\n' in resposta.get_data(as_text=True)
+    assert 'bot_ciclo_segundos' not in resposta.get_data(as_text=True)
+
+    # O líder (o worker, em outro processo) grava métricas e logs no banco
+    lider = AgendadorDoBot(app, verificador=VerificadorFalso({}))
+    assert lider.renovar_lideranca()
+    lider.verificador.metricas.observar('bot_ciclo_segundos', 1.5)
+    lider.verificador.logs.registrar(logging.ERROR, 'erro_ao_salvar_pagina', pagina=2)
+    lider.publicar_estado()
+
+    texto = client.get('/metrics', headers={'Authorization': 'Bearer segredo'}).get_data(as_text=True)
+    assert '# TYPE bot_ciclo_segundos histogram' in texto
+    assert 'bot_ciclo_segundos_count 1\n' in texto
+    assert 'bot_jobs_ativos 1\n' in texto and 'bot_estado_idade_segundos' in texto
+
+    client.post('/auth/login', data=dict(username='admin', password='senha'))
+    metricas = client.get('/admin/metricas').get_json()
+    assert metricas['notificacoes_pendentes'] == 0
+    assert metricas['bot_ciclo_segundos']['total'] == 1
+    assert [evento['evento'] for evento in client.get('/admin/logs?nivel=error').get_json()] == ['erro_ao_salvar_pagina']
+    assert client.get('/admin/logs?nivel=nada').status_code == 400
+    assert client.get('/admin/crawler').get_json()['links_vistos']['itens'] == 0
+    assert client.get('/admin/notificador').get_json() == {'status': 'Notificador ainda não utilizado.', 'pendentes': 0}
+    assert web._verificador is None  # O processo web não cria o verificador
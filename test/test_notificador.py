@@ -0,0 +1,100 @@
+import asyncio
+from aiohttp import web
+from app.notificador import NotificadorTelegram, BaldeDeTokens
+
+async def iniciar_servidor_falso(respostas):
+    """Sobe um sendMessage falso que devolve as respostas na ordem e registra as chamadas."""
+    chamadas = []
+
+    async def send_message(request):
+        dados = await request.post()
+        chamadas.append(dict(dados))
+        status, corpo = respostas.pop(0) if respostas else (200, {'ok': True})
+        return web.json_response(corpo, status=status)
+
+    aplicacao = web.Application()
+    aplicacao.router.add_post('/bottoken/sendMessage', send_message)
+    runner = web.AppRunner(aplicacao)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    porta = runner.addresses[0][1]
+    return runner, f'http://127.0.0.1:{porta}', chamadas
+
+def test_repete_apos_429_e_reaproveita_a_sessao():
+    async def executar():
+        runner, url, chamadas = await iniciar_servidor_falso([
+            (429, {'ok': False, 'parameters': {'retry_after': 0}}),
+        ])
+        notificador = NotificadorTelegram('token', api_url=url, taxa_por_chat=100)
+        try:
+            primeira = await notificador.enviar(1, 'olá')
+            sessao = notificador._sessao
+            segunda = await notificador.enviar(1, 'de novo')
+            assert notificador._sessao is sessao
+        finally:
+            await notificador.fechar()
+            await runner.cleanup()
+        return primeira, segunda, chamadas, notificador.estatisticas()
+
+    primeira, segunda, chamadas, estatisticas = asyncio.run(executar())
+
+    assert primeira == {'ok': True} and segunda == {'ok': True}
+    assert len(chamadas) == 3
+    assert estatisticas['enviados'] == 2
+    assert estatisticas['limitados_429'] == 1
+
+def test_chat_bloqueado_deixa_de_receber():
+    async def executar():
+        runner, url, chamadas = await iniciar_servidor_falso([
+            (403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'}),
+        ])
+        notificador = NotificadorTelegram('token', api_url=url)
+        try:
+            await notificador.enviar(7, 'primeira')
+            await notificador.enviar(7, 'segunda')
+        finally:
+            await notificador.fechar()
+            await runner.cleanup()
+        return chamadas, notificador.estatisticas()
+
+    chamadas, estatisticas = asyncio.run(executar())
+
+    assert len(chamadas) == 1
+    assert estatisticas['falhas'] == 1
+    assert estatisticas['descartados'] == 1
+    assert estatisticas['chats_bloqueados'] == 1
+
+def test_bloqueio_do_chat_expira_e_pode_ser_desfeito():
+    async def executar():
+        runner, url, chamadas = await iniciar_servidor_falso([
+            (403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'}),
+            (403, {'ok': False, 'description': 'Forbidden: bot was blocked by the user'}),
+        ])
+        notificador = NotificadorTelegram('token', api_url=url, taxa_por_chat=100, bloqueio_s=0)
+        try:
+            await notificador.enviar(7, 'primeira')
+            notificador.bloqueio_s = 3600
+            expirado = await notificador.enviar(7, 'depois do prazo')  # Bloqueio de 0s já venceu
+            await notificador.enviar(7, 'ignorada')
+            notificador.desbloquear(7)
+            desbloqueado = await notificador.enviar(7, 'após novo /start')
+        finally:
+            await notificador.fechar()
+            await runner.cleanup()
+        return expirado, desbloqueado, chamadas
+
+    expirado, desbloqueado, chamadas = asyncio.run(executar())
+
+    assert expirado is None  # Segundo 403: o chat continua bloqueando o bot
+    assert desbloqueado == {'ok': True}
+    assert [chamada['text'] for chamada in chamadas] == ['primeira', 'depois do prazo', 'após novo /start']
+
+def test_balde_de_tokens_espaca_as_reservas():
+    balde = BaldeDeTokens(taxa=2, capacidade=2)
+
+    esperas = [balde.reservar() for _ in range(4)]
+
+    assert esperas[:2] == [0, 0]
+    assert 0.4 < esperas[2] <= 0.5
+    assert 0.9 < esperas[3] <= 1.0
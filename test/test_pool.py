@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app.pool import QueuePoolMonitorado, estatisticas_do_pool
+from config.config import orcamento_de_conexoes, opcoes_do_engine
+
+def test_orcamento_divide_o_limite_entre_os_processos():
+    assert orcamento_de_conexoes(20, web_workers=3, bot_embutido=True) == 6
+    assert orcamento_de_conexoes(20, web_workers=3, bot_embutido=False) == 5
+    assert orcamento_de_conexoes(2, web_workers=4, bot_embutido=False) == 1
+
+def test_opcoes_do_pool_respeitam_o_orcamento():
+    opcoes = opcoes_do_engine('postgresql://banco', orcamento=4)
+    assert opcoes['pool_size'] + opcoes['max_overflow'] <= 4
+    assert opcoes['pool_pre_ping'] is True
+    assert 'pool_size' not in opcoes_do_engine('sqlite:///app.db')
+
+def test_pool_monitorado_mede_espera_saturacao_e_timeouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePoolMonitorado,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    conexao = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    estatisticas = estatisticas_do_pool(engine)
+    assert estatisticas['checkouts'] == 1
+    assert estatisticas['timeouts'] == 1
+    assert estatisticas['saturacao'] == 1.0
+    assert estatisticas['espera_maxima_ms'] >= 0
+
+    conexao.close()
+    assert estatisticas_do_pool(engine)['em_uso'] == 0
+    engine.dispose()
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app import create_app, db
+from app.models import TarefaAgendada
+from app.tarefas import executar_uma_vez_por_intervalo
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_apenas_um_processo_reivindica_cada_intervalo(app):
+    agora = datetime.now(timezone.utc)
+    intervalo = timedelta(hours=12)
+
+    assert TarefaAgendada.reivindicar('limpeza', intervalo, 'web-1', agora) is True
+    assert TarefaAgendada.reivindicar('limpeza', intervalo, 'web-2', agora + timedelta(minutes=5)) is False
+    assert TarefaAgendada.reivindicar('limpeza', intervalo, 'web-2', agora + intervalo) is True
+    assert db.session.get(TarefaAgendada, 'limpeza').executada_por == 'web-2'
+
+def test_execucao_registra_horario_duracao_e_erro(app):
+    execucoes = []
+
+    assert executar_uma_vez_por_intervalo(app, 'limpeza', timedelta(hours=12), lambda: execucoes.append(1)) is True
+    assert executar_uma_vez_por_intervalo(app, 'limpeza', timedelta(hours=12), lambda: execucoes.append(2)) is False
+    assert execucoes == [1]
+    tarefa = db.session.get(TarefaAgendada, 'limpeza')
+    assert tarefa.ultima_execucao is not None and tarefa.ultima_duracao_s >= 0 and tarefa.ultimo_erro is None
+
+    def falhar():
+        raise RuntimeError('banco indisponível')
+
+    assert executar_uma_vez_por_intervalo(app, 'outra', timedelta(hours=1), falhar) is True
+    db.session.expire_all()
+    assert db.session.get(TarefaAgendada, 'outra').ultimo_erro == 'banco indisponível'
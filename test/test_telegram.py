@@ -0,0 +1,116 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Keyword, NotificacaoPendente, TokenTelegram
+from app.agendador import obter_agendador
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        app.config['TELEGRAM_WEBHOOK_SECRET'] = 'segredo-do-webhook'
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def usuarios(app):
+    ids = {}
+    for nome, chat_id in (('ana', None), ('bruno', None), ('carla', '42')):
+        user = User(username=nome, email=f'{nome}@example.com', chat_id=chat_id, bot_ativo=chat_id is not None)
+        user.set_password('senha')
+        db.session.add(user)
+        db.session.commit()
+        ids[nome] = user.id
+    return ids
+
+def enviar(app, chat_id, texto):
+    return app.test_client().post('/webhook/telegram', json={'message': {'chat': {'id': chat_id}, 'text': texto}},
+                                  headers={'X-Telegram-Bot-Api-Secret-Token': 'segredo-do-webhook'})
+
+def respostas():
+    return [(p.chat_id, p.texto) for p in NotificacaoPendente.query.order_by(NotificacaoPendente.id)]
+
+def test_link_do_dashboard_associa_o_chat_do_usuario_certo(app, usuarios):
+    client = app.test_client()
+    client.post('/auth/login', data=dict(username='bruno', password='senha'))
+
+    resposta = client.get('/telegram/vincular')
+    assert resposta.status_code == 302
+    assert resposta.location.startswith('https://t.me/O_Freela_bot?start=')
+    token = resposta.location.split('start=')[1]
+
+    assert enviar(app, 77, f'/start {token}').status_code == 200
+    assert db.session.get(User, usuarios['bruno']).chat_id == '77'
+    assert db.session.get(User, usuarios['ana']).chat_id is None  # Não é mais o primeiro usuário sem chat
+    assert respostas() == [('77', 'Seu chat ID foi associado com sucesso!')]
+    # O token é de uso único
+    assert enviar(app, 78, f'/start {token}').status_code == 404
+    assert db.session.get(User, usuarios['bruno']).chat_id == '77'
+
+def test_start_sem_token_ou_com_token_vencido_nao_associa(app, usuarios):
+    TokenTelegram.gerar(usuarios['ana'], timedelta(minutes=-1))
+    vencido = TokenTelegram.query.one().token
+    db.session.commit()
+
+    assert enviar(app, 77, '/start').status_code == 200
+    assert enviar(app, 77, f'/start {vencido}').status_code == 404
+    assert User.query.filter_by(chat_id='77').count() == 0
+    assert [texto for _, texto in respostas()] == [
+        'Para receber os projetos, use o botão "Vincular Telegram" no seu painel.',
+        'Link inválido ou expirado. Gere um novo link no seu painel.',
+    ]
+
+def test_novo_token_substitui_o_anterior_e_tokens_vencidos_sao_limpos(app, usuarios):
+    primeiro = TokenTelegram.gerar(usuarios['ana'], timedelta(minutes=5))
+    segundo = TokenTelegram.gerar(usuarios['ana'], timedelta(minutes=5))
+    TokenTelegram.gerar(usuarios['bruno'], timedelta(minutes=-1))
+    db.session.commit()
+
+    assert TokenTelegram.consumir(primeiro) is None
+    TokenTelegram.delete_expired()
+    assert [t.token for t in TokenTelegram.query.all()] == [segundo]
+    assert TokenTelegram.consumir(segundo, agora=datetime.now(timezone.utc)) == usuarios['ana']
+
+def test_stop_e_status_localizam_o_usuario_pelo_chat_indexado(app, usuarios):
+    db.session.add(Keyword(keyword='python', user_id=usuarios['carla']))
+    db.session.commit()
+    consultas = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: consultas.append(args[2]))
+
+    assert enviar(app, 42, '/status').get_json() == {'status': 'ativo'}
+    assert enviar(app, 42, '/stop').status_code == 200
+    assert enviar(app, 99, '/stop').status_code == 404
+
+    assert db.session.get(User, usuarios['carla']).bot_ativo is False
+    assert [texto for _, texto in respostas()] == [
+        'Bot ativo para carla, com 1 palavras-chave.',
+        'Bot parado. Você não receberá novos projetos.',
+        'Este chat não está associado a nenhuma conta.',
+    ]
+    assert any('WHERE users.chat_id = ?' in sql for sql in consultas)
+    plano = db.session.execute(db.text("EXPLAIN QUERY PLAN SELECT id FROM users WHERE chat_id = '42'")).all()
+    assert 'ix_users_chat_id' in str(plano)
+
+def test_webhook_sem_o_segredo_e_recusado(app, usuarios):
+    client = app.test_client()
+    mensagem = {'message': {'chat': {'id': 42}, 'text': '/stop'}}
+
+    assert client.post('/webhook/telegram', json=mensagem).status_code == 403
+    assert client.post('/webhook/telegram', json=mensagem, headers={'X-Telegram-Bot-Api-Secret-Token': 'errado'}).status_code == 403
+    app.config['TELEGRAM_WEBHOOK_SECRET'] = None  # Sem segredo configurado, nada é aceito
+    assert client.post('/webhook/telegram', json=mensagem, headers={'X-Telegram-Bot-Api-Secret-Token': ''}).status_code == 403
+    assert db.session.get(User, usuarios['carla']).bot_ativo is True
+    assert respostas() == []
+
+def test_novo_start_libera_o_chat_bloqueado(app, usuarios):
+    verificador = obter_agendador(app).verificador
+    notificador = verificador.obter_notificador('token')
+    notificador.chats_bloqueados['77'] = float('inf')
+    token = TokenTelegram.gerar(usuarios['ana'], timedelta(minutes=5))
+    db.session.commit()
+
+    assert enviar(app, 77, f'/start {token}').status_code == 200
+    assert not notificador.esta_bloqueado('77')
@@ -0,0 +1,49 @@
+import time
+import pytest
+from app import create_app, db
+from app.models import LinkVisto
+from app.vistos import RegistroDeLinksVistos
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_filtra_vistos_em_memoria_e_no_banco(app):
+    registro = RegistroDeLinksVistos()
+    db.session.add(LinkVisto(hash=LinkVisto.calcular_hash(1, '/project/banco')))
+    db.session.commit()
+    correspondencias = [
+        (1, {'link': '/project/banco'}),
+        (1, {'link': '/project/novo'}),
+        (1, {'link': '/project/novo'}),
+        (2, {'link': '/project/banco'}),
+    ]
+
+    novos = registro.filtrar_novos(correspondencias)
+    assert [(user_id, projeto['link']) for user_id, projeto, _ in novos] == [(1, '/project/novo'), (2, '/project/banco')]
+
+    registro.lembrar(h for _, _, h in novos)
+    assert registro.filtrar_novos(correspondencias) == []
+    assert registro.estatisticas()['acertos'] == 4
+
+def test_entradas_expiram_em_memoria_e_no_banco(app):
+    registro = RegistroDeLinksVistos(ttl_horas=1)
+    h = LinkVisto.calcular_hash(1, '/project/1')
+    registro.lembrar([h], agora=time.time() - 2 * 3600)
+    assert len(registro.filtrar_novos([(1, {'link': '/project/1'})])) == 1
+    assert registro.estatisticas()['itens'] == 0
+
+    LinkVisto.inserir_em_lote([h])
+    db.session.commit()
+    LinkVisto.delete_expired(0)
+    assert LinkVisto.query.count() == 0
+
+def test_hash_estavel_e_por_usuario():
+    assert LinkVisto.calcular_hash(1, '/project/1') == LinkVisto.calcular_hash(1, '/project/1')
+    assert LinkVisto.calcular_hash(1, '/project/1') != LinkVisto.calcular_hash(2, '/project/1')
+    assert -2 ** 63 <= LinkVisto.calcular_hash(1, '/project/1') < 2 ** 63
@@ -0,0 +1,28 @@
+import os
+import signal
+import asyncio
+import logging
+from app import create_worker_app
+from app.agendador import AgendadorDoBot
+
+# Processo dedicado ao bot: roda separado do gunicorn (ver Procfile).
+# Com o worker ativo, defina BOT_EMBUTIDO=false no processo web. Se os dois rodarem, só
+# o dono do lease LIDERANCA_BOT (ver app.agendador) executa o bot. O líder grava métricas,
+# logs e estatísticas em estado_do_bot, servidos pelo web em /metrics e /admin/*.
+env = os.getenv('FLASK_ENV', 'development')
+app = create_worker_app(env)  # Só a camada de banco: o worker não atende requisições
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main():
+    agendador = AgendadorDoBot(app)
+    loop = asyncio.get_running_loop()
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sinal, agendador.parar)
+    logger.info("Worker do bot iniciado.")
+    await agendador.executar()
+    logger.info("Worker do bot encerrado.")
+
+if __name__ == '__main__':
+    asyncio.run(main())